@@ -1,2 +1,3 @@
-python "%~dp0gc_anim_tool/conversions.py" --convert_to_dcx
+set "PYTHONPATH=%~dp0"
+python -m gc_anim_tool.conversions --convert_to_dcx
 pause
\ No newline at end of file
@@ -1,3 +1,4 @@
-python "%~dp0gc_anim_tool/conversions.py" ^
+set "PYTHONPATH=%~dp0"
+python -m gc_anim_tool.conversions ^
 --input "%~1" --output "%~dp1%~n1"
 pause
\ No newline at end of file
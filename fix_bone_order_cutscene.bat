@@ -1,3 +1,4 @@
-python "gc_anim_tool/cutscene.py" ^
+set "PYTHONPATH=%~dp0"
+python -m gc_anim_tool.cutscene ^
 --target_bmd "%~dp0input/pik2_olimar.bmd" --original_bmd "%~dp0input/pik1_olimar.bmd" --prep_cutscene clean 0.001
 pause
\ No newline at end of file
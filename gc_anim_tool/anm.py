@@ -1,8 +1,16 @@
-import binary
+from . import binary
+import logging
+import mmap
+from . import stats
+import struct
 from dataclasses import dataclass
-from dca import DCA
-from dck import DCK
+from .dca import DCA
+from .dck import DCK
+from io import BufferedIOBase
 from pathlib import Path
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
 
 
 class AnmContentIndicator:
@@ -10,6 +18,10 @@ class AnmContentIndicator:
     DCK = 3
 
 
+# content indicator, animation size, filename length
+ENTRY_HEADER = struct.Struct(">III")
+
+
 def get_file_name(file_path):
     file_path_components = file_path.split("/")
     file_name_and_extension = file_path_components[-1].rsplit(".", 1)
@@ -20,55 +32,189 @@ def get_file_name(file_path):
 class ANM:
     animations: list[DCK | DCA]
 
-    def write_to_path(self, filepath: str | Path):
-        path = Path(filepath)
-        with open(path, "wb") as f:
-            binary.write_u32(f, len(self.animations))
-            for animation in self.animations:
-                if isinstance(animation, DCA):
-                    binary.write_u32(f, AnmContentIndicator.DCA)
-                else:
-                    binary.write_u32(f, AnmContentIndicator.DCK)
-
-                size_offset = f.tell()
-                binary.write_u32(f, 0)  # placeholder for size
+    @stats.stage("serialize")
+    def to_bytes(self) -> bytearray:
+        """Contents of the bundle's file, laid out in a single buffer."""
+        entries = [
+            (animation, animation.name.encode(), animation._serialize())
+            for animation in self.animations
+        ]
+
+        # animation count, then per entry: content indicator, size, name length, name
+        size = 4 + sum(12 + len(name) + len(data) for _, name, data in entries)
+        buffer = bytearray(size)
+        binary.U32.pack_into(buffer, 0, len(entries))
+
+        offset = 4
+        for animation, name, data in entries:
+            if isinstance(animation, DCA):
+                content_indicator = AnmContentIndicator.DCA
+            else:
+                content_indicator = AnmContentIndicator.DCK
+
+            ENTRY_HEADER.pack_into(
+                buffer, offset, content_indicator, len(data), len(name)
+            )
+            offset += ENTRY_HEADER.size
+            buffer[offset : offset + len(name)] = name
+            offset += len(name)
+            buffer[offset : offset + len(data)] = data
+            offset += len(data)
+
+        return buffer
+
+    def write_stream(self, f: BufferedIOBase) -> int:
+        """Write the bundle to `f` in one call. `f` does not need to be
+        seekable.
+
+        Returns:
+            int: number of bytes written
+        """
+        buffer = self.to_bytes()
+        f.write(buffer)
+        stats.count("bytes_written", len(buffer))
+        return len(buffer)
 
-                binary.write_u32(f, len(animation.name))
-                f.write(animation.name.encode())
+    def write_to_path(self, filepath: str | Path):
+        with open(filepath, "wb") as f:
+            self.write_stream(f)
 
-                animation.write(f)
+    @classmethod
+    def from_buffer(cls, buffer):
+        """Read every animation of a bundle held in a bytes-like object, such
+        as a memoryview of an archive entry, without copying it first."""
+        with ANMReader(buffer) as reader:
+            return cls(list(reader))
 
-                f.seek(size_offset)
-                binary.write_u32(f, animation.filesize)
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        """Counterpart to `to_bytes`, see `from_buffer`."""
+        return cls.from_buffer(data)
 
     @classmethod
     def from_filepath(cls, filepath: str | Path):
-        path = Path(filepath)
-
-        animations = []
-        with open(path, "rb") as f:
-            animation_count = binary.read_u32(f)
-            for _ in range(animation_count):
-                content_indicator = binary.read_u32(f)
-
-                # skip 32, read as the size of the animation, irrelevant here
-                binary.read_u32(f)
-
-                filename_len = binary.read_u32(f)
-                filename = f.read(filename_len).decode()
-
-                if content_indicator == AnmContentIndicator.DCA:
-                    animation = DCA.from_file(f)
-                elif content_indicator == AnmContentIndicator.DCK:
-                    animation = DCK.from_file(f)
-                else:
-                    print(
-                        "Bundle has invalid content ID! Expected either DCK or DCA within bundle."
-                    )
-                    raise ValueError("Invalid-content-ID")
-
-                animation.name = Path(filename).stem
-
-                animations.append(animation)
-
-        return cls(animations)
+        with ANMReader(filepath) as reader:
+            return cls(list(reader))
+
+
+@dataclass(frozen=True)
+class ANMEntry:
+    name: str
+    content_indicator: int
+    offset: int  # start of the DCA/DCK data within the bundle
+    size: int
+
+    @property
+    def kind(self) -> type[DCA] | type[DCK]:
+        if self.content_indicator == AnmContentIndicator.DCA:
+            return DCA
+        return DCK
+
+
+class ANMReader:
+    """Random-access view of an ANM bundle on disk. Opening the bundle only
+    indexes the entry headers; an animation is decoded when it is asked for,
+    without touching the others.
+
+    Names are the entry filenames without their extension, as in `ANM`.
+    Bundles already in memory, such as an entry of an archive, are read from
+    any bytes-like object instead of a path.
+    """
+
+    def __init__(self, filepath: str | Path | bytes | bytearray | memoryview):
+        if isinstance(filepath, (str, Path)):
+            self.path = Path(filepath)
+            with open(self.path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.path = Path("<memory>")
+            self._map = memoryview(filepath).cast("B")
+
+        try:
+            self.entries = self._read_index()
+        except Exception:
+            self.close()
+            raise
+        self._by_name = {entry.name: i for i, entry in enumerate(self.entries)}
+
+    def _read_index(self) -> list[ANMEntry]:
+        data = self._map
+        entries = list[ANMEntry]()
+
+        animation_count = binary.U32.unpack_from(data, 0)[0]
+        offset = 4
+        for _ in range(animation_count):
+            content_indicator, _, filename_len = ENTRY_HEADER.unpack_from(
+                data, offset
+            )
+            offset += ENTRY_HEADER.size
+            filename = bytes(data[offset : offset + filename_len]).decode()
+            offset += filename_len
+
+            if content_indicator == AnmContentIndicator.DCA:
+                kind = DCA
+            elif content_indicator == AnmContentIndicator.DCK:
+                kind = DCK
+            else:
+                logger.error(
+                    "Bundle has invalid content ID! Expected either DCK or DCA within bundle."
+                )
+                raise ValueError("Invalid-content-ID")
+
+            # bundles written by older versions of this tool hold a wrong size,
+            # so the size is measured from the entry's own counts instead
+            size = kind.measure(data, offset)
+            if offset + size > len(data):
+                raise EOFError(f"Entry {filename} runs past the end of the bundle")
+
+            entries.append(
+                ANMEntry(Path(filename).stem, content_indicator, offset, size)
+            )
+            offset += size
+
+        return entries
+
+    def names(self) -> list[str]:
+        return [entry.name for entry in self.entries]
+
+    def entry(self, key: str | int) -> ANMEntry:
+        if isinstance(key, str):
+            if key not in self._by_name:
+                raise KeyError(f"No animation named {key} in {self.path}")
+            key = self._by_name[key]
+        return self.entries[key]
+
+    def read(self, key: str | int) -> DCA | DCK:
+        """Decode a single animation, by name or by position in the bundle."""
+        entry = self.entry(key)
+        return entry.kind.from_buffer(self._map, entry.name, entry.offset)
+
+    def raw(self, key: str | int) -> bytes:
+        """Undecoded bytes of a single animation, by name or by position."""
+        entry = self.entry(key)
+        return bytes(self._map[entry.offset : entry.offset + entry.size])
+
+    def __getitem__(self, key: str | int) -> DCA | DCK:
+        return self.read(key)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._by_name
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[DCA | DCK]:
+        for i in range(len(self.entries)):
+            yield self.read(i)
+
+    def close(self):
+        if isinstance(self._map, memoryview):
+            self._map.release()
+        else:
+            self._map.close()
+
+    def __enter__(self) -> "ANMReader":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -1,9 +1,8 @@
-import binary
-import general_animation
-import math
-from j3d_animation import J3DSkeletonAnimation, Keyframe
+from .general_animation import Channel, ChannelPool
+from .j3d_animation import J3DSkeletonAnimation
+from .transforms import Pipeline
 from dataclasses import dataclass
-from io import BufferedIOBase
+from typing import Sequence
 
 
 @dataclass
@@ -12,67 +11,47 @@ class BCA(J3DSkeletonAnimation):
 
     MAGIC = "J3D1bca1"
     SECTION = "ANF1"
+    CHANNEL_DESCRIPTOR_SIZE = 2
 
     def convert_rotations(self):
-        for joint in self.tracks:
-            for axis in "XYZ":
-                rotations = joint.rotation_keys[axis]
-                for key in rotations:
-                    key.value = math.radians(key.value)
+        Pipeline().radians().run(self.tracks)
 
     def get_angle_multiplier(self) -> int:
         return -1
 
-    def read_channel(
-        self, f: BufferedIOBase, channel_data: list[float]
-    ) -> list[Keyframe]:
-        keyframe_count = binary.read_u16(f)
-        data_index = binary.read_u16(f)  # index to value in data table
-
-        if keyframe_count == 1:
-            # return an identity keyframe, will always have a time value of zero
-            return [Keyframe(0, channel_data[data_index])]
+    @staticmethod
+    def channel_span(descriptor: Sequence[int]) -> tuple[int, int]:
+        keyframe_count, data_index = descriptor
+        return (keyframe_count, 1)
 
-        key_data = list[Keyframe]()
-        for i in range(keyframe_count):
-            key_data.append(Keyframe(i, channel_data[data_index + i]))
+    def read_channel(
+        self, descriptor: Sequence[int], channel_data: Sequence[float]
+    ) -> Channel:
+        keyframe_count, data_index = descriptor  # index to value in data table
 
-        return key_data
+        return Channel.from_table(channel_data, data_index, keyframe_count)
 
     def read_rotation(
-        self, f: BufferedIOBase, channel_data: list[int]
-    ) -> list[Keyframe]:
-        keyframe_count = binary.read_u16(f)
-        data_index = binary.read_u16(f)  # index to value in data table
+        self, descriptor: Sequence[int], channel_data: Sequence[int]
+    ) -> Channel:
+        keyframe_count, data_index = descriptor  # index to value in data table
 
-        if keyframe_count == 1:
-            # return an identity keyframe, will always have a time value of zero
-            return [Keyframe(0, channel_data[data_index] * self.angle_scale)]
-
-        key_data = list[Keyframe]()
-        for i in range(keyframe_count):
-            key_data.append(
-                Keyframe(i, channel_data[data_index + i] * self.angle_scale)
-            )
-
-        return key_data
+        return Channel.from_table(
+            channel_data, data_index, keyframe_count, scale=self.angle_scale
+        )
 
     def write_channel(
-        self, f: BufferedIOBase, key_data: list[Keyframe], channel_data: list[float]
-    ):
-        channel_sequence = [key.value for key in key_data]
-
-        data_index = general_animation.find_sequence(channel_data, channel_sequence)
+        self, key_data: Channel, channel_data: ChannelPool
+    ) -> tuple[int, ...]:
+        data_index = channel_data.add(key_data.values)
 
-        binary.write_u16(f, len(key_data))
-        binary.write_u16(f, data_index)
+        return (len(key_data), data_index)
 
     def write_rotation(
-        self, f: BufferedIOBase, key_data: list[Keyframe], channel_data: list[int]
-    ):
-        channel_sequence = [int(key.value / self.angle_scale) for key in key_data]
+        self, key_data: Channel, channel_data: ChannelPool
+    ) -> tuple[int, ...]:
+        channel_sequence = [int(value / self.angle_scale) for value in key_data.values]
 
-        data_index = general_animation.find_sequence(channel_data, channel_sequence)
+        data_index = channel_data.add(channel_sequence)
 
-        binary.write_u16(f, len(key_data))
-        binary.write_u16(f, data_index)
+        return (len(key_data), data_index)
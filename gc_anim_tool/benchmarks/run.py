@@ -0,0 +1,256 @@
+import json
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+from ..anm import ANM
+from ..bca import BCA
+from ..bck import BCK
+from ..conversions import (
+    bca_to_bck,
+    bca_to_dca,
+    bck_to_bca,
+    bck_to_dck,
+    convert_anm_bundle,
+    dca_to_bca,
+    dck_to_bck,
+)
+from ..dca import DCA
+from ..dck import DCK
+from ..general_animation import np
+from .synthetic import (
+    SyntheticSpec,
+    add_spec_arguments,
+    spec_from_arguments,
+    write_corpus,
+)
+
+
+@dataclass
+class Benchmark:
+    """One timed operation. `setup` builds a fresh argument for every run,
+    outside the timing, because conversions edit the animation they are given."""
+
+    name: str
+    source: str  # format of the corpus file the benchmark works on
+    setup: Callable[[Path], Any]
+    run: Callable[[Any], Any]
+    needs_numpy: bool = False
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    keys: int
+    bytes: int
+    seconds: float  # fastest run
+    median_seconds: float
+    keys_per_second: float
+    mb_per_second: float
+    peak_memory_bytes: int  # tracemalloc peak of one extra run
+
+
+def count_keys(animation) -> int:
+    """Total keyframes in an animation, or in every animation of an ANM."""
+    if isinstance(animation, ANM):
+        return sum(count_keys(anim) for anim in animation.animations)
+
+    tracks = animation.joints if hasattr(animation, "joints") else animation.tracks
+    return sum(
+        len(getattr(track, kind)[axis])
+        for track in tracks
+        for kind in ("scale_keys", "rotation_keys", "translation_keys")
+        for axis in "XYZ"
+    )
+
+
+def read_file(path: Path):
+    readers = {
+        ".bca": BCA.from_file,
+        ".bck": BCK.from_file,
+        ".dca": DCA.from_filepath,
+        ".dck": DCK.from_filepath,
+        ".anm": ANM.from_filepath,
+    }
+    return readers[path.suffix](path)
+
+
+def write_file(animation, directory: Path):
+    if isinstance(animation, ANM):
+        return animation.write_to_path(directory / "written.anm")
+    elif isinstance(animation, (BCA, BCK)):
+        return animation.write(directory)
+    return animation.write_to_path(directory)
+
+
+def make_benchmarks(output: Path) -> list[Benchmark]:
+    def keep_path(path: Path):
+        return path
+
+    def write(animation):
+        return write_file(animation, output)
+
+    def round_trip(path: Path):
+        return write_file(read_file(path), output)
+
+    benchmarks = list[Benchmark]()
+    for extension in ("bca", "bck", "dca", "dck", "anm"):
+        benchmarks.append(
+            Benchmark(f"{extension}.parse", extension, keep_path, read_file)
+        )
+        benchmarks.append(Benchmark(f"{extension}.write", extension, read_file, write))
+    benchmarks.append(Benchmark("anm.round_trip", "anm", keep_path, round_trip))
+
+    benchmarks += [
+        Benchmark("convert.dca_to_bca", "dca", read_file, dca_to_bca),
+        Benchmark("convert.dck_to_bck", "dck", read_file, dck_to_bck),
+        Benchmark("convert.bca_to_dca", "bca", read_file, bca_to_dca),
+        Benchmark("convert.bck_to_dck", "bck", read_file, bck_to_dck),
+        Benchmark("convert.anm_bundle", "anm", read_file, convert_anm_bundle),
+        Benchmark("convert.bca_to_bck", "bca", read_file, bca_to_bck, needs_numpy=True),
+        Benchmark("convert.bck_to_bca", "bck", read_file, bck_to_bca, needs_numpy=True),
+    ]
+    return benchmarks
+
+
+def run_benchmark(
+    benchmark: Benchmark, path: Path, repeat: int, keys: int
+) -> BenchmarkResult:
+    times = list[float]()
+    for _ in range(repeat):
+        argument = benchmark.setup(path)
+        start = time.perf_counter()
+        benchmark.run(argument)
+        times.append(time.perf_counter() - start)
+
+    # tracing slows everything down, so memory is measured on a separate run
+    argument = benchmark.setup(path)
+    tracemalloc.start()
+    benchmark.run(argument)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    size = path.stat().st_size
+    seconds = min(times)
+    return BenchmarkResult(
+        benchmark.name,
+        keys,
+        size,
+        seconds,
+        statistics.median(times),
+        keys / seconds,
+        size / 1_000_000 / seconds,
+        peak,
+    )
+
+
+def run_benchmarks(
+    spec: SyntheticSpec, repeat: int = 5, only: Optional[list[str]] = None
+) -> dict:
+    """Generate the corpus for `spec` in a temporary folder and time every
+    benchmark whose name contains one of `only`, or all of them.
+
+    Returns:
+        dict: environment, spec and results, ready to be saved as JSON
+    """
+    results = list[BenchmarkResult]()
+    skipped = list[str]()
+    with tempfile.TemporaryDirectory() as temp:
+        corpus = Path(temp) / "corpus"
+        output = Path(temp) / "output"
+        output.mkdir()
+
+        paths = write_corpus(spec, corpus)
+        keys = {extension: count_keys(read_file(p)) for extension, p in paths.items()}
+
+        for benchmark in make_benchmarks(output):
+            if only and not any(pattern in benchmark.name for pattern in only):
+                continue
+            if benchmark.needs_numpy and np is None:
+                skipped.append(benchmark.name)
+                continue
+
+            source = benchmark.source
+            results.append(
+                run_benchmark(benchmark, paths[source], repeat, keys[source])
+            )
+
+    return {
+        "python": platform.python_version(),
+        "numpy": None if np is None else np.__version__,
+        "platform": platform.platform(),
+        "spec": asdict(spec),
+        "repeat": repeat,
+        "results": [asdict(result) for result in results],
+        "skipped": skipped,
+    }
+
+
+def compare(report: dict, baseline: dict) -> list[str]:
+    """Lines of how much faster each benchmark ran than in `baseline`."""
+    previous = {result["name"]: result for result in baseline["results"]}
+
+    lines = list[str]()
+    for result in report["results"]:
+        before = previous.get(result["name"])
+        if before is None:
+            continue
+        speedup = before["seconds"] / result["seconds"]
+        memory = result["peak_memory_bytes"] / max(before["peak_memory_bytes"], 1)
+        lines.append(
+            f"{result['name']}: {speedup:.2f}x speed, {memory:.2f}x peak memory"
+        )
+
+    return lines
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(
+        description="Time parsing, conversion and writing of synthetic animations."
+    )
+    add_spec_arguments(parser)
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=5, help="<Optional> Runs per benchmark."
+    )
+    parser.add_argument(
+        "-k",
+        "--only",
+        action="append",
+        help="<Optional> Only run benchmarks whose name contains this text. Can be given more than once.",
+    )
+    parser.add_argument(
+        "-o", "--output", type=str, help="<Optional> Path to save the results as JSON."
+    )
+    parser.add_argument(
+        "-c",
+        "--compare",
+        type=str,
+        help="<Optional> Path of earlier results to compare this run against.",
+    )
+    args = parser.parse_args()
+
+    report = run_benchmarks(spec_from_arguments(args), args.repeat, args.only)
+
+    for result in report["results"]:
+        print(
+            f"{result['name']}: {result['seconds'] * 1000:.2f} ms, "
+            f"{result['keys_per_second']:.0f} keys/s, "
+            f"{result['mb_per_second']:.2f} MB/s, "
+            f"peak {result['peak_memory_bytes'] / 1_000_000:.2f} MB"
+        )
+    for name in report["skipped"]:
+        print(f"{name}: skipped, NumPy is not installed")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print("\n".join(compare(report, baseline)))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,223 @@
+import math
+import random
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+from ..anm import ANM
+from ..bca import BCA
+from ..bck import BCK
+from ..dca import DCA
+from ..dck import DCK
+from ..general_animation import Keyframe, JointTrack, TangentMode
+from ..j3d_animation import LoopMode
+from ..mod_animation import Joint
+
+# chance of each kind of channel being animated, instead of holding one key
+ANIMATED = {"scale_keys": 0.25, "rotation_keys": 0.75, "translation_keys": 0.5}
+
+# largest value each kind of channel swings by. Rotations stay inside the
+# +-180 degrees a BCA can store
+AMPLITUDE = {"scale_keys": 0.5, "rotation_keys": 170.0, "translation_keys": 100.0}
+REST_VALUE = {"scale_keys": 1.0, "rotation_keys": 0.0, "translation_keys": 0.0}
+
+
+@dataclass
+class SyntheticSpec:
+    """Shape of the synthetic animations. The same spec always generates the
+    same animations, byte for byte.
+
+    Baked formats (BCA, DCA) key every frame, so `density` only applies to BCK
+    and DCK. Keep `joints * frames` within the u16 table limits of J3D files.
+    """
+
+    joints: int = 40
+    frames: int = 240
+    density: float = 0.25  # fraction of frames keyed in BCK and DCK channels
+    tangent_mode: int = TangentMode.SYMMETRIC  # BCK only, DCK is always symmetric
+    anm_entries: int = 8
+    seed: int = 0
+
+
+def make_curve(
+    rng: random.Random, kind: str, frames: int
+) -> tuple[Callable[[float], float], Callable[[float], float]]:
+    """A smooth random curve for a channel, and its slope per frame."""
+    waves = [
+        (
+            rng.uniform(0.25, 0.5) * AMPLITUDE[kind],
+            rng.uniform(0.5, 3.0) * 2 * math.pi / frames,
+            rng.uniform(0, 2 * math.pi),
+        )
+        for _ in range(2)
+    ]
+    rest = REST_VALUE[kind]
+
+    def value(frame: float) -> float:
+        return rest + sum(a * math.sin(w * frame + p) for a, w, p in waves)
+
+    def slope(frame: float) -> float:
+        return sum(a * w * math.cos(w * frame + p) for a, w, p in waves)
+
+    return value, slope
+
+
+def make_tracks(
+    spec: SyntheticSpec, rng: random.Random, baked: bool
+) -> list[JointTrack]:
+    """Tracks with a key on every frame when `baked`, or else keys with
+    tangents on a `density` fraction of the frames."""
+    key_count = min(spec.frames, max(2, round(spec.density * spec.frames)))
+
+    tracks = list[JointTrack]()
+    for _ in range(spec.joints):
+        track = JointTrack()
+        for kind in ANIMATED:
+            for axis in "XYZ":
+                value, slope = make_curve(rng, kind, spec.frames)
+                if rng.random() >= ANIMATED[kind]:
+                    getattr(track, kind)[axis] = [Keyframe(0, value(0))]
+                elif baked:
+                    getattr(track, kind)[axis] = [
+                        Keyframe(frame, value(frame)) for frame in range(spec.frames)
+                    ]
+                else:
+                    inner = rng.sample(range(1, spec.frames - 1), key_count - 2)
+                    frames = [0, *sorted(inner), spec.frames - 1]
+                    keys = list[Keyframe]()
+                    for frame in frames:
+                        in_tangent = slope(frame)
+                        out_tangent = in_tangent
+                        if spec.tangent_mode == TangentMode.PIECEWISE:
+                            out_tangent = in_tangent * rng.uniform(0.5, 1.5)
+                        keys.append(
+                            Keyframe(frame, value(frame), in_tangent, out_tangent)
+                        )
+                    getattr(track, kind)[axis] = keys
+        tracks.append(track)
+
+    return tracks
+
+
+def make_joints(tracks: list[JointTrack]) -> list[Joint]:
+    """MOD joints holding `tracks` in a chain, with rotations in radians."""
+    joints = list[Joint]()
+    for i, track in enumerate(tracks):
+        joint = Joint(i, max(i - 1, 0))
+        joint.scale_keys = track.scale_keys
+        joint.translation_keys = track.translation_keys
+        for axis in "XYZ":
+            joint.rotation_keys[axis] = [
+                Keyframe(
+                    key.frame,
+                    math.radians(key.value),
+                    None if key.in_tangent is None else math.radians(key.in_tangent),
+                )
+                for key in track.rotation_keys[axis]
+            ]
+        joints.append(joint)
+
+    return joints
+
+
+def _rng(spec: SyntheticSpec, name: str) -> random.Random:
+    # string seeds are hashed the same way on every run, unlike `hash()`
+    return random.Random(f"{spec.seed}:{name}")
+
+
+def make_bca(spec: SyntheticSpec, name: str = "synthetic") -> BCA:
+    tracks = make_tracks(spec, _rng(spec, name), baked=True)
+    return BCA(name, spec.frames, LoopMode.LOOP, tracks)
+
+
+def make_bck(spec: SyntheticSpec, name: str = "synthetic") -> BCK:
+    tracks = make_tracks(spec, _rng(spec, name), baked=False)
+    return BCK(name, spec.frames, LoopMode.LOOP, tracks)
+
+
+def make_dca(spec: SyntheticSpec, name: str = "synthetic.dca") -> DCA:
+    tracks = make_tracks(spec, _rng(spec, name), baked=True)
+    return DCA(name, spec.frames, make_joints(tracks))
+
+
+def make_dck(spec: SyntheticSpec, name: str = "synthetic.dck") -> DCK:
+    symmetric = SyntheticSpec(**{**vars(spec), "tangent_mode": TangentMode.SYMMETRIC})
+    tracks = make_tracks(symmetric, _rng(spec, name), baked=False)
+    return DCK(name, spec.frames, make_joints(tracks))
+
+
+def make_anm(spec: SyntheticSpec) -> ANM:
+    """A bundle of `spec.anm_entries` animations, alternating DCK and DCA."""
+    animations = list[DCA | DCK]()
+    for i in range(spec.anm_entries):
+        if i % 2 == 0:
+            animations.append(make_dck(spec, f"synthetic_{i:03}.dck"))
+        else:
+            animations.append(make_dca(spec, f"synthetic_{i:03}.dca"))
+
+    return ANM(animations)
+
+
+def write_corpus(spec: SyntheticSpec, directory: str | Path) -> dict[str, Path]:
+    """Write one synthetic animation of each format to `directory`.
+
+    Returns:
+        dict[str, Path]: path written for each format, by extension
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    paths = {
+        "bca": Path(make_bca(spec).write(directory)),
+        "bck": Path(make_bck(spec).write(directory)),
+        "dca": Path(make_dca(spec).write_to_path(directory)),
+        "dck": Path(make_dck(spec).write_to_path(directory)),
+        "anm": directory / "synthetic.anm",
+    }
+    make_anm(spec).write_to_path(paths["anm"])
+    return paths
+
+
+def add_spec_arguments(parser: ArgumentParser):
+    defaults = SyntheticSpec()
+    parser.add_argument("--joints", type=int, default=defaults.joints)
+    parser.add_argument("--frames", type=int, default=defaults.frames)
+    parser.add_argument(
+        "--density",
+        type=float,
+        default=defaults.density,
+        help="<Optional> Fraction of frames keyed in bck and dck channels.",
+    )
+    parser.add_argument(
+        "--tangent_mode",
+        choices=("symmetric", "piecewise"),
+        default="symmetric",
+        help="<Optional> Tangent mode of the bck keys.",
+    )
+    parser.add_argument("--anm_entries", type=int, default=defaults.anm_entries)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def spec_from_arguments(args) -> SyntheticSpec:
+    tangent_mode = TangentMode.SYMMETRIC
+    if args.tangent_mode == "piecewise":
+        tangent_mode = TangentMode.PIECEWISE
+
+    return SyntheticSpec(
+        args.joints,
+        args.frames,
+        args.density,
+        tangent_mode,
+        args.anm_entries,
+        args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Write a synthetic animation of each format.")
+    parser.add_argument("output", type=str, help="Folder to write the animations to.")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    for path in write_corpus(spec_from_arguments(args), args.output).values():
+        print(path)
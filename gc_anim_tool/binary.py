@@ -1,46 +1,160 @@
 import struct
+import sys
+from array import array
 from io import BufferedIOBase
+from typing import Sequence
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, tables fall back to `array`
+    np = None
+
+U32 = struct.Struct(">I")
+U16 = struct.Struct(">H")
+S16 = struct.Struct(">h")
+U8 = struct.Struct(">B")
+S8 = struct.Struct(">b")
+F32 = struct.Struct(">f")
+
+# `array` typecodes of the big-endian tables, mapped to their NumPy dtypes
+TABLE_DTYPES = {"f": ">f4", "h": ">i2", "b": "i1", "H": ">u2", "I": ">u4"}
+TABLE_ITEMSIZES = {typecode: array(typecode).itemsize for typecode in TABLE_DTYPES}
+
+_NEEDS_BYTESWAP = sys.byteorder == "little"
 
 # region binary_read
 
 
+class BufferReader(BufferedIOBase):
+    """Read-only file object over a bytes-like object, such as an mmap or an
+    entry of an archive, so that readers written against files can parse data
+    already in memory. Each read copies only the bytes asked for.
+    """
+
+    def __init__(self, buffer, name: str = ""):
+        self._view = memoryview(buffer).cast("B")
+        self._position = 0
+        self.name = name
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def read(self, size: int | None = -1) -> bytes:
+        start = self._position
+        end = len(self._view) if size is None or size < 0 else start + size
+        data = bytes(self._view[start:end])
+        self._position = start + len(data)
+        return data
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        if whence == 1:
+            offset += self._position
+        elif whence == 2:
+            offset += len(self._view)
+        self._position = max(offset, 0)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self):
+        self._view.release()
+        super().close()
+
+
 def read_u32(f: BufferedIOBase) -> int:
-    return struct.unpack(">I", f.read(4))[0]
+    return U32.unpack(f.read(4))[0]
 
 
 def read_u16(f: BufferedIOBase) -> int:
-    return struct.unpack(">H", f.read(2))[0]
+    return U16.unpack(f.read(2))[0]
 
 
 def read_s16(f: BufferedIOBase) -> int:
-    return struct.unpack(">h", f.read(2))[0]
+    return S16.unpack(f.read(2))[0]
 
 
 def read_u8(f: BufferedIOBase) -> int:
-    return struct.unpack(">B", f.read(1))[0]
+    return U8.unpack(f.read(1))[0]
 
 
 def read_s8(f: BufferedIOBase) -> int:
-    return struct.unpack(">b", f.read(1))[0]
+    return S8.unpack(f.read(1))[0]
 
 
 def read_f32(f: BufferedIOBase) -> float:
-    return struct.unpack(">f", f.read(4))[0]
+    return F32.unpack(f.read(4))[0]
 
 
-def read_f32_table(f: BufferedIOBase, offset: int, count: int) -> list[float]:
-    f.seek(offset)
-    return [read_f32(f) for _ in range(count)]
+def unpack_table(buffer, offset: int, count: int, typecode: str) -> array:
+    """Decode `count` big-endian values starting at `offset` of a bytes-like
+    object in one step.
+
+    Args:
+        buffer: bytes, bytearray, memoryview or mmap holding the table
+        offset (int): byte offset of the first value
+        count (int): number of values to decode
+        typecode (str): `array` typecode of the values, see `TABLE_DTYPES`
+
+    Returns:
+        array: native-endian copy of the table
+    """
+    size = count * TABLE_ITEMSIZES[typecode]
+    data = memoryview(buffer)[offset : offset + size]
+    if len(data) != size:
+        raise EOFError(f"Table at {offset:#x} runs past the end of the data")
+
+    table = array(typecode)
+    table.frombytes(data)
+    if _NEEDS_BYTESWAP and table.itemsize > 1:
+        table.byteswap()
+
+    return table
+
 
+def unpack_ndarray(buffer, offset: int, count: int, typecode: str):
+    """NumPy counterpart to `unpack_table`. The returned array is a big-endian
+    view over `buffer` and is never copied, so it is read-only if `buffer` is.
+    """
+    if np is None:
+        raise ModuleNotFoundError("NumPy is required for ndarray tables")
 
-def read_s16_table(f: BufferedIOBase, offset: int, count: int) -> list[int]:
+    return np.frombuffer(
+        buffer, dtype=TABLE_DTYPES[typecode], count=count, offset=offset
+    )
+
+
+def read_table(f: BufferedIOBase, offset: int, count: int, typecode: str) -> array:
     f.seek(offset)
-    return [read_s16(f) for _ in range(count)]
+    return unpack_table(f.read(count * TABLE_ITEMSIZES[typecode]), 0, count, typecode)
 
 
-def read_s8_table(f: BufferedIOBase, offset: int, count: int) -> list[int]:
+def read_ndarray(f: BufferedIOBase, offset: int, count: int, typecode: str):
     f.seek(offset)
-    return [read_s8(f) for _ in range(count)]
+    return unpack_ndarray(f.read(count * TABLE_ITEMSIZES[typecode]), 0, count, typecode)
+
+
+def read_f32_table(f: BufferedIOBase, offset: int, count: int) -> array:
+    return read_table(f, offset, count, "f")
+
+
+def read_s16_table(f: BufferedIOBase, offset: int, count: int) -> array:
+    return read_table(f, offset, count, "h")
+
+
+def read_s8_table(f: BufferedIOBase, offset: int, count: int) -> array:
+    return read_table(f, offset, count, "b")
+
+
+def read_u16_table(f: BufferedIOBase, offset: int, count: int) -> array:
+    return read_table(f, offset, count, "H")
+
+
+def read_u32_table(f: BufferedIOBase, offset: int, count: int) -> array:
+    return read_table(f, offset, count, "I")
 
 
 # endregion
@@ -49,50 +163,51 @@ def read_s8_table(f: BufferedIOBase, offset: int, count: int) -> list[int]:
 
 
 def write_u32(f: BufferedIOBase, val: int):
-    f.write(struct.pack(">I", val))
+    f.write(U32.pack(val))
 
 
 def write_u16(f: BufferedIOBase, val: int):
-    f.write(struct.pack(">H", val))
+    f.write(U16.pack(val))
 
 
 def write_s16(f: BufferedIOBase, val: int):
-    f.write(struct.pack(">h", val))
+    f.write(S16.pack(val))
 
 
 def write_u8(f: BufferedIOBase, val: int):
-    f.write(struct.pack(">B", val))
+    f.write(U8.pack(val))
 
 
 def write_s8(f: BufferedIOBase, val: int):
-    f.write(struct.pack(">b", val))
+    f.write(S8.pack(val))
 
 
 def write_f32(f: BufferedIOBase, val: float):
-    f.write(struct.pack(">f", val))
+    f.write(F32.pack(val))
 
 
-def write_f32_table(f: BufferedIOBase, data: list[float]):
-    for val in data:
-        write_f32(f, val)
+def write_f32_table(f: BufferedIOBase, data: Sequence[float]):
+    f.write(pack_table(data, "f"))
 
 
-def write_s16_table(f: BufferedIOBase, data: list[int]):
-    for val in data:
-        write_s16(f, val)
+def write_s16_table(f: BufferedIOBase, data: Sequence[int]):
+    f.write(pack_table(data, "h"))
 
 
 PADDING = b"Blender J3D by PishPish; This is padding data to align stream"
 
 
-def write_padding(f: BufferedIOBase, multiple: int):
-    next_aligned = (f.tell() + (multiple - 1)) & ~(multiple - 1)
+def align(offset: int, multiple: int) -> int:
+    return (offset + (multiple - 1)) & ~(multiple - 1)
+
+
+def padding(size: int) -> bytes:
+    repeats = -(-size // len(PADDING))
+    return (PADDING * repeats)[:size]
 
-    diff = next_aligned - f.tell()
 
-    for i in range(diff):
-        pos = i % len(PADDING)
-        f.write(PADDING[pos : pos + 1])
+def write_padding(f: BufferedIOBase, multiple: int):
+    f.write(padding(align(f.tell(), multiple) - f.tell()))
 
 
 def write_pad32(f: BufferedIOBase):
@@ -102,3 +217,44 @@ def write_pad32(f: BufferedIOBase):
 
 
 # endregion
+
+# region binary_pack
+
+
+def pack_table(data: Sequence, typecode: str) -> bytes:
+    """Encode a whole table as big-endian values in one step.
+
+    Args:
+        data (Sequence): values to encode
+        typecode (str): `array` typecode of the values, see `TABLE_DTYPES`
+
+    Returns:
+        bytes: encoded table
+    """
+    table = array(typecode, data)
+    if _NEEDS_BYTESWAP and table.itemsize > 1:
+        table.byteswap()
+
+    return table.tobytes()
+
+
+def pack_table_into(
+    buffer: bytearray, offset: int, data: Sequence, typecode: str
+) -> int:
+    """Encode a whole table into `buffer` at `offset`.
+
+    Returns:
+        int: offset just past the end of the table
+    """
+    encoded = pack_table(data, typecode)
+    end = offset + len(encoded)
+    buffer[offset:end] = encoded
+    return end
+
+
+def pack_padding_into(buffer: bytearray, start: int, end: int):
+    """Fill `buffer[start:end]` with the padding pattern, as `write_padding` would."""
+    buffer[start:end] = padding(end - start)
+
+
+# endregion
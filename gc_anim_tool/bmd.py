@@ -0,0 +1,209 @@
+from . import binary
+import hashlib
+import json
+import struct
+from dataclasses import asdict, dataclass, field
+from .general_animation import Keyframe, JointTrack
+from pathlib import Path
+from typing import Optional
+
+# matrix type, scale compensation, padding, scale, rotation, padding, translation,
+# then the bounding radius and box, which are not needed here
+JOINT_ENTRY = struct.Struct(">HBB3f3hH3f28x")
+
+# INF1 scene graph node types
+NODE_END = 0x00
+NODE_OPEN = 0x01
+NODE_CLOSE = 0x02
+NODE_JOINT = 0x10
+
+CACHE_DIR = Path.home() / ".cache" / "gc_anim_tool" / "bmd"
+CACHE_VERSION = 1
+
+
+@dataclass
+class RestTransform:
+    scale: tuple[float, float, float]
+    rotation: tuple[float, float, float]  # degrees
+    translation: tuple[float, float, float]
+
+
+@dataclass
+class BMDSkeleton:
+    """Joint names, rest transforms and hierarchy of a BMD/BDL model, read from
+    its JNT1 and INF1 sections. Use `load` to share parsed skeletons between
+    calls and runs."""
+
+    names: list[str]
+    transforms: list[RestTransform]
+    parents: list[int] = field(default_factory=list)  # -1 for the root joints
+
+    def index(self, name: str) -> int:
+        return self.names.index(name)
+
+    def rest_tracks(self) -> list[JointTrack]:
+        """The rest pose as single-key tracks, one per joint."""
+        tracks = list[JointTrack]()
+        for transform in self.transforms:
+            track = JointTrack()
+            for i, axis in enumerate("XYZ"):
+                track.scale_keys[axis] = [Keyframe(0, transform.scale[i])]
+                track.rotation_keys[axis] = [Keyframe(0, transform.rotation[i])]
+                track.translation_keys[axis] = [Keyframe(0, transform.translation[i])]
+            tracks.append(track)
+
+        return tracks
+
+    @staticmethod
+    def read_sections(filepath: str | Path, *tags: str) -> dict[str, bytes]:
+        """Read whole sections of a J3D file by tag, skipping over the rest."""
+        sections = dict[str, bytes]()
+        with open(filepath, "rb") as f:
+            f.seek(0x0C)
+            section_count = binary.read_u32(f)
+
+            offset = 0x20
+            for _ in range(section_count):
+                f.seek(offset)
+                header = f.read(8)
+                if len(header) < 8:
+                    break
+
+                tag = header[:4].decode(errors="replace")
+                size = binary.U32.unpack_from(header, 4)[0]
+                if tag in tags:
+                    sections[tag] = header + f.read(size - 8)
+                if size == 0:
+                    break
+                offset += size
+
+        return sections
+
+    @staticmethod
+    def read_strings(data: bytes, offset: int) -> list[str]:
+        string_count = binary.U16.unpack_from(data, offset)[0]
+        # each entry is a hash, then the string's offset from the table start
+        entries = binary.unpack_table(data, offset + 4, string_count * 2, "H")
+
+        strings = list[str]()
+        for string_offset in entries[1::2]:
+            start = offset + string_offset
+            end = data.index(b"\x00", start)
+            strings.append(data[start:end].decode("shift-jis"))
+
+        return strings
+
+    @staticmethod
+    def read_parents(data: bytes, joint_count: int) -> list[int]:
+        """Joint parents, from the INF1 scene graph."""
+        parents = [-1] * joint_count
+        hierarchy_offset = binary.U32.unpack_from(data, 0x14)[0]
+        nodes = binary.unpack_table(
+            data, hierarchy_offset, (len(data) - hierarchy_offset) // 2, "H"
+        )
+
+        # the last joint seen at each depth is the parent of joints opened below it
+        stack = [-1]
+        last_joint = -1
+        for i in range(0, len(nodes) - 1, 2):
+            node_type, index = nodes[i], nodes[i + 1]
+            if node_type == NODE_END:
+                break
+            elif node_type == NODE_OPEN:
+                stack.append(last_joint)
+            elif node_type == NODE_CLOSE:
+                stack.pop()
+            elif node_type == NODE_JOINT and index < joint_count:
+                parents[index] = stack[-1]
+                last_joint = index
+
+        return parents
+
+    @classmethod
+    def from_file(cls, filepath: str | Path) -> "BMDSkeleton":
+        sections = cls.read_sections(filepath, "JNT1", "INF1")
+        if "JNT1" not in sections:
+            raise ValueError(f"{filepath} has no JNT1 section")
+        data = sections["JNT1"]
+
+        joint_count = binary.U16.unpack_from(data, 0x08)[0]
+        entries_offset, remap_offset, strings_offset = struct.unpack_from(
+            ">III", data, 0x0C
+        )
+
+        # joints with identical transforms may share one entry
+        remap = binary.unpack_table(data, remap_offset, joint_count, "H")
+        entry_count = max(remap, default=-1) + 1
+        entries_end = entries_offset + entry_count * JOINT_ENTRY.size
+        entries = list(JOINT_ENTRY.iter_unpack(data[entries_offset:entries_end]))
+
+        angle_scale = 180.0 / 32768.0
+        transforms = list[RestTransform]()
+        for entry_index in remap:
+            entry = entries[entry_index]
+            transforms.append(
+                RestTransform(
+                    entry[3:6],
+                    tuple(value * angle_scale for value in entry[6:9]),  # type: ignore
+                    entry[10:13],
+                )
+            )
+
+        names = cls.read_strings(data, strings_offset)
+
+        parents = [-1] * joint_count
+        if "INF1" in sections:
+            parents = cls.read_parents(sections["INF1"], joint_count)
+
+        return cls(names, transforms, parents)
+
+    @classmethod
+    def from_json(cls, text: str) -> "BMDSkeleton":
+        data = json.loads(text)
+        transforms = [
+            RestTransform(**{key: tuple(values) for key, values in transform.items()})
+            for transform in data["transforms"]
+        ]
+        return cls(data["names"], transforms, data["parents"])  # type: ignore
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def load(
+        cls, filepath: str | Path, cache_dir: Optional[Path] = CACHE_DIR
+    ) -> "BMDSkeleton":
+        """Parse a model's skeleton, or reuse an earlier parse of the same file.
+        Skeletons are cached in memory and, unless `cache_dir` is None, on disk,
+        keyed by the model's path, size and modification time."""
+        path = Path(filepath).resolve()
+        stat = path.stat()
+        key = (str(path), stat.st_size, stat.st_mtime_ns)
+
+        skeleton = _SKELETONS.get(key)
+        if skeleton is not None:
+            return skeleton
+
+        cache_path = None
+        if cache_dir is not None:
+            digest = hashlib.sha1(f"{CACHE_VERSION}{key}".encode()).hexdigest()
+            cache_path = cache_dir / f"{digest}.json"
+            try:
+                skeleton = cls.from_json(cache_path.read_text())
+            except (OSError, ValueError, KeyError, TypeError):
+                skeleton = None
+
+        if skeleton is None:
+            skeleton = cls.from_file(path)
+            if cache_path is not None:
+                try:
+                    cache_path.parent.mkdir(parents=True, exist_ok=True)
+                    cache_path.write_text(skeleton.to_json())
+                except OSError:
+                    pass  # the disk cache is only an optimization
+
+        _SKELETONS[key] = skeleton
+        return skeleton
+
+
+_SKELETONS = dict[tuple[str, int, int], BMDSkeleton]()
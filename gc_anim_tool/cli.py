@@ -0,0 +1,70 @@
+import importlib
+import sys
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+
+@dataclass(frozen=True)
+class Command:
+    module: str  # only imported when the command is run
+    description: str
+
+
+COMMANDS = {
+    "convert": Command(
+        "conversions",
+        "Convert between ANM bundles and bca/bck animations, or extract ANM bundles.",
+    ),
+    "cutscene": Command(
+        "cutscene",
+        "Convert the bone order of bca/bck animations to another model, and prepare them for cutscenes.",
+    ),
+    "patch": Command(
+        "patch", "Edit animations in place, without decoding their keyframes."
+    ),
+    "validate": Command(
+        "validate",
+        "Check animations for malformed headers and tables, without decoding their keyframes.",
+    ),
+    "index": Command(
+        "index",
+        "Catalog animation metadata in a SQLite database, and query it.",
+    ),
+    "yaz0": Command("yaz0", "Compress or decompress Yaz0 and Yay0 data."),
+    "rarc": Command("rarc", "List, extract or pack RARC archives."),
+}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run `gc-anim-tool <command> [arguments]`. Only the modules of the command
+    being run are imported. Batch drivers can call this in-process with a list
+    of arguments; as with any `ArgumentParser`, bad arguments raise `SystemExit`.
+
+    Returns:
+        int: exit status of the command, 0 on success
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+
+    if not argv or argv[0] not in COMMANDS:
+        # listing the commands, or rejecting an unknown one, imports none of them
+        parser = ArgumentParser(prog="gc-anim-tool")
+        commands = parser.add_subparsers(metavar="command", required=True)
+        for name, command in COMMANDS.items():
+            commands.add_parser(name, help=command.description)
+        parser.parse_args(argv)
+        return 2
+
+    name, *arguments = argv
+    command = COMMANDS[name]
+    module = importlib.import_module(f".{command.module}", __package__)
+
+    parser = ArgumentParser(
+        prog=f"gc-anim-tool {name}", description=command.description
+    )
+    module.add_arguments(parser)
+    return module.main(parser.parse_args(arguments))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,44 +1,90 @@
+import logging
 import math
+from . import stats
+import sys
+from dataclasses import asdict, dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 from argparse import ArgumentParser
-from j3d_animation import LoopMode, J3DSkeletonAnimation
-from mod_animation import MODSkeletonAnimation, Joint
-from general_animation import scale_animation
+from .j3d_animation import LoopMode, J3DSkeletonAnimation
+from .mod_animation import MODSkeletonAnimation, Joint
+from .transforms import Pipeline
+from .curves import bake_tracks, fit_tracks
 from glob import glob
-from cutscene import sort_file
-from anm import ANM
-from dca import DCA
-from dck import DCK
-from bca import BCA
-from bck import BCK
+from .cutscene import sort_file
+from .anm import ANM, ANMReader
+from .manifest import MANIFEST_NAME, Manifest
+from .dca import DCA
+from .dck import DCK
+from .bca import BCA
+from .bck import BCK
+from .stats import FileStats
 
+logger = logging.getLogger(__name__)
 
-def convert_anm_bundle(anm: ANM, clamp: Optional[float] = None) -> list[BCA | BCK]:
-    out = []
-    for anim in anm.animations:
+
+def convert_anm_bundle(
+    anm: ANM, clamp: Optional[float] = None, pipeline: Optional[Pipeline] = None
+) -> list[BCA | BCK]:
+    return list(iter_anm_bundle(anm.animations, clamp, pipeline))
+
+
+def iter_anm_bundle(
+    animations: Iterable[DCA | DCK],
+    clamp: Optional[float] = None,
+    pipeline: Optional[Pipeline] = None,
+) -> Iterator[BCA | BCK]:
+    """Convert animations one at a time. Given an `ANMReader`, each animation
+    is only decoded when it is reached, so only one is held at once."""
+    for anim in animations:
         if isinstance(anim, DCA):
-            out.append(dca_to_bca(anim))
+            yield dca_to_bca(anim, pipeline)
         elif isinstance(anim, DCK):
-            out.append(dck_to_bck(anim, clamp))
+            yield dck_to_bck(anim, clamp, pipeline)
 
-    return out
 
-
-def dca_to_bca(dca: DCA) -> BCA:
+def dca_to_bca(dca: DCA, pipeline: Optional[Pipeline] = None) -> BCA:
+    """`pipeline` holds any extra per-key edits, which are fused into the conversion pass."""
     name = Path(dca.name).stem
-    dca.convert_rotations()
     dca.sort_joints()
+    Pipeline().wrapped_degrees().extend(pipeline).run(dca.joints)
     return BCA(name, dca.duration, LoopMode.LOOP, dca.joints)  # type: ignore
 
 
-def dck_to_bck(dck: DCK, clamp: Optional[float] = None) -> BCK:
+def dck_to_bck(
+    dck: DCK, clamp: Optional[float] = None, pipeline: Optional[Pipeline] = None
+) -> BCK:
+    """`pipeline` holds any extra per-key edits, which are fused into the conversion pass."""
     name = Path(dck.name).stem
-    dck.convert_rotations(clamp)
     dck.sort_joints()
-    dck.fix_tangents()
+    steps = Pipeline().degrees().clamp_rotations(clamp).tangents_per_frame()
+    steps.extend(pipeline).run(dck.joints)
     return BCK(name, dck.duration, LoopMode.LOOP, dck.joints)  # type: ignore
 
+
+def bca_to_bck(
+    bca: BCA, tolerance: float = 0.01, pipeline: Optional[Pipeline] = None
+) -> BCK:
+    """Fit Hermite keys to the baked channels of `bca`, each within `tolerance`
+    of the original in its own units, degrees for rotations. Needs NumPy."""
+    Pipeline().extend(pipeline).run(bca.tracks)
+
+    # fitting keeps the range of every rotation, and so the BCK's angle scale
+    angle_scale = BCK(bca.name, bca.duration, bca.loop_mode, bca.tracks).angle_scale
+    with stats.stage("transform"):
+        fit_tracks(bca.tracks, tolerance, angle_scale)
+    return BCK(bca.name, bca.duration, bca.loop_mode, bca.tracks)
+
+
+def bck_to_bca(bck: BCK, fps: float = 30.0, pipeline: Optional[Pipeline] = None) -> BCA:
+    """Bake `bck` to one value per frame at `fps`. Needs NumPy."""
+    Pipeline().extend(pipeline).run(bck.tracks)
+    with stats.stage("transform"):
+        tracks, duration = bake_tracks(bck.tracks, bck.duration, fps)
+    return BCA(bck.name, duration, bck.loop_mode, tracks)
+
+
 def convert_tracks_to_joints(anim: J3DSkeletonAnimation) -> list[Joint]:
     joints = list[Joint]()
     for i, track in enumerate(anim.tracks):
@@ -50,15 +96,15 @@ def convert_tracks_to_joints(anim: J3DSkeletonAnimation) -> list[Joint]:
 
     return joints
 
-def bca_to_dca(bca: BCA) -> DCA:
-    bca.convert_rotations()
+
+def bca_to_dca(bca: BCA, pipeline: Optional[Pipeline] = None) -> DCA:
+    Pipeline().radians().extend(pipeline).run(bca.tracks)
     joints = convert_tracks_to_joints(bca)
     return DCA(bca.name, bca.duration, joints)
 
 
-def bck_to_dck(bck: BCK) -> DCK:
-    bck.convert_rotations()
-    bck.fix_tangents()
+def bck_to_dck(bck: BCK, pipeline: Optional[Pipeline] = None) -> DCK:
+    Pipeline().radians().tangents_per_second().extend(pipeline).run(bck.tracks)
     joints = convert_tracks_to_joints(bck)
     return DCK(bck.name, bck.duration, joints)
 
@@ -92,11 +138,165 @@ def write_rotations_to_file(
             f.write("\n")
 
 
+@dataclass
+class ConversionJob:
+    """One animation to convert and write. `source` is the path of a BCA/BCK
+    file or, when `entry` is set, of the ANM bundle holding that entry. Jobs
+    only carry paths, so each animation is read by the process handling it
+    and released once written. Without `convert`, the animation is written
+    out unchanged. With `tolerance` set, BCA files are fitted to BCK instead
+    of converted to DCA, and with `fps` set, BCK files are baked to BCA
+    instead of converted to DCK."""
+
+    name: str
+    source: Path
+    output: Path
+    entry: Optional[str] = None
+    convert: bool = True
+    clamp: Optional[float] = None
+    scale: float = 1.0
+    tolerance: Optional[float] = None
+    fps: Optional[float] = None
+
+
+@lru_cache(maxsize=4)
+def open_bundle(path: Path) -> ANMReader:
+    """Bundle index shared by every job of a process that reads from `path`."""
+    return ANMReader(path)
+
+
+@dataclass
+class ConversionResult:
+    name: str
+    output: Optional[Path] = None
+    error: Optional[str] = None
+    stats: Optional[FileStats] = None
+
+
+def run_conversion(job: ConversionJob) -> ConversionResult:
+    """Convert and write a single animation. Errors are returned rather than
+    raised, so one bad file does not stop the rest of a batch."""
+    with stats.collect(job.name) as file_stats:
+        result = _run_conversion(job)
+    result.stats = file_stats
+    return result
+
+
+def _run_conversion(job: ConversionJob) -> ConversionResult:
+    try:
+        if job.entry is not None:
+            source = open_bundle(job.source).read(job.entry)
+        else:
+            source = sort_file(job.source)
+
+        # pipelines hold closures, so they are built here rather than pickled
+        pipeline = Pipeline().scale_translations(job.scale)
+        if not job.convert:
+            path = source.write_to_path(job.output)
+        elif isinstance(source, DCA):
+            path = dca_to_bca(source, pipeline).write(job.output)
+        elif isinstance(source, DCK):
+            path = dck_to_bck(source, job.clamp, pipeline).write(job.output)
+        elif isinstance(source, BCA) and job.tolerance is not None:
+            path = bca_to_bck(source, job.tolerance, pipeline).write(job.output)
+        elif isinstance(source, BCA):
+            path = bca_to_dca(source, pipeline).write_to_path(job.output)
+        elif isinstance(source, BCK) and job.fps is not None:
+            path = bck_to_bca(source, job.fps, pipeline).write(job.output)
+        elif isinstance(source, BCK):
+            path = bck_to_dck(source, pipeline).write_to_path(job.output)
+        else:
+            raise TypeError(f"Unsupported animation type: {type(source).__name__}")
+    except Exception as error:
+        return ConversionResult(job.name, error=f"{type(error).__name__}: {error}")
+
+    return ConversionResult(job.name, Path(path))
+
+
+def run_conversions(
+    jobs: list[ConversionJob], workers: int = 1
+) -> Iterator[ConversionResult]:
+    """Run `jobs` over `workers` processes. Results are yielded in the order of
+    `jobs`, whichever worker finishes first. Each job's animation is read,
+    converted, written and released before the next is read, so memory use
+    follows the largest animation rather than the whole batch."""
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield run_conversion(job)
+        return
+
+    # multiprocessing is slow to import, so it is only imported when used
+    from concurrent.futures import ProcessPoolExecutor
+
+    # workers are not recycled with `max_tasks_per_child`, which deadlocks the
+    # pool once the first worker retires on Python 3.11
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        yield from executor.map(run_conversion, jobs)
+
+
+def job_fingerprint(job: ConversionJob, manifest: Manifest) -> str:
+    """Hash of everything the output of `job` depends on: the contents of its
+    animation, which for an ANM entry is only that entry, and its options."""
+    if job.entry is not None:
+        source = manifest.hash_bytes(open_bundle(job.source).raw(job.entry))
+    else:
+        source = manifest.hash_file(job.source)
+    return manifest.fingerprint(source, asdict(job))
+
+
+def run_incremental(
+    jobs: list[ConversionJob], manifest: Manifest, workers: int = 1
+) -> Iterator[ConversionResult]:
+    """Run the jobs whose inputs or options changed since their outputs were
+    recorded in `manifest`, and record the outputs of those that succeed.
+    Jobs that are up to date are skipped without a result."""
+    fingerprints = dict[str, str]()
+    pending = list[ConversionJob]()
+    for job in jobs:
+        key = f"{job.output}/{job.name}"
+        fingerprints[key] = job_fingerprint(job, manifest)
+        if not manifest.is_current(key, fingerprints[key]):
+            pending.append(job)
+
+    if len(pending) < len(jobs):
+        logger.info(f"{len(jobs) - len(pending)} animation(s) up to date")
+
+    try:
+        for job, result in zip(pending, run_conversions(pending, workers)):
+            if result.error is None:
+                key = f"{job.output}/{job.name}"
+                manifest.record(key, fingerprints[key], [result.output])  # type: ignore
+            yield result
+    finally:
+        manifest.save()
+
+
+def report_conversions(
+    results: Iterator[ConversionResult], collected: Optional[list[FileStats]] = None
+) -> int:
+    """Log one line per result and return the number of failed conversions.
+    The stats of each result are appended to `collected`, if given."""
+    failures = 0
+    for result in results:
+        if result.error is not None:
+            failures += 1
+            logger.error(f"{result.name}: FAILED: {result.error}")
+        else:
+            logger.info(f"{result.name}: {result.output}")
+
+        if collected is not None and result.stats is not None:
+            collected.append(result.stats)
+
+    if failures > 0:
+        logger.error(f"{failures} conversion(s) failed")
+    return failures
+
+
 INPUT = Path("./input/")
 OUTPUT = Path("./output/")
 
-if __name__ == "__main__":
-    parser = ArgumentParser()
+
+def add_arguments(parser: ArgumentParser):
     parser.add_argument("-i", "--input", type=str, help="<Optional> Input file path.")
     parser.add_argument("-o", "--output", type=str, help="<Optional> Output path.")
     parser.add_argument(
@@ -117,11 +317,58 @@ if __name__ == "__main__":
         action="store_true",
         help="<Optional> Using this argument will convert bck/bca anims in the `input` folder to dca/dck and pack them into an ANM bundle.",
     )
+    parser.add_argument(
+        "--fit_bck",
+        type=float,
+        metavar="TOLERANCE",
+        help="<Optional> Fit keyframes to the bca anims in the `input` folder and store them as bck. TOLERANCE is the largest error allowed, in degrees for rotations. Requires NumPy.",
+    )
+    parser.add_argument(
+        "--bake_bca",
+        type=float,
+        nargs="?",
+        const=30.0,
+        metavar="FPS",
+        help="<Optional> Bake the bck anims in the `input` folder to bca, sampled FPS times per second (30 by default), and store them in `output`. Requires NumPy.",
+    )
+    parser.add_argument(
+        "-a",
+        "--animation",
+        action="append",
+        help="<Optional> Name of an animation in the ANM bundle to use, instead of all of them. Can be given more than once.",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        default=1,
+        type=int,
+        help="<Optional> Number of processes to convert animations with.",
+    )
+    parser.add_argument(
+        "--stats",
+        choices=("text", "json"),
+        help="<Optional> Print per-file counters and stage timings once done.",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="count",
+        default=0,
+        help="<Optional> Log each converted file. Give twice to also log table sizes.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=f"<Optional> Skip animations whose input and options are unchanged since they were last converted, as recorded in {MANIFEST_NAME} in the output folder.",
+    )
 
-    args = parser.parse_args()
+
+def main(args) -> int:
+    stats.configure_logging(args.verbose)
 
     if args.input != None and args.input != "":
-        anm = ANM.from_filepath(rf"{args.input}")
+        bundle = Path(rf"{args.input}")
+        names = args.animation or open_bundle(bundle).names()
 
         output = Path(rf"{args.input}").parent
         if args.output != None and args.output != "":
@@ -132,21 +379,46 @@ if __name__ == "__main__":
         clamp = None
         if len(args.convert_to_bcx) > 0:
             clamp = args.convert_to_bcx[0]
-        anims = convert_anm_bundle(anm, clamp)
-        for anim in anims:
-            scale_animation(anim.tracks, args.scale)
-            anim.write(output)
+        jobs = [
+            ConversionJob(name, bundle, output, name, True, clamp, args.scale)
+            for name in names
+        ]
     elif args.convert_to_dcx:
-        for type in (".bca", ".bck"):
-            paths = glob(rf"{INPUT}/*{type}")
-            for path in paths:
-                anim = sort_file(Path(path))
-                if isinstance(anim, BCA):
-                    output_anim = bca_to_dca(anim)
-                    output_anim.write_to_path(OUTPUT)
-                elif isinstance(anim, BCK):
-                    output_anim = bck_to_dck(anim)
-                    output_anim.write_to_path(OUTPUT)
+        output = OUTPUT
+        jobs = [
+            ConversionJob(Path(path).name, Path(path), output)
+            for type in (".bca", ".bck")
+            for path in sorted(glob(rf"{INPUT}/*{type}"))
+        ]
+    elif args.fit_bck is not None:
+        output = OUTPUT
+        jobs = [
+            ConversionJob(Path(path).name, Path(path), output, tolerance=args.fit_bck)
+            for path in sorted(glob(rf"{INPUT}/*.bca"))
+        ]
+    elif args.bake_bca is not None:
+        output = OUTPUT
+        jobs = [
+            ConversionJob(Path(path).name, Path(path), output, fps=args.bake_bca)
+            for path in sorted(glob(rf"{INPUT}/*.bck"))
+        ]
+    else:
+        jobs = [ConversionJob(name, bundle, output, name, False) for name in names]
+
+    if args.incremental:
+        manifest = Manifest(output / MANIFEST_NAME)
+        results = run_incremental(jobs, manifest, args.jobs)
     else:
-        for anim in anm.animations:
-            anim.write_to_path(output)
+        results = run_conversions(jobs, args.jobs)
+
+    collected = list[FileStats]()
+    failures = report_conversions(results, collected)
+    if args.stats is not None:
+        stats.print_report(collected, args.stats)
+    return 1 if failures > 0 else 0
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    add_arguments(parser)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,376 @@
+from functools import lru_cache
+from .general_animation import Channel, JointTrack
+from .simplify import ReductionReport
+from .transforms import KINDS
+from typing import Optional
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, but curve fitting needs it
+    np = None
+
+# longest segment, in frames, a fitted key may stand in for
+MAX_SPAN = 64
+# segment length tried first, before the full `MAX_SPAN`
+SHORT_SPAN = 8
+# channels fitted together in one batch, which bounds the size of the arrays
+BATCH_SIZE = 256
+
+
+def _require_numpy():
+    if np is None:
+        raise ModuleNotFoundError("NumPy is required for curve fitting and evaluation")
+
+
+@lru_cache(maxsize=1)
+def _hermite_basis():
+    """Hermite basis functions for a segment of every length from 1 to
+    `MAX_SPAN` frames, at every whole frame offset into it. Tangent terms are
+    premultiplied by the segment length, as J3D tangents are per frame."""
+    lengths = np.arange(1, MAX_SPAN + 1)[:, None]
+    offsets = np.arange(MAX_SPAN + 1)[None, :]
+    t = offsets / lengths
+    t2 = t * t
+    t3 = t2 * t
+
+    interior = (offsets > 0) & (offsets < lengths)
+    return (
+        2 * t3 - 3 * t2 + 1,
+        (t3 - 2 * t2 + t) * lengths,
+        3 * t2 - 2 * t3,
+        (t3 - t2) * lengths,
+        interior,
+    )
+
+
+def _quantize(values, steps):
+    """Values of each channel as the file will store them, truncated to a
+    multiple of the channel's step, or unchanged where the step is 0."""
+    steps = steps[:, None]
+    quantized = np.trunc(values / np.where(steps > 0, steps, 1.0)) * steps
+    return np.where(steps > 0, quantized, values)
+
+
+def _segment_errors(values, key_values, in_tangents, out_tangents, rows, starts, span):
+    """Largest error of the Hermite segments of every length up to `span`
+    frames from `starts`, in each channel of `rows`, as an array of shape
+    (len(rows), span)."""
+    h00, h10, h01, h11, interior = (
+        basis[:span, : span + 1] for basis in _hermite_basis()
+    )
+    length = values.shape[1]
+    window = np.minimum(starts[:, None] + np.arange(span + 1), length - 1)
+
+    samples = values[rows[:, None], window]
+    keys = key_values[rows[:, None], window]
+    start_tangents = out_tangents[rows, starts][:, None, None]
+    end_tangents = in_tangents[rows[:, None], window][:, 1:, None]
+
+    # curves[c, d, k]: segment of length d + 1 from the start, at offset k
+    curves = (
+        h00 * keys[:, None, :1]
+        + h10 * start_tangents
+        + h01 * keys[:, 1:, None]
+        + h11 * end_tangents
+    )
+    errors = np.abs(curves - samples[:, None, :])
+    return np.where(interior, errors, 0.0).max(axis=2)
+
+
+def _select_keys(values, key_values, in_tangents, out_tangents, tolerances):
+    """Greedily pick keys for a batch of equally long baked channels. From each
+    key, the next is the furthest frame whose Hermite segment passes within
+    tolerance of every frame in between, tried for every channel and every
+    segment length at once. Segments are built from `key_values` and the
+    tangents, as they will be stored, and measured against `values`.
+
+    Returns:
+        tuple[list[list[int]], ndarray]: kept frame indices and max error, per channel
+    """
+    count, length = values.shape
+    anchors = np.zeros(count, dtype=np.intp)
+    kept = [[0] for _ in range(count)]
+    max_errors = np.zeros(count)
+
+    active = np.arange(count)
+    while active.size > 0:
+        starts = anchors[active]
+        spans = np.ones(active.size, dtype=np.intp)
+        segment_errors = np.zeros(active.size)
+
+        # most segments are short, so longer ones are only tried for the
+        # channels whose every short segment passed
+        pending = np.arange(active.size)
+        for span in (SHORT_SPAN, MAX_SPAN):
+            rows = active[pending]
+            errors = _segment_errors(
+                values,
+                key_values,
+                in_tangents,
+                out_tangents,
+                rows,
+                starts[pending],
+                span,
+            )
+            valid = errors <= tolerances[rows, None]
+            valid &= starts[pending, None] + np.arange(1, span + 1) <= length - 1
+            valid[:, 0] = True  # a segment between neighbouring frames is exact
+
+            # the longest run of valid lengths starting from one frame
+            pending_spans = np.cumprod(valid, axis=1).sum(axis=1)
+            spans[pending] = pending_spans
+            segment_errors[pending] = errors[np.arange(pending.size), pending_spans - 1]
+            pending = pending[pending_spans == span]
+            if pending.size == 0:
+                break
+
+        max_errors[active] = np.maximum(max_errors[active], segment_errors)
+        anchors[active] = starts + spans
+        for channel, anchor in zip(active, anchors[active]):
+            kept[channel].append(int(anchor))
+        active = active[anchors[active] < length - 1]
+
+    return kept, max_errors
+
+
+def _fit_batch(
+    channels: list[Channel], tolerances: list[float], steps: list[float]
+) -> tuple[list[Channel], ReductionReport]:
+    values = np.array([channel.values for channel in channels])
+    limits = np.array(tolerances)
+    quanta = np.array(steps)
+    report = ReductionReport(values.size)
+
+    # symmetric keys take the central difference as their tangent, piecewise
+    # keys the differences to either neighbour, which keeps sharp corners
+    central = np.gradient(values, axis=1)
+    differences = np.diff(values, axis=1)
+    backward = np.concatenate([differences[:, :1], differences], axis=1)
+    forward = np.concatenate([differences, differences[:, -1:]], axis=1)
+
+    key_values = _quantize(values, quanta)
+    symmetric, symmetric_errors = _select_keys(
+        values,
+        key_values,
+        _quantize(central, quanta),
+        _quantize(central, quanta),
+        limits,
+    )
+    piecewise, piecewise_errors = _select_keys(
+        values,
+        key_values,
+        _quantize(backward, quanta),
+        _quantize(forward, quanta),
+        limits,
+    )
+
+    fitted = list[Channel]()
+    for i, channel in enumerate(channels):
+        frames = np.asarray(channel.frames)
+
+        # BCK stores 3 values per symmetric key and 4 per piecewise key
+        if 4 * len(piecewise[i]) < 3 * len(symmetric[i]):
+            kept = piecewise[i]
+            in_tangents = backward[i, kept]
+            out_tangents = forward[i, kept]
+            error = piecewise_errors[i]
+        else:
+            kept = symmetric[i]
+            in_tangents = central[i, kept]
+            out_tangents = None
+            error = symmetric_errors[i]
+
+        fitted.append(
+            Channel.from_columns(
+                frames[kept], values[i, kept], in_tangents, out_tangents
+            )
+        )
+        report.keys_after += len(kept)
+        report.max_error = max(report.max_error, float(error))
+
+    return fitted, report
+
+
+def fit_channels(
+    channels: list[Channel],
+    tolerances: list[float],
+    steps: Optional[list[float]] = None,
+) -> tuple[list[Channel], ReductionReport]:
+    """Fit Hermite keys to baked channels, which hold one value per frame as
+    BCA channels do. Each fitted channel stays within its tolerance of every
+    baked frame, and is symmetric or piecewise, whichever is smaller.
+
+    Args:
+        channels (list[Channel]): baked channels
+        tolerances (list[float]): largest error allowed in each channel
+        steps (list[float], optional): step each channel's keys are truncated
+            to when written, such as a BCK angle scale, or 0 for floats
+
+    Returns:
+        tuple[list[Channel], ReductionReport]: fitted channels, in order, and what was removed
+    """
+    _require_numpy()
+    if steps is None:
+        steps = [0.0] * len(channels)
+
+    fitted: list = [None] * len(channels)
+    report = ReductionReport()
+
+    # channels of the same length are fitted together
+    batches = dict[int, list[int]]()
+    for i, channel in enumerate(channels):
+        values = channel.values
+        if len(values) == 0:
+            fitted[i] = channel[:]
+            continue
+
+        # held values are stored as a single key
+        middle = (max(values) + min(values)) / 2
+        if steps[i] > 0:
+            middle = int(middle / steps[i]) * steps[i]
+        error = max(max(values) - middle, middle - min(values))
+        if error <= tolerances[i]:
+            fitted[i] = Channel.from_columns((0,), (middle,))
+            report.add(ReductionReport(len(values), 1, error))
+        elif len(values) == 2:
+            slope = values[1] - values[0]
+            fitted[i] = Channel.from_columns(channel.frames, values, (slope, slope))
+            report.add(ReductionReport(2, 2))
+        else:
+            batches.setdefault(len(values), []).append(i)
+
+    for indices in batches.values():
+        for start in range(0, len(indices), BATCH_SIZE):
+            batch = indices[start : start + BATCH_SIZE]
+            batch_fitted, batch_report = _fit_batch(
+                [channels[i] for i in batch],
+                [tolerances[i] for i in batch],
+                [steps[i] for i in batch],
+            )
+            for i, channel in zip(batch, batch_fitted):
+                fitted[i] = channel
+            report.add(batch_report)
+
+    return fitted, report
+
+
+def fit_tracks(
+    tracks: list[JointTrack], tolerance: float, angle_scale: float = 0.0
+) -> ReductionReport:
+    """Replace every baked channel of `tracks` with fitted Hermite keys, each
+    within `tolerance` of the original in the channel's own units. Rotations
+    are fitted as they are stored with `angle_scale`, if given."""
+    _require_numpy()
+    slots = [
+        (track, kind, axis) for track in tracks for kind in KINDS for axis in "XYZ"
+    ]
+    channels = [getattr(track, kind)[axis] for track, kind, axis in slots]
+    steps = [angle_scale if kind == "rotation_keys" else 0.0 for _, kind, _ in slots]
+
+    fitted, report = fit_channels(channels, [tolerance] * len(channels), steps)
+    for (track, kind, axis), channel in zip(slots, fitted):
+        getattr(track, kind)[axis] = channel
+
+    return report
+
+
+def evaluate_channels(channels: list[Channel], frames) -> "np.ndarray":
+    """Sample keyframe channels at `frames`, all at once, with J3D Hermite
+    interpolation. Frames before the first key or after the last hold that
+    key's value. Each channel's keys must be in frame order.
+
+    Args:
+        channels (list[Channel]): channels to sample, each with at least one key
+        frames: frames to sample every channel at
+
+    Returns:
+        ndarray: sampled values, of shape (len(channels), len(frames))
+    """
+    _require_numpy()
+    frames = np.asarray(frames, dtype=float)
+
+    counts = np.array([len(channel) for channel in channels], dtype=np.intp)
+    firsts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.intp)
+    lasts = firsts + counts - 1
+
+    key_frames = np.concatenate([np.asarray(channel.frames) for channel in channels])
+    key_values = np.concatenate([np.asarray(channel.values) for channel in channels])
+    tangents = [channel.effective_tangents() for channel in channels]
+    in_tangents = np.concatenate([np.asarray(pair[0]) for pair in tangents])
+    out_tangents = np.concatenate([np.asarray(pair[1]) for pair in tangents])
+
+    # each channel's keys are moved to a range of their own, so a single
+    # sorted search finds the segment of every channel at every frame
+    low = min(key_frames.min(), frames.min())
+    spacing = max(key_frames.max(), frames.max()) - low + 1
+    channel_offsets = np.arange(len(channels)) * spacing
+    shifted_keys = key_frames - low + np.repeat(channel_offsets, counts)
+    queries = (frames - low)[None, :] + channel_offsets[:, None]
+
+    following = np.searchsorted(shifted_keys, queries, side="right")
+    start = np.clip(following - 1, firsts[:, None], lasts[:, None])
+    end = np.minimum(start + 1, lasts[:, None])
+
+    span = key_frames[end] - key_frames[start]
+    t = (frames[None, :] - key_frames[start]) / np.where(span > 0, span, 1.0)
+    t = np.where(span > 0, np.clip(t, 0.0, 1.0), 0.0)
+    t2 = t * t
+    t3 = t2 * t
+
+    return (
+        (2 * t3 - 3 * t2 + 1) * key_values[start]
+        + (t3 - 2 * t2 + t) * out_tangents[start] * span
+        + (3 * t2 - 2 * t3) * key_values[end]
+        + (t3 - t2) * in_tangents[end] * span
+    )
+
+
+def evaluate_tracks(tracks: list[JointTrack], frames) -> "np.ndarray":
+    """Sample every channel of `tracks` at `frames`.
+
+    Returns:
+        ndarray: sampled values, of shape (len(tracks), 3, 3, len(frames)),
+            indexed by track, kind as in `KINDS`, axis and frame
+    """
+    _require_numpy()
+    channels = [
+        getattr(track, kind)[axis]
+        for track in tracks
+        for kind in KINDS
+        for axis in "XYZ"
+    ]
+    samples = evaluate_channels(channels, frames)
+    return samples.reshape(len(tracks), len(KINDS), 3, -1)
+
+
+def bake_tracks(
+    tracks: list[JointTrack], duration: int, fps: float = 30.0
+) -> tuple[list[JointTrack], int]:
+    """Sample `tracks`, which play at 30 frames per second, once per frame at
+    `fps`. Channels that hold a single value keep a single key, and rotations
+    are wrapped to between -180 and 180 degrees.
+
+    Returns:
+        tuple[list[JointTrack], int]: baked tracks, and their duration in frames at `fps`
+    """
+    _require_numpy()
+    baked_duration = max(1, round(duration * fps / 30.0))
+    frames = np.arange(baked_duration) * (30.0 / fps)
+    samples = evaluate_tracks(tracks, frames)
+
+    rotations = KINDS.index("rotation_keys")
+    samples[:, rotations] = (samples[:, rotations] + 180.0) % 360.0 - 180.0
+
+    baked = list[JointTrack]()
+    for track_samples in samples:
+        track = JointTrack()
+        for kind, kind_samples in zip(KINDS, track_samples):
+            for axis, values in zip("XYZ", kind_samples):
+                if np.all(values == values[0]):
+                    values = values[:1]
+                getattr(track, kind)[axis] = Channel.from_columns(
+                    range(len(values)), values
+                )
+        baked.append(track)
+
+    return baked, baked_duration
@@ -1,102 +1,43 @@
-import binary
-import math
-from io import BufferedIOBase
+import logging
+from . import stats
+import sys
 from argparse import ArgumentParser
 from glob import glob
 from pathlib import Path
 from dataclasses import dataclass, field
-from bca import BCA
-from bck import BCK
-from general_animation import Keyframe, JointTrack, scale_animation
-from j3d_animation import J3DSkeletonAnimation
+from .bca import BCA
+from .bmd import BMDSkeleton
+from .bck import BCK
+from .general_animation import Keyframe, JointTrack
+from .j3d_animation import J3DSkeletonAnimation, LazyTracks
+from .manifest import MANIFEST_NAME, Manifest
+from .simplify import ReductionReport, reduce_hermite, reduce_linear
+from .transforms import Pipeline
+from typing import Optional
 
+logger = logging.getLogger(__name__)
 
-def get_bone_transforms(bmd_file) -> list[JointTrack]:
-    """Adapted from J3D Animation Editor by Tarsa"""
-    with open(bmd_file, "rb") as f:
-        s = f.read()
-        a = s.find("JNT1".encode())
-
-        f.seek(a + 0x08)
-        bone_count = binary.read_u16(f)
-        f.seek(a + 0x0C)
-        address = binary.read_u32(f)
-        f.seek(address + a)
-
-        tracks = list[JointTrack]()
-        for _ in range(bone_count):
-            track = JointTrack()
-            f.read(4)
-            for axis in "XYZ":
-                track.scale_keys[axis] = [Keyframe(0, binary.read_f32(f))]
-
-            for axis in "XYZ":
-                track.rotation_keys[axis] = [
-                    Keyframe(0, binary.read_u16(f) * (180.0 / 32768.0))
-                ]
-
-            f.read(2)
-            for axis in "XYZ":
-                track.translation_keys[axis] = [Keyframe(0, binary.read_f32(f))]
-
-            f.read(28)
-
-            tracks.append(track)
-
-        return tracks
-
-
-def get_bones_from_bmd(bmd_filepath: str):
-    """Adapted from J3D Animation Editor by Tarsa"""
-
-    def stringtable_from_file(f: BufferedIOBase) -> list[str]:
-        """Adapted from J3D Animation Editor by Tarsa"""
-        strings = list[str]()
-
-        start = f.tell()
 
-        string_count = binary.read_u16(f)
-        f.read(2)  # 0xFFFF
-
-        offsets = []
-        for _ in range(string_count):
-            binary.read_u16(f)
-            string_offset = binary.read_u16(f)
-            offsets.append(string_offset)
-
-        for offset in offsets:
-            f.seek(start + offset)
-
-            # Read 0-terminated string
-            string_length = 0
-            while f.read(1) != b"\x00":
-                string_length += 1
-
-            f.seek(start + offset)
-
-            if string_length == 0:
-                strings.append("")
-            else:
-                strings.append(f.read(string_length).decode("shift-jis"))
-
-        return strings
+def get_bone_transforms(bmd_file) -> list[JointTrack]:
+    return BMDSkeleton.load(bmd_file).rest_tracks()
 
-    strings = list[str]()
-    with open(bmd_filepath, "rb") as f:
-        s = f.read()
-        a = s.find("JNT1".encode())
-        f.seek(a + 0x14)
-        address = binary.read_u32(f)
-        f.seek(address + a)
-        strings = stringtable_from_file(f)
-        f.close()
 
-    return strings
+def get_bones_from_bmd(bmd_filepath: str) -> list[str]:
+    return list(BMDSkeleton.load(bmd_filepath).names)
 
 
 def align_to_skeleton(
     anim: J3DSkeletonAnimation, input_names: list[str], target_names: list[str]
 ) -> BCA | BCK:
+    if isinstance(anim.tracks, LazyTracks):
+        # reorder lazily read tracks without decoding them
+        positions = {name: i for i, name in enumerate(input_names[: len(anim.tracks)])}
+        order = [positions[name] for name in target_names if name in positions]
+        tracks = anim.tracks.select(order)
+        if isinstance(anim, BCK):
+            return BCK(anim.name, anim.duration, anim.loop_mode, tracks)  # type: ignore
+        return BCA(anim.name, anim.duration, anim.loop_mode, tracks)  # type: ignore
+
     skeleton = dict(zip(input_names, anim.tracks))
     skeleton = {name: skeleton[name] for name in target_names if name in skeleton}
 
@@ -113,15 +54,15 @@ def align_to_skeleton(
     return out_anim
 
 
-def sort_file(filepath: str | Path) -> BCK | BCA:
+def sort_file(filepath: str | Path, lazy: bool = False) -> BCK | BCA:
     with open(filepath, "rb") as f:
         magic = f.read(8).decode()
         f.close()
 
     if magic == BCA.MAGIC:
-        return BCA.from_file(filepath)
+        return BCA.from_file(filepath, lazy)
     elif magic == BCK.MAGIC:
-        return BCK.from_file(filepath)
+        return BCK.from_file(filepath, lazy)
 
     raise AssertionError("File is not BCA or BCK")
 
@@ -151,98 +92,45 @@ class AnimationEntry:
 
         self.z_movement_keys = root_translation["Z"]
 
-    # clean bck by removing duplicates
-    def get_clean_duplicates(
-        self, channel: list[Keyframe], threshold: float
-    ) -> list[Keyframe]:
-        duplicates = list[Keyframe]()
-        for i, current_key in enumerate(channel):
-            next_frame = i + 1
-            next_key = channel[next_frame % len(channel)]
-
-            # failsafe for null tangent (this happens with animations with 0 movement)
-            if isinstance(current_key.in_tangent, float) is False:
-                current_key.in_tangent = 0
-            if isinstance(next_key.in_tangent, float) is False:
-                next_key.in_tangent = 0
-
-            is_value_equal = math.isclose(
-                current_key.value, next_key.value, rel_tol=threshold
-            )
-            is_tangent_equal = math.isclose(current_key.in_tangent, next_key.in_tangent, rel_tol=threshold)  # type: ignore
-            if is_value_equal and is_tangent_equal:
-                duplicates.append(next_key)
-
-        return [key for key in channel if key not in duplicates[1:-2]]
-
-    # clean bca by taking slope between each point and comparing them with a threshold
-    def get_clean_starting_points(
-        self, channel: list[Keyframe], threshold: float
-    ) -> list[Keyframe]:
-        starting_points = list[int]([0])
-        for current_frame, current_key in enumerate(channel):
-            next_frame = current_frame + 1
-            next_key = channel[next_frame % len(channel)]
-            # get the current slope between the current frame and next frame
-            current_slope = (next_key.value - current_key.value) / (
-                next_frame - current_frame
-            )
-
-            # get the next slope between the next frame and the frame after
-            current_frame = next_frame
-            current_key = next_key
-            next_frame += 1
-            next_key = channel[next_frame % len(channel)]
-
-            next_slope = (next_key.value - current_key.value) / (
-                next_frame - current_frame
-            )
-
-            if abs(next_slope - current_slope) >= threshold:
-                starting_points.append(current_frame)
-
-        return [key for key in channel if key in starting_points]
-
-    def clean_keyframes(self, threshold=0.01):
+    def clean_keyframes(self, threshold=0.01) -> ReductionReport:
+        """Drop root motion keys that can be rebuilt from the keys around them.
+        `threshold` is relative: each channel may stray from the original by
+        that fraction of its largest value, whatever the size of the motion.
+        BCK keys keep their tangents, while the baked keys of a BCA are
+        reduced to line segments."""
         if isinstance(self.animation, BCK):
-            self.x_movement_keys = self.get_clean_duplicates(
-                self.x_movement_keys, threshold
-            )
-            self.y_movement_keys = self.get_clean_duplicates(
-                self.y_movement_keys, threshold
-            )
-            self.z_movement_keys = self.get_clean_duplicates(
-                self.z_movement_keys, threshold
-            )
-        elif isinstance(self.animation, BCA):
-            self.x_movement_keys = self.get_clean_starting_points(
-                self.x_movement_keys, threshold
-            )
-            self.y_movement_keys = self.get_clean_starting_points(
-                self.y_movement_keys, threshold
-            )
-            self.z_movement_keys = self.get_clean_starting_points(
-                self.z_movement_keys, threshold
-            )
+            reduce = reduce_hermite
+        else:
+            reduce = reduce_linear
+
+        report = ReductionReport()
+        for axis in "xyz":
+            name = f"{axis}_movement_keys"
+            channel = getattr(self, name)
+            tolerance = threshold * max(map(abs, channel.values), default=0.0)
+            channel, channel_report = reduce(channel, tolerance)
+            setattr(self, name, channel)
+            report.add(channel_report)
+        return report
 
     def __str__(self) -> str:
         x_keys = "\t" + "\n\t".join(
             [
-                f"{int(x.frame)}\t{x.value:.6f}\t{x.in_tangent*30.0:.6f}"  # type: ignore
+                f"{int(x.frame)}\t{x.value:.6f}\t{(x.in_tangent or 0.0)*30.0:.6f}"
                 for x in self.x_movement_keys
             ]
         )
 
         y_keys = "\t" + "\n\t".join(
             [
-                f"{int(y.frame)}\t{y.value:.6f}\t{y.in_tangent*30.0:.6f}"  # type: ignore
+                f"{int(y.frame)}\t{y.value:.6f}\t{(y.in_tangent or 0.0)*30.0:.6f}"
                 for y in self.y_movement_keys
             ]
         )
 
         z_keys = "\t" + "\n\t".join(
             [
-                f"{int(z.frame)}\t{z.value:.6f}\t{z.in_tangent*30.0:.6f}"  # type: ignore
+                f"{int(z.frame)}\t{z.value:.6f}\t{(z.in_tangent or 0.0)*30.0:.6f}"
                 for z in self.z_movement_keys
             ]
         )
@@ -267,8 +155,64 @@ class AnimationEntry:
 INPUT = Path("./input/")
 OUTPUT = Path("./output/")
 
-if __name__ == "__main__":
-    parser = ArgumentParser()
+
+def convert_animation(
+    path: Path,
+    target_bmd: Optional[str] = None,
+    original_bmd: Optional[str] = None,
+    prep_cutscene: Optional[list[str]] = None,
+    relative: bool = False,
+    scale: float = 1.0,
+    output: Path = OUTPUT,
+) -> list[Path]:
+    """Convert one animation the way the command line does, and return the
+    paths written. Models go through `BMDSkeleton.load`, so a long-running
+    process only parses each of them once."""
+    name = path.name
+    # most options only touch the root track, so the rest are decoded on demand
+    anim = sort_file(path, lazy=True)
+    output_anim = anim
+    outputs = list[Path]()
+    if original_bmd:
+        names_original = get_bones_from_bmd(original_bmd)
+        names_target = get_bones_from_bmd(target_bmd)  # type: ignore
+        output_anim = align_to_skeleton(anim, names_original, names_target)
+
+    if relative:
+        # disclude Y because of offset in cleaned frames and in game shadows.
+        # the root is edited before its translation is exported below
+        root = anim.tracks[0]
+        offset = Pipeline()
+        for axis in "XZ":
+            offset.offset_root(axis, root.translation_keys[axis][0].value)
+        offset.run(anim.tracks)
+
+    if prep_cutscene == [] or prep_cutscene:
+        assert target_bmd, "`target_bmd` is required for this operation."
+        rest_pose = get_bone_transforms(target_bmd)
+        y_offset = rest_pose[0].translation_keys["Y"][0].value
+        anim_entry = AnimationEntry(anim, y_offset)
+        clear_root_translation(y_offset, anim)
+
+        if "clean" in prep_cutscene:
+            report = anim_entry.clean_keyframes(float(prep_cutscene[1]))
+            logger.info(f"Cleaned {name} root motion: {report}")
+
+        anim_name = name.split(".")[0].strip()
+        translations_path = Path(rf"{output}/{anim_name}_translations.txt")
+        outputs.append(translations_path)
+        with open(translations_path, "w") as f:
+            f.write(str(anim_entry))
+        logger.info(f"Root transforms exported to {anim_name}_translations.txt")
+
+    Pipeline().scale_translations(scale).run(output_anim.tracks)
+    outputs.append(output_anim.write(rf"{output}"))
+
+    logger.info(f"{name} converted successfully...")
+    return outputs
+
+
+def add_arguments(parser: ArgumentParser):
     parser.add_argument(
         "-t",
         "--target_bmd",
@@ -300,56 +244,102 @@ if __name__ == "__main__":
         type=float,
         help="<Optional> After conversion, scale animations by a provided scale value.",
     )
+    parser.add_argument(
+        "--stats",
+        choices=("text", "json"),
+        help="<Optional> Print per-file counters and stage timings once done.",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="count",
+        default=0,
+        help="<Optional> Log each converted file. Give twice to also log table sizes.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=f"<Optional> Skip animations whose input, models and options are unchanged since they were last converted, as recorded in {MANIFEST_NAME} in the output folder.",
+    )
 
-    args = parser.parse_args()
-
-    input_animations = dict[str, J3DSkeletonAnimation]()
-    for type in (".bca", ".bck"):
-        paths = glob(rf"{INPUT}/*{type}")
-        for path in paths:
-            path = Path(path)
-            input_animations[path.name] = sort_file(path)
-
-    if args.original_bmd != "":
-        names_original = get_bones_from_bmd(args.original_bmd)
-        names_target = get_bones_from_bmd(args.target_bmd)
-
-    if args.target_bmd != "":
-        rest_pose = get_bone_transforms(args.target_bmd)
-
-    for name, anim in input_animations.items():
-        output_anim = anim
-        if args.original_bmd != "":
-            output_anim = align_to_skeleton(anim, names_original, names_target)
-
-        if args.relative:
-            # disclude Y because of offset in cleaned frames and in game shadows
-            offset: dict[str, float] = {
-                "X": anim.tracks[0].translation_keys["X"][0].value,
-                "Z": anim.tracks[0].translation_keys["Z"][0].value,
-            }
-
-            for axis in "XZ":
-                for frame in anim.tracks[0].translation_keys[axis]:
-                    frame.value -= offset[axis]
-
-        if args.prep_cutscene == [] or args.prep_cutscene:
-            assert args.target_bmd != "", "`target_bmd` is required for this operation."
-            y_offset = rest_pose[0].translation_keys["Y"][0].value
-            anim_entry = AnimationEntry(anim, y_offset)
-            clear_root_translation(y_offset, anim)
-
-            if "clean" in args.prep_cutscene:
-                anim_entry.clean_keyframes(float(args.prep_cutscene[1]))
+    parser.add_argument(
+        "-w",
+        "--watch",
+        action="store_true",
+        help="<Optional> Keep running, and convert each animation in the `input` folder as soon as it is saved.",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        help="<Optional> With --watch, also accept conversion requests as JSON lines on this local TCP port.",
+    )
 
-            anim_name = name.split(".")[0].strip()
-            with open(rf"{OUTPUT}/{anim_name}_translations.txt", "w") as f:
-                f.write(str(anim_entry))
-            print(f"Root transforms exported to {anim_name}_translations.txt")
 
-        scale_animation(output_anim.tracks, args.scale)
-        output_anim.write(rf"{OUTPUT}")
+def main(args) -> int:
+    # watching is pointless without seeing what was converted
+    stats.configure_logging(max(args.verbose, 1) if args.watch else args.verbose)
+
+    options = {
+        "target_bmd": args.target_bmd,
+        "original_bmd": args.original_bmd,
+        "prep_cutscene": args.prep_cutscene,
+        "relative": args.relative,
+        "scale": args.scale,
+    }
+    models = [bmd for bmd in (args.target_bmd, args.original_bmd) if bmd]
+
+    # parse the models before any animation, so that a bad model fails early
+    for bmd in models:
+        BMDSkeleton.load(bmd)
+
+    if args.watch:
+        from .watch import Watch  # imported here, as it is only used when watching
+
+        def convert(path: Path) -> list[Path]:
+            return convert_animation(path, **options)
+
+        Watch(convert, INPUT, ("*.bca", "*.bck"), models, args.port).run()
+        return 0
+
+    # animations are read one at a time, as they are converted
+    input_paths = [
+        Path(path) for type in (".bca", ".bck") for path in glob(rf"{INPUT}/*{type}")
+    ]
+
+    manifest = None
+    if args.incremental:
+        manifest = Manifest(OUTPUT / MANIFEST_NAME)
+        model_hashes = [manifest.hash_file(bmd) for bmd in models]
+
+    collected = list[stats.FileStats]()
+    try:
+        for path in input_paths:
+            name = path.name
+            if manifest is not None:
+                fingerprint = manifest.fingerprint(
+                    manifest.hash_file(path), model_hashes, options
+                )
+                if manifest.is_current(name, fingerprint):
+                    logger.info(f"{name} is up to date")
+                    continue
+
+            with stats.collect(name) as file_stats:
+                outputs = convert_animation(path, **options)
+            collected.append(file_stats)
+
+            if manifest is not None:
+                manifest.record(name, fingerprint, outputs)
+    finally:
+        # keep what was converted before a failure, as `run_incremental` does
+        if manifest is not None:
+            manifest.save()
+    logger.info("All animations converted successfully!")
+    if args.stats is not None:
+        stats.print_report(collected, args.stats)
+    return 0
 
-        print(f"{name} converted successfully...")
 
-    print("All animations converted successfully!")
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    add_arguments(parser)
+    sys.exit(main(parser.parse_args()))
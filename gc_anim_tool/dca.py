@@ -1,23 +1,19 @@
-import math
-import binary
-import general_animation
 from pathlib import PurePath
 from dataclasses import dataclass
-from mod_animation import MODSkeletonAnimation, Keyframe
-from io import BufferedIOBase
+from .general_animation import Channel, ChannelPool
+from .mod_animation import MODSkeletonAnimation
+from .transforms import Pipeline
+from typing import Sequence
 
 
 @dataclass
 class DCA(MODSkeletonAnimation):
+    CHANNEL_DESCRIPTOR_SIZE = 2
+
     def convert_rotations(self):
-        for joint in self.joints:
-            for axis in "XYZ":
-                rotations = joint.rotation_keys[axis]
-                for key in rotations:
-                    key.value = math.atan2(math.sin(key.value), math.cos(key.value))
-                    key.value = math.degrees(key.value)
-
-    def write_to_path(self, filepath: str | PurePath):
+        Pipeline().wrapped_degrees().run(self.joints)
+
+    def write_to_path(self, filepath: str | PurePath) -> PurePath:
         extension = ".dca"
 
         if extension in self.name:
@@ -25,31 +21,26 @@ class DCA(MODSkeletonAnimation):
 
         path = PurePath(f"{filepath}/{self.name}{extension}")
         with open(path, "wb") as f:
-            self.write(f)
+            self.write_stream(f)
 
-    @staticmethod
-    def read_keyframes(
-        f: BufferedIOBase, channel_values: list[float]
-    ) -> list[Keyframe]:
-        keyframe_count = binary.read_u32(f)
-        data_index = binary.read_u32(f)
+        return path
 
-        if keyframe_count == 1:
-            # return an identity keyframe, will always have a time value of zero
-            return [Keyframe(0, channel_values[data_index])]
+    @staticmethod
+    def channel_span(descriptor: Sequence[int]) -> tuple[int, int]:
+        keyframe_count, data_index = descriptor
+        return (keyframe_count, 1)
 
-        key_data = list[Keyframe]()
-        for i in range(keyframe_count):
-            key_data.append(Keyframe(i, channel_values[data_index + i]))
+    @staticmethod
+    def read_keyframes(
+        descriptor: Sequence[int], channel_values: Sequence[float]
+    ) -> Channel:
+        keyframe_count, data_index = descriptor
 
-        return key_data
+        return Channel.from_table(channel_values, data_index, keyframe_count)
 
     def write_keyframes(
-        self, f: BufferedIOBase, key_data: list[Keyframe], channel_values: list[float]
-    ):
-        channel_sequence = [key.value for key in key_data]
-
-        data_index = general_animation.find_sequence(channel_values, channel_sequence)
+        self, key_data: Channel, channel_values: ChannelPool
+    ) -> tuple[int, ...]:
+        data_index = channel_values.add(key_data.values)
 
-        binary.write_u32(f, len(key_data))
-        binary.write_u32(f, data_index)
+        return (len(key_data), data_index)
@@ -1,43 +1,107 @@
+import math
+from array import array
+from collections.abc import MutableSequence
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Callable, Iterable, Iterator, Optional, Sequence
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, batches fall back to `array`
+    np = None
 
-def find_sequence(in_list: list, seq: list) -> int:
-    """Adapted from J3D Animation Editor by Tarsa, this function
-    will find a start index to a sequence of data within a larger list,
-    if the sequence of data is not unique to the larger list.
+MISSING = math.nan  # stored in place of a missing tangent
 
-    Args:
-        in_list (list): list to find a sequence within
-        seq (list): sequence of data to find
 
-    Returns:
-        int: Index where `seq` starts inside `in_list`
+class ChannelPool:
+    """Data table shared by the channels of an animation, which stores each
+    channel's values only once. A channel is first looked up by its exact
+    contents, then as a substring of the whole table through a suffix
+    automaton, so it is reused wherever it already appears (including across
+    the boundary of two earlier channels) and only appended when it does not.
     """
-    matchup = 0
-    start = -1
 
-    started = False
+    def __init__(self):
+        self.data = list()
+        self.hits = 0  # channels that were found instead of appended
 
-    for i, val in enumerate(in_list):
-        if val != seq[matchup]:
-            matchup = 0
-            start = -1
-            started = False
-            continue
+        self._channels = dict[tuple, int]()
 
-        if not started:
-            start = i
-            started = True
+        # suffix automaton over `data`, state 0 being the empty sequence
+        self._next = [dict()]
+        self._link = [-1]
+        self._length = [0]
+        self._end = [-1]  # index of the last value of each state's first occurrence
+        self._last = 0
 
-        matchup += 1
-        if matchup == len(seq):
-            return start
+    def __len__(self) -> int:
+        return len(self.data)
 
-    start = len(in_list)
-    in_list.extend(seq)
+    def add(self, sequence: Sequence) -> int:
+        """Find `sequence` within the table, appending it if it is not there yet.
 
-    return start
+        Args:
+            sequence (Sequence): channel values to store
+
+        Returns:
+            int: Index where `sequence` starts inside the table
+        """
+        key = tuple(sequence)
+        index = self._channels.get(key)
+        if index is None:
+            index = self._find(key)
+        if index is None:
+            index = len(self.data)
+            for value in key:
+                self._extend(value)
+        else:
+            self.hits += 1
+
+        self._channels[key] = index
+        return index
+
+    def _find(self, sequence: tuple) -> Optional[int]:
+        state = 0
+        for value in sequence:
+            state = self._next[state].get(value)
+            if state is None:
+                return None
+
+        return self._end[state] - len(sequence) + 1
+
+    def _extend(self, value):
+        position = len(self.data)
+        self.data.append(value)
+
+        current = len(self._next)
+        self._next.append(dict())
+        self._link.append(0)
+        self._length.append(self._length[self._last] + 1)
+        self._end.append(position)
+
+        state = self._last
+        while state != -1 and value not in self._next[state]:
+            self._next[state][value] = current
+            state = self._link[state]
+
+        if state != -1:
+            target = self._next[state][value]
+            if self._length[state] + 1 == self._length[target]:
+                self._link[current] = target
+            else:
+                clone = len(self._next)
+                self._next.append(dict(self._next[target]))
+                self._link.append(self._link[target])
+                self._length.append(self._length[state] + 1)
+                self._end.append(self._end[target])
+
+                while state != -1 and self._next[state].get(value) == target:
+                    self._next[state][value] = clone
+                    state = self._link[state]
+
+                self._link[target] = clone
+                self._link[current] = clone
+
+        self._last = current
 
 
 class TangentMode:
@@ -85,23 +149,419 @@ class Keyframe:
         return out
 
 
-@dataclass
+def _key_columns(key) -> tuple[float, float, float, float]:
+    in_tangent = MISSING if key.in_tangent is None else key.in_tangent
+    out_tangent = MISSING if key.out_tangent is None else key.out_tangent
+    return (key.frame, key.value, in_tangent, out_tangent)
+
+
+class KeyframeView:
+    """`Keyframe` stored at `index` of a `Channel`. Setting an attribute writes
+    straight through to the channel's columns."""
+
+    __slots__ = ("channel", "index")
+
+    __hash__ = None  # type: ignore
+
+    def __init__(self, channel: "Channel", index: int):
+        self.channel = channel
+        self.index = index
+
+    @property
+    def frame(self) -> float:
+        return self.channel.frames[self.index]
+
+    @frame.setter
+    def frame(self, frame: float):
+        self.channel.frames[self.index] = frame
+
+    @property
+    def value(self) -> float:
+        return self.channel.values[self.index]
+
+    @value.setter
+    def value(self, value: float):
+        self.channel.values[self.index] = value
+
+    @property
+    def in_tangent(self) -> Optional[float]:
+        tangent = self.channel.in_tangents[self.index]
+        return None if math.isnan(tangent) else tangent
+
+    @in_tangent.setter
+    def in_tangent(self, tangent: Optional[float]):
+        self.channel.in_tangents[self.index] = MISSING if tangent is None else tangent
+
+    @property
+    def out_tangent(self) -> Optional[float]:
+        tangent = self.channel.out_tangents[self.index]
+        return None if math.isnan(tangent) else tangent
+
+    @out_tangent.setter
+    def out_tangent(self, tangent: Optional[float]):
+        self.channel.out_tangents[self.index] = MISSING if tangent is None else tangent
+
+    def to_keyframe(self) -> Keyframe:
+        return Keyframe(self.frame, self.value, self.in_tangent, self.out_tangent)
+
+    def to_f32_list(self) -> list[float]:
+        return self.to_keyframe().to_f32_list()
+
+    def to_s16_list(self, angle_scale: float) -> list[int]:
+        return self.to_keyframe().to_s16_list(angle_scale)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (Keyframe, KeyframeView)):
+            return NotImplemented
+        return self.to_keyframe() == Keyframe(
+            other.frame, other.value, other.in_tangent, other.out_tangent
+        )
+
+    def __repr__(self) -> str:
+        return repr(self.to_keyframe())
+
+
+class Channel(MutableSequence):
+    """Keyframes of one animated axis, stored as contiguous frame, value and
+    tangent columns. Missing tangents are stored as NaN. Indexing returns a
+    `KeyframeView`, so the channel can be used like a `list[Keyframe]`."""
+
+    __slots__ = ("frames", "values", "in_tangents", "out_tangents")
+
+    def __init__(self, keys: Iterable = ()):
+        self.frames = array("d")
+        self.values = array("d")
+        self.in_tangents = array("d")
+        self.out_tangents = array("d")
+        self.extend(keys)
+
+    @classmethod
+    def from_columns(
+        cls,
+        frames: Iterable[float],
+        values: Iterable[float],
+        in_tangents: Optional[Iterable[float]] = None,
+        out_tangents: Optional[Iterable[float]] = None,
+    ) -> "Channel":
+        channel = cls()
+        channel.frames = array("d", frames)
+        channel.values = array("d", values)
+
+        missing = array("d", [MISSING]) * len(channel.values)
+        channel.in_tangents = (
+            missing if in_tangents is None else array("d", in_tangents)
+        )
+        channel.out_tangents = (
+            array("d", missing) if out_tangents is None else array("d", out_tangents)
+        )
+
+        return channel
+
+    @classmethod
+    def from_table(
+        cls,
+        table: Sequence[float],
+        index: int,
+        count: int,
+        stride: int = 1,
+        scale: float = 1.0,
+    ) -> "Channel":
+        """Build a channel straight from a decoded data table.
+
+        Args:
+            table (Sequence[float]): decoded data table
+            index (int): index of the channel's first value in `table`
+            count (int): number of keyframes in the channel
+            stride (int): 1 for one value per frame, 3 for frame, value and
+                tangent per key, 4 for frame, value, in and out tangent per key
+            scale (float): multiplier for values and tangents, such as an angle scale
+
+        Returns:
+            Channel: the decoded keyframes
+        """
+
+        def scaled(column: Sequence[float]) -> array:
+            if scale == 1.0:
+                return array("d", column)
+            return array("d", [value * scale for value in column])
+
+        if count == 1:
+            # an identity keyframe, will always have a time value of zero
+            return cls.from_columns((0,), scaled(table[index : index + 1]))
+
+        if stride == 1:
+            return cls.from_columns(range(count), scaled(table[index : index + count]))
+
+        end = index + stride * count
+        return cls.from_columns(
+            table[index:end:stride],
+            scaled(table[index + 1 : end : stride]),
+            scaled(table[index + 2 : end : stride]),
+            scaled(table[index + 3 : end : stride]) if stride == 4 else None,
+        )
+
+    @property
+    def tangent_mode(self) -> int:
+        """Tangent mode needed to store every key of the channel."""
+        for in_tangent, out_tangent in zip(self.in_tangents, self.out_tangents):
+            if not math.isnan(out_tangent) and out_tangent != in_tangent:
+                return TangentMode.PIECEWISE
+        return TangentMode.SYMMETRIC
+
+    def effective_tangents(self) -> tuple[array, array]:
+        """In and out tangent of every key, as the curve through the keys uses
+        them. Missing in tangents are 0, missing out tangents the in tangent."""
+        in_tangents = array(
+            "d",
+            [0.0 if math.isnan(tangent) else tangent for tangent in self.in_tangents],
+        )
+        out_tangents = array(
+            "d",
+            [
+                in_tangent if math.isnan(out_tangent) else out_tangent
+                for in_tangent, out_tangent in zip(in_tangents, self.out_tangents)
+            ],
+        )
+        return in_tangents, out_tangents
+
+    def to_f32_list(self, tangent_mode: int) -> list[float]:
+        """Frame, value and tangents of every key, laid out as in BCK/DCK data
+        tables. Missing in tangents are stored as 0, missing out tangents as
+        the in tangent."""
+        stride = 3 if tangent_mode == TangentMode.SYMMETRIC else 4
+
+        in_tangents = [
+            0.0 if math.isnan(tangent) else tangent for tangent in self.in_tangents
+        ]
+
+        out = [0.0] * (len(self) * stride)
+        out[0::stride] = self.frames
+        out[1::stride] = self.values
+        out[2::stride] = in_tangents
+        if stride == 4:
+            out[3::stride] = [
+                in_tangent if math.isnan(out_tangent) else out_tangent
+                for in_tangent, out_tangent in zip(in_tangents, self.out_tangents)
+            ]
+
+        return out
+
+    def to_s16_list(self, angle_scale: float, tangent_mode: int) -> list[int]:
+        """Intended for rotation channels, as they are processed as integers and use an angle multiplier"""
+        stride = 3 if tangent_mode == TangentMode.SYMMETRIC else 4
+        return [
+            int(value) if i % stride == 0 else int(value / angle_scale)
+            for i, value in enumerate(self.to_f32_list(tangent_mode))
+        ]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Channel.from_columns(
+                self.frames[index],
+                self.values[index],
+                self.in_tangents[index],
+                self.out_tangents[index],
+            )
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Channel index out of range")
+
+        return KeyframeView(self, index)
+
+    def __setitem__(self, index, key):
+        if isinstance(index, slice):
+            keys = [view.to_keyframe() for view in self]
+            keys[index] = [
+                Keyframe(k.frame, k.value, k.in_tangent, k.out_tangent) for k in key
+            ]
+            self.clear()
+            self.extend(keys)
+            return
+
+        (
+            self.frames[index],
+            self.values[index],
+            self.in_tangents[index],
+            self.out_tangents[index],
+        ) = _key_columns(key)
+
+    def __delitem__(self, index):
+        del self.frames[index]
+        del self.values[index]
+        del self.in_tangents[index]
+        del self.out_tangents[index]
+
+    def __iter__(self) -> Iterator[KeyframeView]:
+        for i in range(len(self)):
+            yield KeyframeView(self, i)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (Channel, list)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f"Channel({[view.to_keyframe() for view in self]!r})"
+
+    def insert(self, index: int, key):
+        frame, value, in_tangent, out_tangent = _key_columns(key)
+        self.frames.insert(index, frame)
+        self.values.insert(index, value)
+        self.in_tangents.insert(index, in_tangent)
+        self.out_tangents.insert(index, out_tangent)
+
+    def pop(self, index: int = -1) -> Keyframe:
+        key = self[index].to_keyframe()
+        del self[index]
+        return key
+
+    def reverse(self):
+        self.frames.reverse()
+        self.values.reverse()
+        self.in_tangents.reverse()
+        self.out_tangents.reverse()
+
+    def clear(self):
+        del self[:]
+
+
+class ChannelSet(dict):
+    """X, Y and Z channels of a transform. Keyframe lists assigned to an axis
+    are converted to a `Channel`."""
+
+    __slots__ = ()
+
+    def __init__(self, channels: Optional[dict] = None):
+        super().__init__()
+        for axis in "XYZ":
+            self[axis] = Channel() if channels is None else channels[axis]
+
+    def __setitem__(self, axis: str, keys):
+        if not isinstance(keys, Channel):
+            keys = Channel(keys)
+        super().__setitem__(axis, keys)
+
+
+@dataclass(slots=True)
 class JointTrack:
     """SRT animation track representing a joint."""
 
-    scale_keys: dict[str, list[Keyframe]] = field(
-        init=False, default_factory=lambda: {"X": [], "Y": [], "Z": []}
-    )
-    rotation_keys: dict[str, list[Keyframe]] = field(
-        init=False, default_factory=lambda: {"X": [], "Y": [], "Z": []}
-    )
-    translation_keys: dict[str, list[Keyframe]] = field(
-        init=False, default_factory=lambda: {"X": [], "Y": [], "Z": []}
+    scale_keys: dict[str, Channel] = field(init=False, default_factory=ChannelSet)
+    rotation_keys: dict[str, Channel] = field(init=False, default_factory=ChannelSet)
+    translation_keys: dict[str, Channel] = field(init=False, default_factory=ChannelSet)
+
+    def __setattr__(self, name: str, value):
+        if name.endswith("_keys") and not isinstance(value, ChannelSet):
+            value = ChannelSet(value)
+        object.__setattr__(self, name, value)
+
+
+def hermite(
+    frame: float,
+    start_frame: float,
+    start_value: float,
+    start_tangent: float,
+    end_frame: float,
+    end_value: float,
+    end_tangent: float,
+) -> float:
+    """Value at `frame` of the J3D Hermite curve between two keys, leaving the
+    first with `start_tangent` and entering the second with `end_tangent`.
+    Tangents are in units per frame."""
+    span = end_frame - start_frame
+    t = (frame - start_frame) / span
+    t2 = t * t
+    t3 = t2 * t
+    return (
+        (2 * t3 - 3 * t2 + 1) * start_value
+        + (t3 - 2 * t2 + t) * start_tangent * span
+        + (3 * t2 - 2 * t3) * end_value
+        + (t3 - t2) * end_tangent * span
     )
 
 
+class _ScalarMath:
+    """Scalar stand-ins for the NumPy functions used by channel transforms."""
+
+    abs = staticmethod(abs)
+    radians = staticmethod(math.radians)
+    degrees = staticmethod(math.degrees)
+    sin = staticmethod(math.sin)
+    cos = staticmethod(math.cos)
+    arctan2 = staticmethod(math.atan2)
+
+    @staticmethod
+    def where(condition, x, y):
+        return x if condition else y
+
+
+# transforms are written against `xp`, so the same function runs on a whole
+# NumPy batch or, without NumPy, on each value of an `array` batch
+xp = _ScalarMath if np is None else np
+
+
+def track_channels(tracks: Iterable[JointTrack], *kinds: str) -> list[Channel]:
+    """Every channel of `tracks` of the given kinds, such as "rotation_keys"."""
+    return [
+        getattr(track, kind)[axis]
+        for track in tracks
+        for kind in kinds
+        for axis in "XYZ"
+    ]
+
+
+class ChannelBatch:
+    """One column of many channels gathered into a single flat array, so that a
+    transform runs as one array operation over all of them instead of key by key.
+    """
+
+    def __init__(self, channels: Iterable[Channel], column: str = "values"):
+        self.columns = [getattr(channel, column) for channel in channels]
+
+    def gather(self):
+        if np is None:
+            flat = array("d")
+            for column in self.columns:
+                flat.extend(column)
+            return flat
+
+        if not self.columns:
+            return np.empty(0)
+        return np.concatenate(
+            [np.frombuffer(column, dtype=np.float64) for column in self.columns]
+        )
+
+    def scatter(self, flat):
+        offset = 0
+        for column in self.columns:
+            end = offset + len(column)
+            if np is None:
+                column[:] = flat[offset:end]
+            else:
+                np.frombuffer(column, dtype=np.float64)[:] = flat[offset:end]
+            offset = end
+
+    def apply(self, function: Callable):
+        """Replace the column with `function` applied to it, see `xp`."""
+        flat = self.gather()
+        if np is None:
+            flat = array("d", map(function, flat))
+        else:
+            flat = function(flat)
+        self.scatter(flat)
+
+    def max_abs(self) -> float:
+        flat = self.gather()
+        if np is None:
+            return max(map(abs, flat), default=0.0)
+        return float(np.abs(flat).max(initial=0.0))
+
+
 def scale_animation(tracks: list[JointTrack], scale: float):
-    for track in tracks:
-        for axis in "XYZ":
-            for keyframe in track.translation_keys[axis]:
-                keyframe.value *= scale
+    channels = track_channels(tracks, "translation_keys")
+    ChannelBatch(channels).apply(lambda values: values * scale)
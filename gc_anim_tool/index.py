@@ -0,0 +1,401 @@
+from . import binary
+import json
+import logging
+import sqlite3
+from . import stats
+import sys
+from .anm import ANMReader
+from argparse import ArgumentParser
+from .bca import BCA
+from .bck import BCK
+from dataclasses import dataclass
+from .dca import DCA
+from .dck import DCK
+from .general_animation import TangentMode
+from .j3d_animation import J3DDataHeader, J3DSkeletonAnimation
+from .manifest import Manifest
+from .mod_animation import MODSkeletonAnimation
+from pathlib import Path, PurePosixPath
+from .rarc import READERS, RARCArchive
+from typing import Any, Iterable
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {".bca": BCA, ".bck": BCK, ".dca": DCA, ".dck": DCK}
+ARCHIVES = (".arc", ".szs", ".rarc")
+
+DATABASE = Path("./animations.sqlite")
+
+# bump whenever the schema or what is stored in it changes, so that an index
+# built by an older version is rebuilt
+INDEX_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE sources (
+    path TEXT PRIMARY KEY,  -- animation file, bundle or archive
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    error TEXT  -- why the source could not be indexed, if it could not
+);
+CREATE TABLE animations (
+    source TEXT NOT NULL,
+    member TEXT NOT NULL,  -- path within the archive or bundle, if any
+    format TEXT NOT NULL,
+    name TEXT NOT NULL,
+    duration INTEGER NOT NULL,
+    loop_mode INTEGER,  -- bca and bck only
+    joint_count INTEGER NOT NULL,
+    scale_count INTEGER NOT NULL,
+    rotation_count INTEGER NOT NULL,
+    translation_count INTEGER NOT NULL,
+    angle_multiplier INTEGER,  -- bca and bck only
+    key_count INTEGER NOT NULL,
+    piecewise_channels INTEGER,  -- bck only
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL,  -- of the animation's own bytes
+    PRIMARY KEY (source, member)
+);
+CREATE INDEX animations_name ON animations (name);
+CREATE INDEX animations_hash ON animations (hash);
+"""
+
+COLUMNS = (
+    "source",
+    "member",
+    "format",
+    "name",
+    "duration",
+    "loop_mode",
+    "joint_count",
+    "scale_count",
+    "rotation_count",
+    "translation_count",
+    "angle_multiplier",
+    "key_count",
+    "piecewise_channels",
+    "size",
+    "hash",
+)
+
+
+def read_metadata(
+    kind: type[J3DSkeletonAnimation] | type[MODSkeletonAnimation], data
+) -> dict[str, Any]:
+    """Metadata of an animation, from its headers and track or joint table
+    alone; no keyframe is decoded."""
+    if issubclass(kind, J3DSkeletonAnimation):
+        magic = bytes(data[:8]).decode(errors="replace")
+        if magic != kind.MAGIC:
+            raise ValueError(f"Expected {kind.MAGIC} data, found {magic!r}")
+
+        fields = kind.SECTION_FIELDS.unpack_from(
+            data, kind.Header.SIZE + J3DDataHeader.SIZE
+        )
+        loop_mode, angle_multiplier, duration, joint_count, *counts = fields[:7]
+        stride = kind.CHANNEL_DESCRIPTOR_SIZE
+        descriptors = binary.unpack_table(
+            data, kind.Header.SIZE + fields[7], joint_count * 9 * stride, "H"
+        )
+        key_count = sum(descriptors[::stride])
+        piecewise_channels = None
+        if stride == 3:  # BCK
+            piecewise_channels = descriptors[2::3].count(TangentMode.PIECEWISE)
+    else:
+        joint_count = binary.U32.unpack_from(data, 0x00)[0]
+        duration = binary.U32.unpack_from(data, 0x04)[0]
+        loop_mode = angle_multiplier = piecewise_channels = None
+
+        # scales, rotations and translations, each prefixed by its count
+        counts = list[int]()
+        position = 0x08
+        for _ in range(3):
+            counts.append(binary.U32.unpack_from(data, position)[0])
+            position += 4 + counts[-1] * 4
+
+        joint_size = 2 + 9 * kind.CHANNEL_DESCRIPTOR_SIZE
+        joint_data = binary.unpack_table(data, position, joint_count * joint_size, "I")
+        key_count = kind.count_keys(joint_data)
+
+    scale_count, rotation_count, translation_count = counts
+    return {
+        "format": kind.__name__.lower(),
+        "duration": duration,
+        "loop_mode": loop_mode,
+        "joint_count": joint_count,
+        "scale_count": scale_count,
+        "rotation_count": rotation_count,
+        "translation_count": translation_count,
+        "angle_multiplier": angle_multiplier,
+        "key_count": key_count,
+        "piecewise_channels": piecewise_channels,
+        "size": len(data),
+        "hash": Manifest.hash_bytes(data),
+    }
+
+
+def describe(member: str, data) -> list[dict[str, Any]]:
+    """Metadata of each animation of a file's contents, by the file's path:
+    one for a bca, bck, dca or dck, and one per entry for an anm bundle."""
+    path = PurePosixPath(member)
+    if path.suffix.lower() != ".anm":
+        row = read_metadata(FORMATS[path.suffix.lower()], data)
+        return [{"member": member, "name": path.stem, **row}]
+
+    rows = list[dict[str, Any]]()
+    with ANMReader(data) as reader:
+        for i, entry in enumerate(reader.entries):
+            row = read_metadata(entry.kind, reader.raw(i))
+            rows.append({"member": f"{member}/{entry.name}", "name": entry.name, **row})
+    return rows
+
+
+def scan_source(path: Path) -> list[dict[str, Any]]:
+    """Metadata of every animation of a file, bundle or archive. Members are
+    named by their path from the archive's root, or by the file's own name."""
+    if path.suffix.lower() not in ARCHIVES:
+        return describe(path.name, path.read_bytes())
+
+    rows = list[dict[str, Any]]()
+    with RARCArchive(path) as archive:
+        for member in archive.names(tuple(READERS)):
+            rows += describe(member, archive.read(member))
+    return rows
+
+
+def find_sources(paths: Iterable[str | Path]) -> list[Path]:
+    """Animation files, bundles and archives in `paths`, searching folders and
+    their subfolders."""
+    extensions = (*FORMATS, ".anm", *ARCHIVES)
+    sources = list[Path]()
+    for path in map(Path, paths):
+        if path.is_dir():
+            sources += sorted(
+                p
+                for p in path.rglob("*")
+                if p.suffix.lower() in extensions and p.is_file()
+            )
+        else:
+            sources.append(path)
+    return [source.resolve() for source in sources]
+
+
+@dataclass
+class IndexUpdate:
+    indexed: int = 0  # sources read, new or changed
+    unchanged: int = 0
+    removed: int = 0  # sources that no longer exist
+    failed: int = 0  # sources that could not be read
+
+
+class AnimationIndex:
+    """Catalog of animation metadata in a SQLite database, so that questions
+    about a whole corpus, like which animations have more than 60 joints, are
+    answered without reading any animation.
+
+    Each source file is only read again once its size or modification time
+    changes, as with `Manifest`.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.connection = sqlite3.connect(self.path)
+
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != INDEX_VERSION:
+            # no index yet, or one built by another version: rebuild it
+            with self.connection:
+                self.connection.execute("DROP TABLE IF EXISTS animations")
+                self.connection.execute("DROP TABLE IF EXISTS sources")
+            self.connection.executescript(SCHEMA)
+            self.connection.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+
+    def update(self, paths: Iterable[str | Path]) -> IndexUpdate:
+        """Index the sources in `paths` that are new or changed since they
+        were last indexed, and forget those that no longer exist."""
+        paths = list(map(Path, paths))
+        known = {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in self.connection.execute(
+                "SELECT path, size, mtime_ns FROM sources"
+            )
+        }
+
+        update = IndexUpdate()
+        seen = set[str]()
+        with self.connection:
+            for source in find_sources(paths):
+                key = str(source)
+                try:
+                    stat = source.stat()
+                except OSError as exception:
+                    # gone since it was found, so it is removed below if it was indexed
+                    logger.warning(f"{source.name}: skipped: {exception}")
+                    continue
+
+                seen.add(key)
+                if known.get(key) == (stat.st_size, stat.st_mtime_ns):
+                    update.unchanged += 1
+                    continue
+
+                error = None
+                try:
+                    rows = scan_source(source)
+                except Exception as exception:
+                    rows = []
+                    error = f"{type(exception).__name__}: {exception}"
+                    update.failed += 1
+                    logger.error(f"{source.name}: FAILED: {error}")
+                else:
+                    logger.info(f"{source.name}: {len(rows)} animation(s)")
+
+                self._remove(key)
+                self.connection.execute(
+                    "INSERT INTO sources VALUES (?, ?, ?, ?)",
+                    (key, stat.st_size, stat.st_mtime_ns, error),
+                )
+                self.connection.executemany(
+                    f"INSERT INTO animations VALUES ({', '.join('?' * len(COLUMNS))})",
+                    [
+                        tuple(row[column] for column in COLUMNS)
+                        for row in ({"source": key, **row} for row in rows)
+                    ],
+                )
+                update.indexed += 1
+
+            # sources under the indexed folders that are gone
+            roots = [path.resolve() for path in paths]
+            removed = [
+                key
+                for key in known
+                if key not in seen
+                and any(Path(key).is_relative_to(root) for root in roots)
+            ]
+            for key in removed:
+                self._remove(key)
+            update.removed = len(removed)
+
+        return update
+
+    def _remove(self, source: str):
+        self.connection.execute("DELETE FROM animations WHERE source = ?", (source,))
+        self.connection.execute("DELETE FROM sources WHERE path = ?", (source,))
+
+    def query(self, sql: str, parameters: Iterable = ()) -> sqlite3.Cursor:
+        """Run a read-only query. Statements that would change the index are
+        refused by SQLite."""
+        self.connection.execute("PRAGMA query_only = ON")
+        try:
+            return self.connection.execute(sql, tuple(parameters))
+        finally:
+            self.connection.execute("PRAGMA query_only = OFF")
+
+    def where(self, condition: str) -> sqlite3.Cursor:
+        """Every animation matching an SQL condition on the columns of
+        `COLUMNS`, like `joint_count > 60`."""
+        return self.query(
+            f"SELECT {', '.join(COLUMNS)} FROM animations WHERE {condition} "
+            "ORDER BY source, member"
+        )
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self) -> "AnimationIndex":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def print_rows(cursor: sqlite3.Cursor, as_json: bool = False):
+    """Print the result of a query, as tab-separated columns under a header
+    line, or as a JSON list of objects."""
+    columns = [description[0] for description in cursor.description]
+    if as_json:
+        print(json.dumps([dict(zip(columns, row)) for row in cursor], indent=1))
+        return
+
+    print("\t".join(columns))
+    for row in cursor:
+        print("\t".join("" if value is None else str(value) for value in row))
+
+
+def add_arguments(parser: ArgumentParser):
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        help="<Optional> Animation files, anm bundles, archives, or folders to search for them, to index.",
+    )
+    parser.add_argument(
+        "-d",
+        "--database",
+        default=DATABASE,
+        type=Path,
+        help="<Optional> SQLite database of the index. `animations.sqlite` by default.",
+    )
+    parser.add_argument(
+        "-w",
+        "--where",
+        type=str,
+        help='<Optional> List the animations matching an SQL condition, like "joint_count > 60".',
+    )
+    parser.add_argument(
+        "--sql",
+        type=str,
+        help="<Optional> Run any read-only SQL query on the index and list the result.",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="<Optional> List query results as JSON, rather than tab-separated columns.",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="count",
+        default=0,
+        help="<Optional> Log each indexed file.",
+    )
+
+
+def main(args) -> int:
+    stats.configure_logging(args.verbose)
+
+    with AnimationIndex(args.database) as index:
+        update = IndexUpdate()
+        if args.paths:
+            update = index.update(args.paths)
+            logger.info(
+                f"{update.indexed} file(s) indexed, {update.unchanged} unchanged, "
+                f"{update.removed} removed"
+            )
+
+        try:
+            if args.where is not None:
+                print_rows(index.where(args.where), args.json)
+            if args.sql is not None:
+                print_rows(index.query(args.sql), args.json)
+            if not args.paths and args.where is None and args.sql is None:
+                print_rows(
+                    index.query(
+                        "SELECT format, COUNT(*) AS animations FROM animations "
+                        "GROUP BY format ORDER BY format"
+                    ),
+                    args.json,
+                )
+        except sqlite3.Error as error:
+            logger.error(f"Query failed: {error}")
+            return 1
+
+    if update.failed > 0:
+        logger.error(f"{update.failed} file(s) could not be indexed")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(
+        description="Catalog animation metadata in a SQLite database, and query it."
+    )
+    add_arguments(parser)
+    sys.exit(main(parser.parse_args()))
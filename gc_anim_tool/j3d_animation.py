@@ -1,37 +1,46 @@
+import logging
 import math
-import binary
-from general_animation import Keyframe, JointTrack
-from dataclasses import dataclass, field
+import struct
+from . import binary
+from . import stats
+from array import array
+from collections.abc import MutableSequence
+from .general_animation import (
+    Channel,
+    ChannelPool,
+    Keyframe,
+    JointTrack,
+    track_channels,
+)
+from dataclasses import dataclass
 from io import BufferedIOBase
 from pathlib import Path
+from typing import Optional, Sequence
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
 class J3DDataHeader:
+    SIZE = 0x08
+
     signature: str = ""
     size: int = 0
-    _section_start: int = field(init=False)
-    _size_offset: int = field(init=False)
 
     @classmethod
-    def from_file(cls, signature: str, f: BufferedIOBase):
-        kind = f.read(len(signature)).decode()
+    def unpack_from(cls, signature: str, buffer, offset: int = 0):
+        end = offset + len(signature)
+        kind = bytes(buffer[offset:end]).decode()
         assert kind == signature
 
-        size = binary.read_u32(f)
+        size = binary.U32.unpack_from(buffer, end)[0]
 
         return cls(kind, size)
 
-    def write(self, f: BufferedIOBase):
-        self._section_start = f.tell()
-        f.write(self.signature.encode())
-        self._size_offset = f.tell()
-        binary.write_u32(f, self.size)
-
-    def write_size(self, f: BufferedIOBase):
-        self.size = f.tell()
-        f.seek(self._size_offset)
-        binary.write_u32(f, self.size - self._section_start)
+    def pack_into(self, buffer: bytearray, offset: int):
+        signature = self.signature.encode()
+        buffer[offset : offset + len(signature)] = signature
+        binary.U32.pack_into(buffer, offset + len(signature), self.size)
 
 
 class LoopMode:
@@ -44,32 +53,144 @@ class LoopMode:
     MIRRORED_LOOP = 4
 
 
+class LazyTracks(MutableSequence):
+    """Tracks of an animation read with `lazy=True`. Only the track table is
+    decoded up front; each track's channels are decoded from the data tables
+    the first time the track is accessed. Tracks that were never accessed are
+    written by copying their table data as it is, without decoding it.
+
+    Iterating, like any other access, decodes every track it reaches.
+    """
+
+    def __init__(
+        self,
+        reader: "J3DSkeletonAnimation",
+        descriptors: Sequence[int],
+        tables: tuple[Sequence, Sequence, Sequence],
+    ):
+        self.reader = reader  # animation the tables were read from
+        self.angle_scale = reader.angle_scale  # of the rotation table
+        self.descriptors = descriptors
+        self.tables = tables  # scales, rotations, translations
+
+        self._size = 9 * reader.CHANNEL_DESCRIPTOR_SIZE  # descriptors per track
+        # position of each track in the track table, or the track itself once
+        # one is assigned. Decoded tracks are shared with every `select` view
+        self._items: list[int | JointTrack] = list(
+            range(len(descriptors) // self._size)
+        )
+        self._decoded = dict[int, JointTrack]()
+
+    def raw(self, index: int) -> Optional[Sequence[int]]:
+        """Channel descriptors of a track that has not been decoded yet, or
+        None once it has been."""
+        item = self._items[index]
+        if not isinstance(item, int) or item in self._decoded:
+            return None
+        start = item * self._size
+        return self.descriptors[start : start + self._size]
+
+    def decoded(self) -> list[JointTrack]:
+        """Every track decoded so far."""
+        return [self[i] for i in range(len(self)) if self.raw(i) is None]
+
+    def select(self, indices: Sequence[int]) -> "LazyTracks":
+        """Tracks at `indices`, in that order, without decoding any of them.
+        Both sequences hold the same track objects."""
+        tracks = LazyTracks(self.reader, self.descriptors, self.tables)
+        tracks.angle_scale = self.angle_scale
+        tracks._items = [self._items[i] for i in indices]
+        tracks._decoded = self._decoded
+        return tracks
+
+    def rotation_max_abs(self) -> float:
+        """Largest absolute rotation value, in degrees, of the tracks that have
+        not been decoded yet."""
+        reader = self.reader
+        stride = reader.CHANNEL_DESCRIPTOR_SIZE
+        rotations = self.tables[1]
+
+        max_abs = 0
+        for i in range(len(self)):
+            descriptors = self.raw(i)
+            if descriptors is None:
+                continue
+            for position in range(stride, self._size, 3 * stride):
+                descriptor = descriptors[position : position + stride]
+                length, value_stride = reader.channel_span(descriptor)
+                start = descriptor[1]
+                first = start + (1 if value_stride > 1 else 0)
+                values = rotations[first : start + length : value_stride]
+                max_abs = max(max_abs, max(map(abs, values), default=0))
+
+        return max_abs * self.angle_scale
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+
+        item = self._items[index]
+        if not isinstance(item, int):
+            return item
+
+        track = self._decoded.get(item)
+        if track is None:
+            start = item * self._size
+            descriptors = self.descriptors[start : start + self._size]
+            track = self.reader.read_track(descriptors, self.tables)
+            self._decoded[item] = track
+        return track
+
+    def __setitem__(self, index, track):
+        if isinstance(index, slice):
+            for i, item in zip(range(len(self))[index], track, strict=True):
+                self._items[i] = item
+            return
+
+        self._items[index] = track
+
+    def __delitem__(self, index):
+        del self._items[index]
+
+    def insert(self, index: int, track: JointTrack):
+        self._items.insert(index, track)
+
+
 @dataclass
 class J3DSkeletonAnimation:
     """Base for J3D skeleton animation formats."""
 
     @dataclass
     class Header(J3DDataHeader):
+        SIZE = 0x20
+
         section_count: int = 1
 
         @classmethod
-        def from_file(cls, signature: str, f: BufferedIOBase):
-            header = super().from_file(signature, f)
+        def unpack_from(cls, signature: str, buffer, offset: int = 0):
+            header = super().unpack_from(signature, buffer, offset)
 
-            header.section_count = binary.read_u32(f)
+            # svn/svr data and sound section offset follow, and are skipped
+            header.section_count = binary.U32.unpack_from(buffer, offset + 0x0C)[0]
             assert header.section_count == 1
 
-            f.read(16)  # skip svn/svr data and sound section offset
-
             return header
 
-        def write(self, f: BufferedIOBase):
-            super().write(f)
-            binary.write_u32(f, self.section_count)
-            f.write(b"\xff" * 16)  # padding for svn/svr data and sound section offset
+        def pack_into(self, buffer: bytearray, offset: int):
+            super().pack_into(buffer, offset)
+            binary.U32.pack_into(buffer, offset + 0x0C, self.section_count)
+            # padding for svn/svr data and sound section offset
+            buffer[offset + 0x10 : offset + 0x20] = b"\xff" * 16
+
+    # loop mode, angle multiplier, duration, track and SRT counts, table offsets
+    SECTION_FIELDS = struct.Struct(">BbHHHHHIIII")
 
     MAGIC = ""
     SECTION = ""
+    CHANNEL_DESCRIPTOR_SIZE = 0  # u16 fields per channel in the track table
 
     name: str
     duration: int
@@ -88,170 +209,290 @@ class J3DSkeletonAnimation:
         self.angle_scale = float(2**angle_multiplier) * (180.0 / 32768.0)
 
     def read_channel(
-        self, f: BufferedIOBase, channel_data: list[float]
-    ) -> list[Keyframe]:
+        self, descriptor: Sequence[int], channel_data: Sequence[float]
+    ) -> Channel:
         """Child classes should implement this function. Meant to read scale and translation channels, as in BCA/BCK they are processed as floats."""
-        return []
+        return Channel()
 
     def read_rotation(
-        self, f: BufferedIOBase, channel_data: list[int]
-    ) -> list[Keyframe]:
+        self, descriptor: Sequence[int], channel_data: Sequence[int]
+    ) -> Channel:
         """Child classes should implement this function. Meant to read the rotation channels, as in BCA/BCK they are processed as shorts with an angle scale modifier."""
-        return []
+        return Channel()
 
     def write_channel(
-        self, f: BufferedIOBase, key_data: list[Keyframe], channel_data: list[float]
-    ):
-        """Child classes should implement this function. Meant to write scale and translation channels, as in BCA/BCK they are processed as floats."""
-        return []
+        self, key_data: Channel, channel_data: ChannelPool
+    ) -> tuple[int, ...]:
+        """Child classes should implement this function. Meant to write scale and translation channels, as in BCA/BCK they are processed as floats. Returns the channel's descriptor fields for the track table."""
+        return ()
 
     def write_rotation(
-        self, f: BufferedIOBase, key_data: list[Keyframe], channel_data: list[int]
-    ):
-        """Child classes should implement this function. Meant to write the rotation channels, as in BCA/BCK they are processed as shorts with an angle scale modifier."""
-        return []
+        self, key_data: Channel, channel_data: ChannelPool
+    ) -> tuple[int, ...]:
+        """Child classes should implement this function. Meant to write the rotation channels, as in BCA/BCK they are processed as shorts with an angle scale modifier. Returns the channel's descriptor fields for the track table."""
+        return ()
 
     def get_angle_multiplier(self) -> int: ...
 
-    def _read_data_section(self, f: BufferedIOBase):
-        J3DDataHeader.from_file(self.SECTION, f)
-
-        self.loop_mode = binary.read_u8(f)
+    @staticmethod
+    def channel_span(descriptor: Sequence[int]) -> tuple[int, int]:
+        """Child classes should implement this function. Returns how many table
+        values a channel's descriptor covers, and how many of them each key takes."""
+        return (0, 1)
+
+    def read_track(
+        self, descriptors: Sequence[int], tables: tuple[Sequence, Sequence, Sequence]
+    ) -> JointTrack:
+        """Decode a track from its 9 channel descriptors and the data tables."""
+        scale_data, rotation_data, translation_data = tables
+        stride = self.CHANNEL_DESCRIPTOR_SIZE
+
+        track = JointTrack()
+        for j, axis in enumerate("XYZ"):
+            position = 3 * j * stride
+            scale, rotation, translation = (
+                descriptors[position + k * stride : position + (k + 1) * stride]
+                for k in range(3)
+            )
+            track.scale_keys[axis] = self.read_channel(scale, scale_data)
+            track.rotation_keys[axis] = self.read_rotation(rotation, rotation_data)
+            track.translation_keys[axis] = self.read_channel(
+                translation, translation_data
+            )
+
+        stats.count(
+            "keys_read",
+            sum(
+                len(getattr(track, kind)[axis])
+                for kind in ("scale_keys", "rotation_keys", "translation_keys")
+                for axis in "XYZ"
+            ),
+        )
+        return track
+
+    def copy_track(
+        self,
+        descriptors: Sequence[int],
+        tables: tuple[Sequence, Sequence, Sequence],
+        pools: tuple[ChannelPool, ChannelPool, ChannelPool],
+    ) -> array:
+        """Store the channels of an undecoded track in `pools`, straight from the
+        data `tables` they were read from, and return the track's descriptors."""
+        stride = self.CHANNEL_DESCRIPTOR_SIZE
+
+        copied = array("H")
+        for channel, position in enumerate(range(0, len(descriptors), stride)):
+            descriptor = descriptors[position : position + stride]
+            kind = channel % 3  # scale, rotation, translation
+            length, _ = self.channel_span(descriptor)
+            start = descriptor[1]
+            index = pools[kind].add(tables[kind][start : start + length])
+            copied.extend((descriptor[0], index, *descriptor[2:]))
+
+        return copied
+
+    @stats.stage("parse")
+    def _read_data_section(self, buffer, offset: int, lazy: bool = False):
+        """Decode the data section at `offset` of a bytes-like object. Tables
+        are decoded straight from `buffer`, and no reference to it is kept."""
+        J3DDataHeader.unpack_from(self.SECTION, buffer, offset)
+
+        (
+            self.loop_mode,
+            angle_multiplier,
+            self.duration,
+            track_count,
+            scale_count,
+            rotation_count,
+            translation_count,
+            *table_offsets,
+        ) = self.SECTION_FIELDS.unpack_from(buffer, offset + J3DDataHeader.SIZE)
 
-        angle_multiplier = binary.read_s8(f)
         if angle_multiplier == -1:
             angle_multiplier = 0
         self.angle_scale = float(2**angle_multiplier) * (180.0 / 32768.0)
-        print(f"Read angle_multiplier: {angle_multiplier}")
+        logger.debug(f"Read angle_multiplier: {angle_multiplier}")
 
-        self.duration = binary.read_u16(f)
+        logger.debug(f"Read scale_count: {scale_count}")
+        logger.debug(f"Read rotation_count: {rotation_count}")
+        logger.debug(f"Read translation_count: {translation_count}")
 
-        track_count = binary.read_u16(f)
-        scale_count = binary.read_u16(f)
-        rotation_count = binary.read_u16(f)
-        translation_count = binary.read_u16(f)
-
-        print(f"Read scale_count: {scale_count}")
-        print(f"Read rotation_count: {rotation_count}")
-        print(f"Read translation_count: {translation_count}")
+        # table offsets are relative to the start of the section
+        tracks_offset, scales_offset, rotations_offset, translations_offset = (
+            offset + table_offset for table_offset in table_offsets
+        )
 
-        # 32 is added to each offset to skip the padding data between each table
-        tracks_offset = binary.read_u32(f) + 32
-        scales_offset = binary.read_u32(f) + 32
-        rotations_offset = binary.read_u32(f) + 32
-        translations_offset = binary.read_u32(f) + 32
+        scale_data = binary.unpack_table(buffer, scales_offset, scale_count, "f")
+        rotation_data = binary.unpack_table(
+            buffer, rotations_offset, rotation_count, "h"
+        )
+        translation_data = binary.unpack_table(
+            buffer, translations_offset, translation_count, "f"
+        )
 
-        scale_data = binary.read_f32_table(f, scales_offset, scale_count)
-        rotation_data = binary.read_s16_table(f, rotations_offset, rotation_count)
-        translation_data = binary.read_f32_table(
-            f, translations_offset, translation_count
+        stride = self.CHANNEL_DESCRIPTOR_SIZE
+        descriptors = binary.unpack_table(
+            buffer, tracks_offset, track_count * 9 * stride, "H"
         )
+        stats.count("tables_read", 4)
+
+        tables = (scale_data, rotation_data, translation_data)
+        if lazy:
+            self.tracks = LazyTracks(self, descriptors, tables)  # type: ignore
+            return
 
         # populate tracks with Keyframe channels, per axis
-        f.seek(tracks_offset)
-        scale_temp, rotation_temp, translation_temp = (0, 0, 0)
-        for _ in range(track_count):
-            track = JointTrack()
-            for axis in "XYZ":
-                track.scale_keys[axis] = self.read_channel(f, scale_data)
-                scale_temp += len(track.scale_keys[axis])
-                track.rotation_keys[axis] = self.read_rotation(f, rotation_data)
-                rotation_temp += len(track.rotation_keys[axis])
-                track.translation_keys[axis] = self.read_channel(f, translation_data)
-                translation_temp += len(track.translation_keys[axis])
-            self.tracks.append(track)
-        print(f"Actual scale_count: {scale_temp}")
-        print(f"Actual rotation_count: {rotation_temp}")
-        print(f"Actual translation_count: {translation_temp}")
-
-    def _write_data_section(self, f: BufferedIOBase):
-        section_start = f.tell()
-        header = J3DDataHeader(self.SECTION)
-        header.write(f)
-
-        binary.write_u8(f, self.loop_mode)
-        binary.write_s8(f, self.get_angle_multiplier())
-        print(f"Written angle_multiplier: {self.get_angle_multiplier()}")
-        binary.write_u16(f, self.duration)
-
-        tracks_count = len(self.tracks)
-        binary.write_u16(f, tracks_count)
-
-        count_offset_start = f.tell()
-        # placeholders for SRT counts
-        for _ in range(3):
-            binary.write_u16(f, 0)
-
-        data_offset_start = f.tell()
-        # placeholder u32s for data offsets
-        for _ in range(4):
-            binary.write_u32(f, 0)
-
-        binary.write_padding(f, 32)
-        tracks_offset = f.tell()
-
-        scale_data = list[float]()
-        rotation_data = list[int]()
-        translation_data = list[float]()
-
-        for track in self.tracks:
-            for axis in "XYZ":
-                self.write_channel(f, track.scale_keys[axis], scale_data)
-                self.write_rotation(f, track.rotation_keys[axis], rotation_data)
-                self.write_channel(f, track.translation_keys[axis], translation_data)
-
-        binary.write_padding(f, 32)
-        scales_offset = f.tell()
-        binary.write_f32_table(f, scale_data)
-
-        binary.write_padding(f, 32)
-        rotations_offset = f.tell()
-        binary.write_s16_table(f, rotation_data)
-
-        binary.write_padding(f, 32)
-        translations_offset = f.tell()
-        binary.write_f32_table(f, translation_data)
-
-        binary.write_padding(f, 32)
-
-        section_end = f.tell()
-        header.write_size(f)
-
-        f.seek(count_offset_start)
-        binary.write_u16(f, len(scale_data))
-        binary.write_u16(f, len(rotation_data))
-        binary.write_u16(f, len(translation_data))
-
-        print(f"Written scale_data: {len(scale_data)}")
-        print(f"Written rotation_data: {len(rotation_data)}")
-        print(f"Written translation_data: {len(translation_data)}")
-
-        f.seek(data_offset_start)
-        binary.write_u32(f, tracks_offset - section_start)
-        binary.write_u32(f, scales_offset - section_start)
-        binary.write_u32(f, rotations_offset - section_start)
-        binary.write_u32(f, translations_offset - section_start)
-
-        f.seek(section_end)
-
-    def write(self, filepath: Path | str):
+        for i in range(0, len(descriptors), 9 * stride):
+            self.tracks.append(self.read_track(descriptors[i : i + 9 * stride], tables))
+
+        if logger.isEnabledFor(logging.DEBUG):
+            for kind in ("scale", "rotation", "translation"):
+                channels = track_channels(self.tracks, f"{kind}_keys")
+                logger.debug(f"Actual {kind}_count: {sum(map(len, channels))}")
+
+    @stats.stage("serialize")
+    def _write_data_section(self, offset: int) -> bytearray:
+        """Lay out the data section at `offset` of a newly allocated file buffer.
+        The bytes before `offset` are left for the file header."""
+        angle_multiplier = self.get_angle_multiplier()
+        logger.debug(f"Written angle_multiplier: {angle_multiplier}")
+
+        descriptors = array("H")
+        scale_data = ChannelPool()
+        rotation_data = ChannelPool()
+        translation_data = ChannelPool()
+
+        # untouched tracks of a lazily read animation are copied as they are,
+        # as long as their rotations are stored with the same angle scale
+        tracks = self.tracks
+        lazy = isinstance(tracks, LazyTracks) and tracks.angle_scale == self.angle_scale
+        pools = (scale_data, rotation_data, translation_data)
+
+        with stats.stage("pool"):
+            for i in range(len(tracks)):
+                raw = tracks.raw(i) if lazy else None  # type: ignore
+                if raw is not None:
+                    descriptors.extend(self.copy_track(raw, tracks.tables, pools))  # type: ignore
+                    continue
+
+                track = tracks[i]
+                for axis in "XYZ":
+                    descriptors.extend(
+                        self.write_channel(track.scale_keys[axis], scale_data)
+                    )
+                    descriptors.extend(
+                        self.write_rotation(track.rotation_keys[axis], rotation_data)
+                    )
+                    descriptors.extend(
+                        self.write_channel(
+                            track.translation_keys[axis], translation_data
+                        )
+                    )
+
+        logger.debug(f"Written scale_data: {len(scale_data)}")
+        logger.debug(f"Written rotation_data: {len(rotation_data)}")
+        logger.debug(f"Written translation_data: {len(translation_data)}")
+        stats.count(
+            "dedup_hits", scale_data.hits + rotation_data.hits + translation_data.hits
+        )
+        stats.count("keys_written", sum(descriptors[:: self.CHANNEL_DESCRIPTOR_SIZE]))
+
+        fields_offset = offset + J3DDataHeader.SIZE
+        fields_end = fields_offset + self.SECTION_FIELDS.size
+        tracks_offset = binary.align(fields_end, 32)
+        tracks_end = tracks_offset + len(descriptors) * 2
+        scales_offset = binary.align(tracks_end, 32)
+        scales_end = scales_offset + len(scale_data) * 4
+        rotations_offset = binary.align(scales_end, 32)
+        rotations_end = rotations_offset + len(rotation_data) * 2
+        translations_offset = binary.align(rotations_end, 32)
+        translations_end = translations_offset + len(translation_data) * 4
+        section_end = binary.align(translations_end, 32)
+
+        buffer = bytearray(section_end)
+        J3DDataHeader(self.SECTION, section_end - offset).pack_into(buffer, offset)
+        self.SECTION_FIELDS.pack_into(
+            buffer,
+            fields_offset,
+            self.loop_mode,
+            angle_multiplier,
+            self.duration,
+            len(self.tracks),
+            len(scale_data),
+            len(rotation_data),
+            len(translation_data),
+            tracks_offset - offset,
+            scales_offset - offset,
+            rotations_offset - offset,
+            translations_offset - offset,
+        )
+
+        binary.pack_padding_into(buffer, fields_end, tracks_offset)
+        binary.pack_table_into(buffer, tracks_offset, descriptors, "H")
+        binary.pack_padding_into(buffer, tracks_end, scales_offset)
+        binary.pack_table_into(buffer, scales_offset, scale_data.data, "f")
+        binary.pack_padding_into(buffer, scales_end, rotations_offset)
+        binary.pack_table_into(buffer, rotations_offset, rotation_data.data, "h")
+        binary.pack_padding_into(buffer, rotations_end, translations_offset)
+        binary.pack_table_into(buffer, translations_offset, translation_data.data, "f")
+        binary.pack_padding_into(buffer, translations_end, section_end)
+
+        return buffer
+
+    def _serialize(self) -> bytearray:
+        buffer = self._write_data_section(self.Header.SIZE)
+        self.Header(self.MAGIC, len(buffer)).pack_into(buffer, 0)
+        return buffer
+
+    def to_bytes(self) -> bytearray:
+        """Contents of the animation's file. The buffer it was laid out in is
+        returned as it is, without another copy."""
+        return self._serialize()
+
+    def write_stream(self, f: BufferedIOBase) -> int:
+        """Write the animation to `f` in one call. `f` does not need to be
+        seekable.
+
+        Returns:
+            int: number of bytes written
+        """
+        buffer = self.to_bytes()
+        f.write(buffer)
+        stats.count("bytes_written", len(buffer))
+        return len(buffer)
+
+    def write(self, filepath: Path | str) -> Path:
         extension = self.MAGIC.split("1")[1]
         path = Path(f"{filepath}/{self.name}.{extension}")
-        header = self.Header(self.MAGIC)
         with open(path, "wb") as f:
-            header.write(f)
-            self._write_data_section(f)
-            header.write_size(f)
+            self.write_stream(f)
 
-    @classmethod
-    def from_file(cls, filepath: str | Path):
-        path = Path(filepath)
-        name = path.stem
+        return path
 
+    @classmethod
+    def from_buffer(cls, buffer, name: str = "", offset: int = 0, lazy: bool = False):
+        """Read an animation starting at `offset` of a bytes-like object, such
+        as an mmap or a memoryview of an archive entry. Tables are decoded
+        straight from `buffer` without copying it first. With `lazy`, tracks
+        are only decoded once they are accessed, see `LazyTracks`."""
         anim = cls(name, 0, 0, [])
+        cls.Header.unpack_from(cls.MAGIC, buffer, offset)
+        anim._read_data_section(buffer, offset + cls.Header.SIZE, lazy)
+        return anim
 
-        with open(path, "rb") as f:
-            cls.Header.from_file(cls.MAGIC, f)
-            anim._read_data_section(f)
+    @classmethod
+    def from_bytes(cls, data: bytes, name: str = "", lazy: bool = False):
+        """Counterpart to `to_bytes`, see `from_buffer`."""
+        return cls.from_buffer(data, name, lazy=lazy)
 
-        return anim
+    @classmethod
+    def from_file(cls, filepath: str | Path | BufferedIOBase, lazy: bool = False):
+        """Read an animation from a path, or from the rest of an open file,
+        named after the file's `name`. With `lazy`, tracks are only decoded
+        once they are accessed, see `LazyTracks`."""
+        if isinstance(filepath, BufferedIOBase):
+            name = Path(getattr(filepath, "name", "")).stem
+            return cls.from_buffer(filepath.read(), name, lazy=lazy)
+
+        path = Path(filepath)
+        return cls.from_buffer(path.read_bytes(), path.stem, lazy=lazy)
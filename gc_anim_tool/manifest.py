@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Iterable
+
+MANIFEST_NAME = ".gc_anim_tool_manifest.json"
+
+# bump whenever a change to the tool changes what it writes, so that every
+# output recorded by an older version is rebuilt
+MANIFEST_VERSION = 1
+
+
+class Manifest:
+    """Record of the inputs and options each output was last built from, kept
+    next to the outputs, so that work whose inputs are unchanged can be
+    skipped.
+
+    Inputs are identified by a hash of their contents. The hash of each file
+    is stored along with its size and modification time, and a file is only
+    read again once either of them changes.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.files = dict[str, list]()  # path: [size, mtime_ns, digest]
+        self.entries = dict[str, dict]()  # key: fingerprint and outputs
+
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return  # no manifest yet, or an unreadable one: rebuild everything
+
+        if data.get("version") == MANIFEST_VERSION:
+            self.files = data.get("files", {})
+            self.entries = data.get("entries", {})
+
+    @staticmethod
+    def hash_bytes(data) -> str:
+        return hashlib.sha1(data).hexdigest()
+
+    def hash_file(self, filepath: str | Path) -> str:
+        """Hash of a file's contents, reused while its size and modification
+        time are unchanged."""
+        path = Path(filepath).resolve()
+        stat = path.stat()
+
+        known = self.files.get(str(path))
+        if known is not None and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return known[2]
+
+        digest = self.hash_bytes(path.read_bytes())
+        self.files[str(path)] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    @staticmethod
+    def fingerprint(*parts: Any) -> str:
+        """Hash of input hashes and options, which must be JSON serializable
+        (paths are written as strings)."""
+        text = json.dumps([MANIFEST_VERSION, *parts], sort_keys=True, default=str)
+        return hashlib.sha1(text.encode()).hexdigest()
+
+    def is_current(self, key: str, fingerprint: str) -> bool:
+        """Whether the outputs recorded for `key` were built from the same
+        fingerprint, and all of them still exist."""
+        entry = self.entries.get(key)
+        if entry is None or entry["fingerprint"] != fingerprint:
+            return False
+        return all(Path(output).exists() for output in entry["outputs"])
+
+    def record(self, key: str, fingerprint: str, outputs: Iterable[str | Path]):
+        self.entries[key] = {
+            "fingerprint": fingerprint,
+            "outputs": [str(output) for output in outputs],
+        }
+
+    def save(self):
+        """Write the manifest, replacing the old one only once fully written."""
+        data = {
+            "version": MANIFEST_VERSION,
+            "files": self.files,
+            "entries": self.entries,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.path.with_suffix(".tmp")
+        temp.write_text(json.dumps(data))
+        os.replace(temp, self.path)
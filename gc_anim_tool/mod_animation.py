@@ -1,12 +1,19 @@
+import logging
 import math
-import binary
+from . import binary
+from . import stats
+import struct
 from dataclasses import dataclass, field
-from io import BufferedIOBase, BytesIO
+from array import array
+from io import BufferedIOBase
 from pathlib import Path
-from general_animation import Keyframe, JointTrack
+from .general_animation import Channel, ChannelPool, Keyframe, JointTrack
+from typing import Sequence
 
+logger = logging.getLogger(__name__)
 
-@dataclass
+
+@dataclass(slots=True)
 class Joint(JointTrack):
     joint_index: int = 0
     parent_index: int = 0
@@ -20,6 +27,8 @@ class MODSkeletonAnimation:
 
     filesize: int = field(init=False)
 
+    CHANNEL_DESCRIPTOR_SIZE = 0  # u32 fields per channel in the joint table
+
     def convert_rotations(self): ...
 
     def sort_joints(self):
@@ -28,98 +37,195 @@ class MODSkeletonAnimation:
 
         self.joints.sort(key=get_joint_index)
 
+    @staticmethod
+    def channel_span(descriptor: Sequence[int]) -> tuple[int, int]:
+        """Child classes should implement this function. Returns how many table
+        values a channel's descriptor covers, and how many of them each key takes."""
+        return (0, 1)
+
     @staticmethod
     def read_keyframes(
-        f: BufferedIOBase, channel_values: list[float]
-    ) -> list[Keyframe]: ...
+        descriptor: Sequence[int], channel_values: Sequence[float]
+    ) -> Channel: ...
 
     def write_keyframes(
         self,
-        f: BufferedIOBase,
-        channel_keys: list[Keyframe],
-        channel_values: list[float],
-    ): ...
-
-    def write(self, f: BufferedIOBase):
-        binary.write_u32(f, len(self.joints))
-        print(f"joint_count: {len(self.joints)}")
-        binary.write_u32(f, self.duration)
-        print(f"duration: {self.duration}")
-
-        scale_data = list[float]()
-        rotation_data = list[float]()
-        translation_data = list[float]()
-
-        joint_buffer = BytesIO()
-        for joint in self.joints:
-            binary.write_u32(joint_buffer, joint.joint_index)
-            binary.write_u32(joint_buffer, joint.parent_index)
-
-            for axis in "XYZ":
-                self.write_keyframes(joint_buffer, joint.scale_keys[axis], scale_data)
-            for axis in "XYZ":
-                self.write_keyframes(
-                    joint_buffer, joint.rotation_keys[axis], rotation_data
-                )
-            for axis in "XYZ":
-                self.write_keyframes(
-                    joint_buffer, joint.translation_keys[axis], translation_data
-                )
-
-        binary.write_u32(f, len(scale_data))  # scales_count
-        print(f"scales_count: {len(scale_data)}")
-        binary.write_f32_table(f, scale_data)
-
-        binary.write_u32(f, len(rotation_data))  # rotations_count
-        print(f"rotations_count: {len(rotation_data)}")
-        binary.write_f32_table(f, rotation_data)
-
-        binary.write_u32(f, len(translation_data))  # translations_count
-        print(f"translations_count: {len(translation_data)}")
-        binary.write_f32_table(f, translation_data)
-
-        f.write(joint_buffer.getvalue())
-
-        self.filesize = f.tell()
+        channel_keys: Channel,
+        channel_values: ChannelPool,
+    ) -> tuple[int, ...]: ...
+
+    @stats.stage("serialize")
+    def _serialize(self) -> bytearray:
+        logger.debug(f"joint_count: {len(self.joints)}")
+        logger.debug(f"duration: {self.duration}")
+
+        scale_data = ChannelPool()
+        rotation_data = ChannelPool()
+        translation_data = ChannelPool()
+
+        joint_data = array("I")
+        with stats.stage("pool"):
+            for joint in self.joints:
+                joint_data.append(joint.joint_index)
+                joint_data.append(joint.parent_index)
+
+                for axis in "XYZ":
+                    joint_data.extend(
+                        self.write_keyframes(joint.scale_keys[axis], scale_data)
+                    )
+                for axis in "XYZ":
+                    joint_data.extend(
+                        self.write_keyframes(joint.rotation_keys[axis], rotation_data)
+                    )
+                for axis in "XYZ":
+                    joint_data.extend(
+                        self.write_keyframes(
+                            joint.translation_keys[axis], translation_data
+                        )
+                    )
+
+        logger.debug(f"scales_count: {len(scale_data)}")
+        logger.debug(f"rotations_count: {len(rotation_data)}")
+        logger.debug(f"translations_count: {len(translation_data)}")
+        stats.count(
+            "dedup_hits", scale_data.hits + rotation_data.hits + translation_data.hits
+        )
+        stats.count("keys_written", self.count_keys(joint_data))
+
+        # joint count, duration, then each table is prefixed by its count
+        scales_offset = 0x0C
+        rotations_offset = scales_offset + len(scale_data) * 4 + 4
+        translations_offset = rotations_offset + len(rotation_data) * 4 + 4
+        joints_offset = translations_offset + len(translation_data) * 4
+        size = joints_offset + len(joint_data) * 4
+
+        buffer = bytearray(size)
+        binary.U32.pack_into(buffer, 0x00, len(self.joints))
+        binary.U32.pack_into(buffer, 0x04, self.duration)
+        binary.U32.pack_into(buffer, scales_offset - 4, len(scale_data))
+        binary.pack_table_into(buffer, scales_offset, scale_data.data, "f")
+        binary.U32.pack_into(buffer, rotations_offset - 4, len(rotation_data))
+        binary.pack_table_into(buffer, rotations_offset, rotation_data.data, "f")
+        binary.U32.pack_into(buffer, translations_offset - 4, len(translation_data))
+        binary.pack_table_into(buffer, translations_offset, translation_data.data, "f")
+        binary.pack_table_into(buffer, joints_offset, joint_data, "I")
+
+        self.filesize = size
+
+        return buffer
+
+    def to_bytes(self) -> bytearray:
+        """Contents of the animation's file. The buffer it was laid out in is
+        returned as it is, without another copy."""
+        return self._serialize()
+
+    def write_stream(self, f: BufferedIOBase) -> int:
+        """Write the animation to `f` in one call. `f` does not need to be
+        seekable.
+
+        Returns:
+            int: number of bytes written
+        """
+        buffer = self.to_bytes()
+        f.write(buffer)
+        stats.count("bytes_written", len(buffer))
+        return len(buffer)
+
+    write = write_stream  # older name of `write_stream`
 
     def write_to_path(self, filepath: str | Path): ...
 
     @classmethod
-    def from_file(cls, f: BufferedIOBase):
-        joint_count = binary.read_u32(f)
-        duration = binary.read_u32(f)
+    def measure(cls, buffer, offset: int = 0) -> int:
+        """Size in bytes of the animation at `offset` of a bytes-like object,
+        worked out from its counts alone, without decoding any table."""
+        position = offset + 0x08
+        for _ in range(3):  # scales, rotations, translations
+            count = binary.U32.unpack_from(buffer, position)[0]
+            position += 4 + count * 4
+
+        joint_count = binary.U32.unpack_from(buffer, offset)[0]
+        joint_size = (2 + 9 * cls.CHANNEL_DESCRIPTOR_SIZE) * 4
+        return position + joint_count * joint_size - offset
 
-        scales_count = binary.read_u32(f)
-        scale_values = binary.read_f32_table(f, f.tell(), scales_count)
-
-        rotations_count = binary.read_u32(f)
-        rotation_values = binary.read_f32_table(f, f.tell(), rotations_count)
+    @classmethod
+    def count_keys(cls, joint_data: Sequence[int]) -> int:
+        """Total keyframes of the channels described by a joint table."""
+        stride = cls.CHANNEL_DESCRIPTOR_SIZE
+        joint_size = 2 + 9 * stride
+        return sum(
+            joint_data[i + 2 + channel * stride]
+            for i in range(0, len(joint_data), joint_size)
+            for channel in range(9)
+        )
 
-        translations_count = binary.read_u32(f)
-        translation_values = binary.read_f32_table(f, f.tell(), translations_count)
+    @classmethod
+    @stats.stage("parse")
+    def from_buffer(cls, buffer, name: str = "", offset: int = 0):
+        """Read an animation starting at `offset` of a bytes-like object, such
+        as an mmap or a memoryview of an archive entry. Tables are decoded
+        straight from `buffer` without copying it first."""
+        joint_count, duration = struct.unpack_from(">II", buffer, offset)
+
+        # scales, rotations and translations, each prefixed by its count
+        tables = list[array]()
+        position = offset + 0x08
+        for _ in range(3):
+            count = binary.U32.unpack_from(buffer, position)[0]
+            tables.append(binary.unpack_table(buffer, position + 4, count, "f"))
+            position += 4 + count * 4
+        scale_values, rotation_values, translation_values = tables
+
+        # each joint is its index, parent index and 9 channel descriptors
+        stride = cls.CHANNEL_DESCRIPTOR_SIZE
+        joint_size = 2 + 9 * stride
+        joint_data = binary.unpack_table(
+            buffer, position, joint_count * joint_size, "I"
+        )
+        stats.count("tables_read", 4)
 
         joints = list[Joint]()
-        for _ in range(joint_count):
-            joint_index = binary.read_u32(f)
-            parent_index = binary.read_u32(f)
+        for i in range(0, len(joint_data), joint_size):
+            joint = Joint(joint_data[i], joint_data[i + 1])
 
-            joint = Joint(joint_index, parent_index)
+            channels = (
+                joint_data[position : position + stride]
+                for position in range(i + 2, i + joint_size, stride)
+            )
             for axis in "XYZ":
-                joint.scale_keys[axis] = cls.read_keyframes(f, scale_values)
+                joint.scale_keys[axis] = cls.read_keyframes(
+                    next(channels), scale_values
+                )
             for axis in "XYZ":
-                joint.rotation_keys[axis] = cls.read_keyframes(f, rotation_values)
+                joint.rotation_keys[axis] = cls.read_keyframes(
+                    next(channels), rotation_values
+                )
             for axis in "XYZ":
-                joint.translation_keys[axis] = cls.read_keyframes(f, translation_values)
+                joint.translation_keys[axis] = cls.read_keyframes(
+                    next(channels), translation_values
+                )
 
             joints.append(joint)
+        stats.count("keys_read", cls.count_keys(joint_data))
 
-        return cls("", duration, joints)
+        return cls(name, duration, joints)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, name: str = ""):
+        """Counterpart to `to_bytes`, see `from_buffer`."""
+        return cls.from_buffer(data, name)
+
+    @classmethod
+    def from_file(cls, f: BufferedIOBase):
+        """Read an animation from an open file, leaving it positioned just
+        past the animation."""
+        start = f.tell()
+        data = f.read()
+        anim = cls.from_buffer(data)
+        f.seek(start + cls.measure(data))
+        return anim
 
     @classmethod
     def from_filepath(cls, filepath: str | Path):
         path = Path(filepath)
-        name = path.stem
-        with open(path, "rb") as f:
-            anim = cls.from_file(f)
-            anim.name = name
-        return anim
+        return cls.from_buffer(path.read_bytes(), path.stem)
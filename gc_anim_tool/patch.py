@@ -0,0 +1,320 @@
+from . import binary
+import logging
+import mmap
+from . import stats
+import struct
+import sys
+from argparse import ArgumentParser
+from array import array
+from .bca import BCA
+from .bck import BCK
+from .dca import DCA
+from .dck import DCK
+from .j3d_animation import J3DDataHeader, J3DSkeletonAnimation, LoopMode
+from pathlib import Path
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {".bca": BCA, ".bck": BCK, ".dca": DCA, ".dck": DCK}
+
+LOOP_MODES = {
+    name.lower(): value for name, value in vars(LoopMode).items() if name.isupper()
+}
+
+
+class AnimationPatch:
+    """In-place edits of a BCA, BCK, DCA or DCK file. The file is mapped into
+    memory and only the bytes of the edited fields are rewritten; keyframes are
+    never decoded, and nothing else about the file changes.
+
+    Every check runs before the first byte is written, so a refused edit leaves
+    the file as it was.
+    """
+
+    def __init__(self, filepath: str | Path):
+        self.path = Path(filepath)
+        self.kind = FORMATS.get(self.path.suffix.lower())
+        if self.kind is None:
+            raise ValueError(f"Unsupported animation type: {self.path.suffix}")
+
+        self._file = open(self.path, "r+b")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0)
+        except ValueError:
+            self._file.close()
+            raise EOFError(f"{self.path.name} is empty")
+
+        try:
+            if issubclass(self.kind, J3DSkeletonAnimation):
+                self._read_j3d_layout()
+            else:
+                self._read_mod_layout()
+        except (struct.error, EOFError) as error:
+            self.close()
+            raise EOFError(f"{self.path.name} is truncated: {error}")
+        except Exception:
+            self.close()
+            raise
+
+    def _read_j3d_layout(self):
+        data = self._map
+        kind = self.kind
+        magic = bytes(data[:8]).decode(errors="replace")
+        if magic != kind.MAGIC:  # type: ignore
+            raise ValueError(f"Expected {kind.MAGIC} data, found {magic!r}")  # type: ignore
+
+        section = J3DSkeletonAnimation.Header.SIZE
+        fields_offset = section + J3DDataHeader.SIZE
+        fields = kind.SECTION_FIELDS.unpack_from(data, fields_offset)  # type: ignore
+        track_count, scale_count, rotation_count, translation_count = fields[3:7]
+        tracks, scales, rotations, translations = (
+            section + offset for offset in fields[7:11]
+        )
+
+        self.fields = {
+            "loop_mode": (binary.U8, fields_offset),
+            "duration": (binary.U16, fields_offset + 2),
+        }
+        self.loop_mode, _, self.duration = fields[:3]
+
+        stride = kind.CHANNEL_DESCRIPTOR_SIZE
+        self.descriptors = binary.unpack_table(
+            data, tracks, track_count * 9 * stride, "H"
+        )
+        # scale, rotation and translation channel of each axis, per track
+        self.translation_channels = [
+            track + (3 * axis + 2) * stride
+            for track in range(0, len(self.descriptors), 9 * stride)
+            for axis in range(3)
+        ]
+
+        self.translations = (translations, translation_count)
+        self.other_tables = [
+            (tracks, len(self.descriptors) * 2),
+            (scales, scale_count * 4),
+            (rotations, rotation_count * 2),
+        ]
+
+    def _read_mod_layout(self):
+        data = self._map
+        joint_count, self.duration = struct.unpack_from(">II", data, 0)
+        self.loop_mode = None
+        self.fields = {"duration": (binary.U32, 0x04)}
+
+        # scales, rotations and translations, each prefixed by its count
+        tables = list[tuple[int, int]]()
+        position = 0x08
+        for _ in range(3):
+            count = binary.U32.unpack_from(data, position)[0]
+            tables.append((position + 4, count))
+            position += 4 + count * 4
+
+        stride = self.kind.CHANNEL_DESCRIPTOR_SIZE  # type: ignore
+        joint_size = 2 + 9 * stride
+        self.descriptors = binary.unpack_table(
+            data, position, joint_count * joint_size, "I"
+        )
+        # joint and parent index, then scale, rotation and translation channels
+        self.translation_channels = [
+            joint + 2 + (6 + axis) * stride
+            for joint in range(0, len(self.descriptors), joint_size)
+            for axis in range(3)
+        ]
+
+        self.translations = tables[2]
+        self.other_tables = [(offset, count * 4) for offset, count in tables[:2]]
+
+    def translation_roles(self) -> tuple[bytearray, bytearray]:
+        """Which values of the translation table channels read as key values,
+        and which as frames or tangents, as one flag byte per table value."""
+        _, count = self.translations
+        stride = self.kind.CHANNEL_DESCRIPTOR_SIZE  # type: ignore
+
+        values = bytearray(count)
+        others = bytearray(count)
+        for position in self.translation_channels:
+            descriptor = self.descriptors[position : position + stride]
+            length, value_stride = self.kind.channel_span(descriptor)  # type: ignore
+            start = descriptor[1]
+            end = start + length
+            if end > count:
+                raise ValueError(
+                    f"{self.path.name}: translation channel at {start} runs past "
+                    f"the end of its table of {count} values"
+                )
+
+            keys = length // value_stride
+            values[start + (value_stride > 1) : end : value_stride] = b"\x01" * keys
+            if value_stride > 1:
+                for column in (0, *range(2, value_stride)):  # frame, tangents
+                    others[start + column : end : value_stride] = b"\x01" * keys
+
+        return values, others
+
+    def check_translations(self) -> bytearray:
+        """Refuse to scale translations that cannot be scaled in place: table
+        values shared between a channel's values and another channel's frames
+        or tangents, or a translation table overlapping another table.
+
+        Returns:
+            bytearray: flags of the table values read as key values
+        """
+        offset, count = self.translations
+        end = offset + count * 4
+        if end > len(self._map):
+            raise EOFError(f"{self.path.name}: translation table runs past the end")
+        for other, size in self.other_tables:
+            if offset < other + size and other < end:
+                raise ValueError(
+                    f"{self.path.name}: translation table overlaps another table"
+                )
+
+        values, others = self.translation_roles()
+        shared = int.from_bytes(values, "big") & int.from_bytes(others, "big")
+        if shared:
+            raise ValueError(
+                f"{self.path.name}: {shared.bit_count()} translation value(s) are "
+                "shared with the frames or tangents of other channels"
+            )
+
+        return values
+
+    def check_field(self, name: str, value: int):
+        if name not in self.fields:
+            raise ValueError(f"{self.kind.__name__} files have no {name}")  # type: ignore
+        field, _ = self.fields[name]
+        try:
+            field.pack(value)
+        except struct.error:
+            raise ValueError(f"{name} {value} does not fit in {field.size} byte(s)")
+
+    def scale_translations(self, scale: float, values: Optional[bytearray] = None):
+        """Multiply every translation value by `scale`, as
+        `Pipeline.scale_translations` does; frames and tangents are unchanged.
+
+        Args:
+            scale (float): multiplier of the values
+            values (bytearray): result of `check_translations`, if already run
+        """
+        if values is None:
+            values = self.check_translations()
+
+        offset, count = self.translations
+        table = binary.unpack_table(self._map, offset, count, "f")
+        table = array("f", [v * scale if flag else v for v, flag in zip(table, values)])
+        self._map[offset : offset + count * 4] = binary.pack_table(table, "f")
+
+    def set_field(self, name: str, value: int):
+        self.check_field(name, value)
+        field, offset = self.fields[name]
+        field.pack_into(self._map, offset, value)  # type: ignore
+        setattr(self, name, value)
+
+    def close(self):
+        if not self._map.closed:
+            self._map.flush()
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "AnimationPatch":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def patch_file(
+    filepath: str | Path,
+    scale: Optional[float] = None,
+    loop_mode: Optional[int] = None,
+    duration: Optional[int] = None,
+):
+    """Apply every given edit to an animation in place, or none of them if any
+    is refused."""
+    fields = {"loop_mode": loop_mode, "duration": duration}
+    fields = {name: value for name, value in fields.items() if value is not None}
+
+    with AnimationPatch(filepath) as patch:
+        for name, value in fields.items():
+            patch.check_field(name, value)
+
+        if scale is not None and scale != 1.0:
+            values = patch.check_translations()
+            patch.scale_translations(scale, values)
+
+        for name, value in fields.items():
+            patch.set_field(name, value)
+
+
+def find_animations(paths: Iterable[str | Path]) -> list[Path]:
+    """Files of every supported format in `paths`, which may be folders."""
+    files = list[Path]()
+    for path in map(Path, paths):
+        if path.is_dir():
+            files += sorted(p for p in path.iterdir() if p.suffix.lower() in FORMATS)
+        else:
+            files.append(path)
+    return files
+
+
+OUTPUT = Path("./output/")
+
+
+def add_arguments(parser: ArgumentParser):
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        default=[OUTPUT],
+        help="<Optional> Animation files or folders to patch. The `output` folder by default.",
+    )
+    parser.add_argument(
+        "-s",
+        "--scale",
+        type=float,
+        help="<Optional> Scale translations by a provided scale value.",
+    )
+    parser.add_argument(
+        "--loop_mode",
+        choices=LOOP_MODES,
+        help="<Optional> Set the loop mode of bca and bck animations.",
+    )
+    parser.add_argument(
+        "--duration", type=int, help="<Optional> Set the duration, in frames."
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="count",
+        default=0,
+        help="<Optional> Log each patched file.",
+    )
+
+
+def main(args) -> int:
+    stats.configure_logging(args.verbose)
+
+    loop_mode = None if args.loop_mode is None else LOOP_MODES[args.loop_mode]
+
+    failures = 0
+    for path in find_animations(args.paths):
+        try:
+            patch_file(path, args.scale, loop_mode, args.duration)
+        except Exception as error:
+            failures += 1
+            logger.error(f"{path.name}: FAILED: {type(error).__name__}: {error}")
+            continue
+        logger.info(f"{path.name}: patched")
+
+    if failures > 0:
+        logger.error(f"{failures} file(s) could not be patched")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(
+        description="Edit animations in place, without decoding their keyframes."
+    )
+    add_arguments(parser)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,468 @@
+from . import binary
+import logging
+import mmap
+from . import stats
+import struct
+import sys
+from . import yaz0
+from .anm import ANM
+from argparse import ArgumentParser
+from .bca import BCA
+from .bck import BCK
+from dataclasses import dataclass
+from .dca import DCA
+from .dck import DCK
+from pathlib import Path, PurePosixPath
+from typing import Iterator, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# magic, file size, header size, data offset, data size, MRAM, ARAM and DVD sizes
+HEADER = struct.Struct(">4sIIIIIII")
+
+# node and entry counts and offsets, string table size and offset, file count,
+# whether file IDs match entry indices. Offsets are from the end of the header
+INFO = struct.Struct(">IIIIIIHB5x")
+
+# type, name offset, name hash, entry count, first entry index
+NODE = struct.Struct(">4sIHHI")
+
+# file ID, name hash, flags and name offset, then the file's data offset and
+# size, or for a directory its node index and the size of a node
+ENTRY = struct.Struct(">HHIII4x")
+
+ALIGNMENT = 32
+
+
+class EntryFlags:
+    FILE = 0x01
+    DIRECTORY = 0x02
+    COMPRESSED = 0x04
+    LOAD_TO_MRAM = 0x10
+    YAZ0 = 0x80
+
+
+# animation formats, by extension, all read with `from_buffer`
+READERS = {".bca": BCA, ".bck": BCK, ".anm": ANM, ".dca": DCA, ".dck": DCK}
+
+
+def name_hash(name: bytes) -> int:
+    value = 0
+    for char in name:
+        value = (value * 3 + char) & 0xFFFF
+    return value
+
+
+@dataclass(frozen=True)
+class RARCEntry:
+    path: str  # from the root folder, separated by "/"
+    offset: int  # of the file's data, within the uncompressed archive
+    size: int
+    file_id: int
+    flags: int
+
+    @property
+    def name(self) -> str:
+        return PurePosixPath(self.path).name
+
+
+class RARCArchive:
+    """Random-access view of a RARC archive, Yaz0 or Yay0 compressed or not.
+    Uncompressed archives are mapped into memory, compressed ones decompressed
+    into it; either way, no file is extracted to disk.
+
+    Files are found by their path from the root folder, or by their name alone
+    when only one file has it.
+    """
+
+    def __init__(self, filepath: str | Path):
+        self.path = Path(filepath)
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if yaz0.is_compressed(self._map):
+            data = yaz0.decompress(self._map)
+            self._map.close()
+            self._map = None
+            self._data = memoryview(data)
+        else:
+            self._data = memoryview(self._map)
+
+        self.root = ""
+        self.entries = dict[str, RARCEntry]()
+        try:
+            self._read_index()
+        except struct.error as error:
+            self.close()
+            raise EOFError(f"{self.path.name} is truncated: {error}")
+        except Exception:
+            self.close()
+            raise
+
+        self._by_name = dict[str, Optional[str]]()
+        for path, entry in self.entries.items():
+            # names shared by several files can only be found by their path
+            self._by_name[entry.name] = None if entry.name in self._by_name else path
+
+    def _read_index(self):
+        data = self._data
+        magic, _, header_size, data_offset = HEADER.unpack_from(data, 0)[:4]
+        if magic != b"RARC":
+            raise ValueError(f"{self.path.name} is not a RARC archive")
+
+        (
+            node_count,
+            node_offset,
+            _,
+            entry_offset,
+            string_size,
+            string_offset,
+        ) = INFO.unpack_from(data, header_size)[:6]
+        node_offset += header_size
+        entry_offset += header_size
+        data_offset += header_size
+        strings = bytes(data[header_size + string_offset :][:string_size])
+
+        def name_at(offset: int) -> str:
+            return strings[offset : strings.index(b"\0", offset)].decode("shift_jis")
+
+        root_name = NODE.unpack_from(data, node_offset)[1]
+        self.root = name_at(root_name)
+
+        visited = set[int]()
+
+        def walk(node: int, folder: str):
+            if node in visited or node >= node_count:
+                raise ValueError(f"{self.path.name} has a corrupt folder tree")
+            visited.add(node)
+
+            _, _, _, count, first = NODE.unpack_from(
+                data, node_offset + node * NODE.size
+            )
+            for index in range(first, first + count):
+                file_id, _, flags_and_name, offset, size = ENTRY.unpack_from(
+                    data, entry_offset + index * ENTRY.size
+                )
+                flags = flags_and_name >> 24
+                name = name_at(flags_and_name & 0xFFFFFF)
+                if flags & EntryFlags.DIRECTORY:
+                    if name not in (".", ".."):
+                        walk(offset, f"{folder}{name}/")
+                    continue
+
+                path = f"{folder}{name}"
+                start = data_offset + offset
+                if start + size > len(data):
+                    raise EOFError(f"{path} runs past the end of {self.path.name}")
+                self.entries[path] = RARCEntry(path, start, size, file_id, flags)
+
+        walk(0, "")
+
+    def names(self, extensions: Optional[tuple[str, ...]] = None) -> list[str]:
+        """Paths of every file, or of the files with one of `extensions`."""
+        return [
+            path
+            for path in self.entries
+            if extensions is None or PurePosixPath(path).suffix.lower() in extensions
+        ]
+
+    def entry(self, name: str) -> RARCEntry:
+        path = name if name in self.entries else self._by_name.get(name)
+        if path is None:
+            raise KeyError(f"No single file named {name} in {self.path}")
+        return self.entries[path]
+
+    def read(self, name: str) -> memoryview:
+        """Contents of a file, without copying them unless the file is
+        compressed on its own. The view stays valid after `close`, as the
+        archive stays mapped until every view of it is released."""
+        entry = self.entry(name)
+        view = self._data[entry.offset : entry.offset + entry.size]
+        if entry.flags & EntryFlags.COMPRESSED:
+            return memoryview(yaz0.decompress(view))
+        return view
+
+    def open(self, name: str) -> binary.BufferReader:
+        """File object over a file's contents, named after the file."""
+        return binary.BufferReader(self.read(name), self.entry(name).name)
+
+    def load(self, name: str) -> BCA | BCK | ANM | DCA | DCK:
+        """Parse an animation straight from the archive's memory."""
+        entry = self.entry(name)
+        extension = PurePosixPath(entry.path).suffix.lower()
+        if extension not in READERS:
+            raise TypeError(f"Unsupported animation type: {extension}")
+
+        data = self.read(name)
+        if extension == ".anm":
+            return ANM.from_buffer(data)
+        return READERS[extension].from_buffer(data, PurePosixPath(entry.path).stem)
+
+    def animations(self) -> Iterator[tuple[str, BCA | BCK | ANM | DCA | DCK]]:
+        """Every animation in the archive, parsed one at a time."""
+        for path in self.names(tuple(READERS)):
+            yield path, self.load(path)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.entries or self._by_name.get(name) is not None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def close(self):
+        self._data.release()
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # views from `read` are still held, the map closes with the last
+            self._map = None
+
+    def __enter__(self) -> "RARCArchive":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _StringTable:
+    def __init__(self):
+        self.data = bytearray()
+        self._offsets = dict[bytes, int]()
+
+    def add(self, name: bytes) -> int:
+        if name not in self._offsets:
+            self._offsets[name] = len(self.data)
+            self.data += name + b"\0"
+        return self._offsets[name]
+
+
+def pack_archive(
+    files: Mapping[str, bytes | bytearray | memoryview], root: str
+) -> bytearray:
+    """Lay out a RARC archive holding `files`, by their path from the root
+    folder `root`. Every file is loaded to main memory, and file IDs match
+    entry indices, as in the game's own archives.
+
+    Returns:
+        bytearray: the uncompressed archive
+    """
+    # folder tree, each folder mapping names to subfolders or file contents
+    tree = dict()
+    for path, contents in sorted(files.items()):
+        *folders, name = PurePosixPath(path).parts
+        folder = tree
+        for part in folders:
+            folder = folder.setdefault(part, dict())
+        folder[name] = contents
+
+    # folders are numbered in the order they are first reached, root first
+    folders = [(root, tree, None)]
+    for index, (_, folder, _) in enumerate(folders):  # grows while iterated
+        for child, item in folder.items():
+            if isinstance(item, dict):
+                folders.append((child, item, index))
+
+    strings = _StringTable()
+    strings.add(b".")
+    strings.add(b"..")
+
+    nodes = bytearray()
+    entries = bytearray()
+    data = bytearray()
+    entry_count = 0
+    node_indices = {id(folder): i for i, (_, folder, _) in enumerate(folders)}
+
+    def add_entry(file_id: int, name: bytes, flags: int, offset: int, size: int):
+        nonlocal entry_count
+        flags_and_name = flags << 24 | strings.add(name)
+        entries.extend(
+            ENTRY.pack(file_id, name_hash(name), flags_and_name, offset, size)
+        )
+        entry_count += 1
+
+    for index, (name, folder, parent) in enumerate(folders):
+        encoded = name.encode("shift_jis")
+        kind = b"ROOT" if index == 0 else encoded.upper()[:4].ljust(4, b" ")
+        nodes.extend(
+            NODE.pack(
+                kind,
+                strings.add(encoded),
+                name_hash(encoded),
+                len(folder) + 2,
+                entry_count,
+            )
+        )
+
+        for child, item in folder.items():
+            child_name = child.encode("shift_jis")
+            if isinstance(item, dict):
+                add_entry(
+                    0xFFFF,
+                    child_name,
+                    EntryFlags.DIRECTORY,
+                    node_indices[id(item)],
+                    NODE.size,
+                )
+                continue
+            add_entry(
+                entry_count,
+                child_name,
+                EntryFlags.FILE | EntryFlags.LOAD_TO_MRAM,
+                len(data),
+                len(item),
+            )
+            data.extend(item)
+            data.extend(bytes(binary.align(len(data), ALIGNMENT) - len(data)))
+
+        add_entry(0xFFFF, b".", EntryFlags.DIRECTORY, index, NODE.size)
+        add_entry(
+            0xFFFF,
+            b"..",
+            EntryFlags.DIRECTORY,
+            0xFFFFFFFF if parent is None else parent,
+            NODE.size,
+        )
+
+    node_offset = binary.align(INFO.size, ALIGNMENT)
+    entry_offset = binary.align(node_offset + len(nodes), ALIGNMENT)
+    string_offset = binary.align(entry_offset + len(entries), ALIGNMENT)
+    string_size = binary.align(len(strings.data), ALIGNMENT)
+    data_offset = string_offset + string_size
+    size = HEADER.size + data_offset + len(data)
+
+    buffer = bytearray(size)
+    HEADER.pack_into(
+        buffer, 0, b"RARC", size, HEADER.size, data_offset, len(data), len(data), 0, 0
+    )
+    INFO.pack_into(
+        buffer,
+        HEADER.size,
+        len(folders),
+        node_offset,
+        entry_count,
+        entry_offset,
+        string_size,
+        string_offset,
+        entry_count,
+        1,
+    )
+    for offset, table in (
+        (node_offset, nodes),
+        (entry_offset, entries),
+        (string_offset, strings.data),
+        (data_offset, data),
+    ):
+        start = HEADER.size + offset
+        buffer[start : start + len(table)] = table
+
+    return buffer
+
+
+def write_archive(
+    filepath: str | Path,
+    files: Mapping[str, bytes | bytearray | memoryview],
+    root: Optional[str] = None,
+    level: Optional[int] = None,
+) -> Path:
+    """Write `files` to a RARC archive, see `pack_archive`. The archive is Yaz0
+    compressed at `level`, or at the default level if `filepath` ends in .szs.
+    `root` defaults to the name of the archive."""
+    path = Path(filepath)
+    buffer = pack_archive(files, root or path.stem)
+    if level is None and path.suffix.lower() == ".szs":
+        level = yaz0.DEFAULT_LEVEL
+    if level is not None:
+        buffer = yaz0.yaz0_compress(buffer, level)
+
+    with open(path, "wb") as f:
+        f.write(buffer)
+    stats.count("bytes_written", len(buffer))
+    return path
+
+
+def read_folder(folder: str | Path) -> dict[str, bytes]:
+    """Contents of every file under `folder`, by their path from it."""
+    folder = Path(folder)
+    return {
+        path.relative_to(folder).as_posix(): path.read_bytes()
+        for path in sorted(folder.rglob("*"))
+        if path.is_file()
+    }
+
+
+def add_arguments(parser: ArgumentParser):
+    parser.add_argument("archive", type=str, help="RARC archive, .arc or .szs.")
+    parser.add_argument(
+        "-a",
+        "--animations",
+        action="store_true",
+        help="<Optional> Only list or extract animations.",
+    )
+    parser.add_argument(
+        "-x",
+        "--extract",
+        type=str,
+        metavar="FOLDER",
+        help="<Optional> Extract the archive's files to FOLDER.",
+    )
+    parser.add_argument(
+        "-p",
+        "--pack",
+        type=str,
+        metavar="FOLDER",
+        help="<Optional> Pack every file under FOLDER into the archive, replacing it. Archives ending in .szs are Yaz0 compressed.",
+    )
+    parser.add_argument(
+        "-l",
+        "--level",
+        type=int,
+        choices=range(yaz0.MAX_LEVEL + 1),
+        metavar="LEVEL",
+        help="<Optional> With --pack, Yaz0 compress the archive at this level.",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="count",
+        default=0,
+        help="<Optional> Log each extracted file.",
+    )
+
+
+def main(args) -> int:
+    stats.configure_logging(args.verbose)
+
+    if args.pack:
+        files = read_folder(args.pack)
+        path = write_archive(args.archive, files, level=args.level)
+        logger.info(f"{len(files)} file(s) packed into {path}")
+        return 0
+
+    extensions = tuple(READERS) if args.animations else None
+    output = None if args.extract is None else Path(args.extract).resolve()
+    status = 0
+    with RARCArchive(args.archive) as archive:
+        for name in archive.names(extensions):
+            if output is None:
+                print(f"{name}: {archive.entry(name).size} bytes")
+                continue
+
+            # names come from the archive, and must not lead out of the output folder
+            path = Path(output, name).resolve()
+            if not path.is_relative_to(output):
+                logger.error(f"{name}: skipped, outside of {args.extract}")
+                status = 1
+                continue
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(archive.read(name))
+            logger.info(f"{name}: {path}")
+
+    return status
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="List, extract or pack RARC archives.")
+    add_arguments(parser)
+    sys.exit(main(parser.parse_args()))
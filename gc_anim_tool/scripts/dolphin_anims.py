@@ -1,12 +1,9 @@
-import sys
-
-sys.path.append("./gc_anim_tool")
-from conversions import dck_to_bck
-from bck import BCK
-from dck import DCK
-from j3d_animation import LoopMode, Keyframe
-from glob import glob
 from pathlib import Path
+from ..conversions import dck_to_bck
+from ..bck import BCK
+from ..dck import DCK
+from ..j3d_animation import LoopMode, Keyframe
+from glob import glob
 
 
 def convert_good_ending():
@@ -0,0 +1,161 @@
+import math
+from dataclasses import dataclass
+from .general_animation import Channel, hermite
+
+# most keys a single curve segment is tried against, which keeps
+# `reduce_hermite` linear in the number of keys
+MAX_SPAN = 64
+
+
+@dataclass
+class ReductionReport:
+    keys_before: int = 0
+    keys_after: int = 0
+    max_error: float = 0.0
+
+    @property
+    def removed(self) -> int:
+        return self.keys_before - self.keys_after
+
+    def add(self, other: "ReductionReport") -> "ReductionReport":
+        self.keys_before += other.keys_before
+        self.keys_after += other.keys_after
+        self.max_error = max(self.max_error, other.max_error)
+        return self
+
+    def __str__(self) -> str:
+        return (
+            f"removed {self.removed} of {self.keys_before} keys, "
+            f"max error {self.max_error:.6f}"
+        )
+
+
+def reduce_linear(
+    channel: Channel, tolerance: float
+) -> tuple[Channel, ReductionReport]:
+    """Reduce baked keys, such as a BCA channel's, to the fewest line segments
+    a single greedy pass finds that stay within `tolerance` of every key. Each
+    key is visited once, so the reduction is linear in the number of keys.
+
+    Kept keys get the slopes of the segments either side as in and out
+    tangents, so the Hermite curve through them is the same polyline.
+
+    Returns:
+        tuple[Channel, ReductionReport]: reduced copy of the channel, and what was removed
+    """
+    frames, values = channel.frames, channel.values
+    count = len(channel)
+    if count <= 2:
+        return channel[:], ReductionReport(count, count)
+
+    # the slopes from the anchor that pass within `tolerance` of every key
+    # between the anchor and the candidate end narrow to [low, high]
+    kept = [0]
+    anchor = 0
+    low, high = -math.inf, math.inf
+    for end in range(2, count):
+        previous = end - 1
+        span = frames[previous] - frames[anchor]
+        low = max(low, (values[previous] - tolerance - values[anchor]) / span)
+        high = min(high, (values[previous] + tolerance - values[anchor]) / span)
+
+        slope = (values[end] - values[anchor]) / (frames[end] - frames[anchor])
+        if not low <= slope <= high:
+            kept.append(previous)
+            anchor = previous
+            low, high = -math.inf, math.inf
+    kept.append(count - 1)
+
+    report = ReductionReport(count, len(kept))
+    slopes = list[float]()
+    for start, end in zip(kept, kept[1:]):
+        slope = (values[end] - values[start]) / (frames[end] - frames[start])
+        slopes.append(slope)
+        for i in range(start + 1, end):
+            line = values[start] + slope * (frames[i] - frames[start])
+            report.max_error = max(report.max_error, abs(line - values[i]))
+
+    reduced = Channel.from_columns(
+        [frames[i] for i in kept],
+        [values[i] for i in kept],
+        [slopes[0]] + slopes,
+        slopes + [slopes[-1]],
+    )
+    return reduced, report
+
+
+def reduce_hermite(
+    channel: Channel, tolerance: float
+) -> tuple[Channel, ReductionReport]:
+    """Drop keys of a Hermite channel, such as a BCK channel's, wherever the
+    curve between the keys either side stays within `tolerance` of the
+    original. The error is measured at each dropped key and halfway between
+    each pair of original keys. Kept keys are left unchanged.
+
+    Returns:
+        tuple[Channel, ReductionReport]: reduced copy of the channel, and what was removed
+    """
+    frames, values = channel.frames, channel.values
+    in_tangents, out_tangents = channel.effective_tangents()
+    count = len(channel)
+    if count <= 2:
+        return channel[:], ReductionReport(count, count)
+
+    # the original curve halfway between each pair of keys
+    middles = [(frames[i] + frames[i + 1]) / 2 for i in range(count - 1)]
+    middle_values = [
+        hermite(
+            middles[i],
+            frames[i],
+            values[i],
+            out_tangents[i],
+            frames[i + 1],
+            values[i + 1],
+            in_tangents[i + 1],
+        )
+        for i in range(count - 1)
+    ]
+
+    def segment_error(start: int, end: int) -> float:
+        def curve(frame: float) -> float:
+            return hermite(
+                frame,
+                frames[start],
+                values[start],
+                out_tangents[start],
+                frames[end],
+                values[end],
+                in_tangents[end],
+            )
+
+        error = 0.0
+        for i in range(start, end):
+            error = max(error, abs(curve(middles[i]) - middle_values[i]))
+            if i > start:
+                error = max(error, abs(curve(frames[i]) - values[i]))
+        return error
+
+    report = ReductionReport(count)
+    kept = [0]
+    anchor = 0
+    while anchor < count - 1:
+        end = anchor + 1
+        error = 0.0
+        while end + 1 < count and end + 1 - anchor <= MAX_SPAN:
+            candidate_error = segment_error(anchor, end + 1)
+            if candidate_error > tolerance:
+                break
+            end += 1
+            error = candidate_error
+        kept.append(end)
+        report.max_error = max(report.max_error, error)
+        anchor = end
+
+    report.keys_after = len(kept)
+    reduced = Channel.from_columns(
+        [frames[i] for i in kept],
+        [values[i] for i in kept],
+        [channel.in_tangents[i] for i in kept],
+        [channel.out_tangents[i] for i in kept],
+    )
+    return reduced, report
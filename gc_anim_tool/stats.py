@@ -0,0 +1,130 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Iterable, Iterator, Optional
+
+# stages timed for each file, in the order a conversion runs through them
+STAGES = ("parse", "transform", "pool", "serialize")
+
+
+@dataclass
+class FileStats:
+    """Counters and per-stage timings of one file's trip through the tool."""
+
+    name: str = ""
+    tables_read: int = 0
+    keys_read: int = 0
+    keys_written: int = 0
+    dedup_hits: int = 0  # channels found in a data table instead of appended
+    bytes_written: int = 0
+    seconds: dict[str, float] = field(default_factory=dict)  # by stage
+
+    def add(self, other: "FileStats") -> "FileStats":
+        self.tables_read += other.tables_read
+        self.keys_read += other.keys_read
+        self.keys_written += other.keys_written
+        self.dedup_hits += other.dedup_hits
+        self.bytes_written += other.bytes_written
+        for stage, seconds in other.seconds.items():
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+        return self
+
+    def __str__(self) -> str:
+        timings = ", ".join(
+            f"{stage} {self.seconds[stage] * 1000:.1f} ms"
+            for stage in STAGES
+            if stage in self.seconds
+        )
+        return (
+            f"{self.name}: {self.tables_read} tables read, "
+            f"{self.keys_read} keys read, {self.keys_written} keys written, "
+            f"{self.dedup_hits} dedup hits, {self.bytes_written} bytes written"
+            + (f", {timings}" if timings else "")
+        )
+
+
+# stats of the file being processed, if any are being collected
+_active: Optional[FileStats] = None
+
+# name and start time of each stage currently running, innermost last
+_running = list[list]()
+
+
+@contextmanager
+def collect(name: str) -> Iterator[FileStats]:
+    """Record the counters and stage timings of everything done inside the
+    block into a new `FileStats`. Outside of a block, nothing is recorded."""
+    global _active
+    previous = _active
+    _active = FileStats(name)
+    try:
+        yield _active
+    finally:
+        _active = previous
+
+
+def count(counter: str, amount: int = 1):
+    """Add `amount` to a counter of the file being processed."""
+    if _active is not None:
+        setattr(_active, counter, getattr(_active, counter) + amount)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block, or a function when used as a decorator, as part of a
+    stage. Time spent in a stage nested inside another counts only towards
+    the inner one, so no time is counted twice."""
+    stats = _active
+    if stats is None:
+        yield
+        return
+
+    now = time.perf_counter()
+    if _running:
+        outer, start = _running[-1]
+        stats.seconds[outer] = stats.seconds.get(outer, 0.0) + now - start
+    _running.append([name, now])
+    try:
+        yield
+    finally:
+        now = time.perf_counter()
+        _, start = _running.pop()
+        stats.seconds[name] = stats.seconds.get(name, 0.0) + now - start
+        if _running:
+            _running[-1][1] = now
+
+
+def to_json(files: Iterable[FileStats]) -> str:
+    """Per-file stats and their totals."""
+    files = list(files)
+    total = FileStats("total")
+    for stats in files:
+        total.add(stats)
+
+    return json.dumps(
+        {"files": [asdict(stats) for stats in files], "total": asdict(total)},
+        indent=2,
+    )
+
+
+def print_report(files: list[FileStats], form: str = "text"):
+    """Print the stats of `files` to stdout, either as JSON or one line per file
+    followed by the totals."""
+    if form == "json":
+        print(to_json(files))
+        return
+
+    total = FileStats("total")
+    for stats in files:
+        print(stats)
+        total.add(stats)
+    print(total)
+
+
+def configure_logging(verbosity: int = 0):
+    """Log warnings and errors only by default, progress with a verbosity of
+    1 and the details of every table with 2."""
+    level = logging.WARNING - 10 * min(verbosity, 2)
+    logging.basicConfig(format="%(message)s", level=level)
@@ -0,0 +1,157 @@
+from . import stats
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+from .general_animation import ChannelBatch, JointTrack, xp
+
+KINDS = ("scale_keys", "rotation_keys", "translation_keys")
+TANGENTS = ("in_tangents", "out_tangents")
+COLUMNS = ("frames", "values") + TANGENTS
+
+
+@dataclass(frozen=True)
+class Stage:
+    """Per-key edit of some columns of some channels. `function` is written
+    against `general_animation.xp`, so it runs on a whole batch at once."""
+
+    function: Callable
+    kinds: tuple[str, ...] = KINDS
+    columns: tuple[str, ...] = ("values",)
+    axes: str = "XYZ"
+    root_only: bool = False
+
+
+def compose(functions: list[Callable]) -> Callable:
+    def composed(values):
+        for function in functions:
+            values = function(values)
+        return values
+
+    return composed
+
+
+class Pipeline:
+    """Per-key edits of an animation, declared once and compiled so that each
+    column of each channel is gathered, edited by every stage in order, and
+    written back in a single pass."""
+
+    def __init__(self, stages: Iterable[Stage] = ()):
+        self.stages = list(stages)
+
+    def add(self, stage: Stage) -> "Pipeline":
+        self.stages.append(stage)
+        return self
+
+    def extend(self, other: Optional["Pipeline"]) -> "Pipeline":
+        if other is not None:
+            self.stages.extend(other.stages)
+        return self
+
+    def radians(self) -> "Pipeline":
+        """Convert rotations from degrees to radians."""
+        return self.add(Stage(xp.radians, ("rotation_keys",)))
+
+    def degrees(self) -> "Pipeline":
+        """Convert rotations from radians to degrees."""
+        return self.add(Stage(xp.degrees, ("rotation_keys",)))
+
+    def wrapped_degrees(self) -> "Pipeline":
+        """Convert rotations from radians to degrees between -180 and 180."""
+
+        def wrap_degrees(values):
+            return xp.degrees(xp.arctan2(xp.sin(values), xp.cos(values)))
+
+        return self.add(Stage(wrap_degrees, ("rotation_keys",)))
+
+    def clamp_rotations(self, clamp: Optional[float]) -> "Pipeline":
+        """Wrap rotations in degrees to between `-clamp` and `clamp`."""
+        if clamp == None:
+            return self
+
+        limit = int(clamp)
+        span = limit * 2
+
+        def wrap(values):
+            values = (values % span) % span
+            return xp.where(values > limit, values - span, values)
+
+        return self.add(Stage(wrap, ("rotation_keys",)))
+
+    def tangents_per_frame(self, fps: float = 30.0) -> "Pipeline":
+        """Convert tangents from units per second to units per frame."""
+        return self.add(Stage(lambda tangents: tangents / fps, columns=TANGENTS))
+
+    def tangents_per_second(self, fps: float = 30.0) -> "Pipeline":
+        """Convert tangents from units per frame to units per second."""
+        return self.add(Stage(lambda tangents: tangents * fps, columns=TANGENTS))
+
+    def scale_translations(self, scale: float) -> "Pipeline":
+        if scale == 1.0:
+            return self  # leaves every track alone, so lazily read ones stay unread
+        return self.add(Stage(lambda values: values * scale, ("translation_keys",)))
+
+    def retime(self, factor: float, offset: float = 0.0) -> "Pipeline":
+        """Stretch keyframe times by `factor` then shift them by `offset` frames.
+        Tangents are rescaled so the curves keep their shape."""
+        self.add(Stage(lambda frames: frames * factor + offset, columns=("frames",)))
+        return self.add(Stage(lambda tangents: tangents / factor, columns=TANGENTS))
+
+    def offset_root(self, axis: str, offset: float) -> "Pipeline":
+        """Subtract `offset` from the root joint's translation along `axis`."""
+        return self.add(
+            Stage(
+                lambda values: values - offset,
+                ("translation_keys",),
+                axes=axis,
+                root_only=True,
+            )
+        )
+
+    def compile(self) -> dict[tuple[str, str, str, bool], tuple[int, ...]]:
+        """Map each (kind, axis, column, is_root) channel column to the indices of
+        the stages that edit it, in declaration order."""
+        programs = dict[tuple[str, str, str, bool], tuple[int, ...]]()
+        for kind in KINDS:
+            for axis in "XYZ":
+                for column in COLUMNS:
+                    for is_root in (False, True):
+                        program = tuple(
+                            i
+                            for i, stage in enumerate(self.stages)
+                            if kind in stage.kinds
+                            and axis in stage.axes
+                            and column in stage.columns
+                            and (is_root or not stage.root_only)
+                        )
+                        if program:
+                            programs[(kind, axis, column, is_root)] = program
+        return programs
+
+    @stats.stage("transform")
+    def run(self, tracks: list[JointTrack], root: Optional[JointTrack] = None):
+        """Apply every stage to `tracks`. `root` defaults to the first track."""
+        if not self.stages:
+            return
+
+        if root is None and len(tracks) > 0:
+            root = tracks[0]
+            if all(stage.root_only for stage in self.stages):
+                tracks = [root]  # the other tracks are not even accessed
+
+        programs = self.compile()
+
+        # channel columns edited by the same stages are batched together
+        batches = defaultdict(list)
+        for track in tracks:
+            is_root = track is root
+            for kind in KINDS:
+                channels = getattr(track, kind)
+                for axis in "XYZ":
+                    for column in COLUMNS:
+                        program = programs.get((kind, axis, column, is_root))
+                        if program is not None:
+                            batches[(column, program)].append(channels[axis])
+
+        for (column, program), channels in batches.items():
+            function = compose([self.stages[i].function for i in program])
+            ChannelBatch(channels, column).apply(function)
@@ -0,0 +1,472 @@
+from . import binary
+import json
+import logging
+import mmap
+from . import stats
+import sys
+from .anm import ANM, ENTRY_HEADER, AnmContentIndicator
+from argparse import ArgumentParser
+from .bca import BCA
+from .bck import BCK
+from dataclasses import dataclass, field
+from .dca import DCA
+from .dck import DCK
+from .general_animation import TangentMode
+from .j3d_animation import J3DDataHeader, J3DSkeletonAnimation
+from .mod_animation import MODSkeletonAnimation
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {".bca": BCA, ".bck": BCK, ".dca": DCA, ".dck": DCK, ".anm": ANM}
+
+TABLES = ("scale", "rotation", "translation")
+
+U16_LIMIT = 0x10000  # J3D counts and table indices are u16
+
+
+@dataclass
+class FileReport:
+    """Problems found in one file. Errors are data the game or the readers of
+    this tool would read wrongly, or not at all; warnings are unusual but
+    readable data, like table values no channel uses."""
+
+    path: str
+    format: str
+    size: int = 0
+    errors: list[dict] = field(default_factory=list)
+    warnings: list[dict] = field(default_factory=list)
+
+    entry: Optional[str] = None  # name of the ANM entry being checked
+
+    def _issue(self, code: str, message: str) -> dict:
+        issue = {"code": code, "message": message}
+        if self.entry is not None:
+            issue["entry"] = self.entry
+        return issue
+
+    def error(self, code: str, message: str):
+        self.errors.append(self._issue(code, message))
+
+    def warn(self, code: str, message: str):
+        self.warnings.append(self._issue(code, message))
+
+    def to_dict(self) -> dict:
+        return {
+            "path": self.path,
+            "format": self.format,
+            "size": self.size,
+            "errors": self.errors,
+            "warnings": self.warnings,
+        }
+
+
+def check_channels(
+    report: FileReport,
+    kind: type[J3DSkeletonAnimation] | type[MODSkeletonAnimation],
+    channels: Iterable[tuple[Sequence[int], int]],
+    counts: Sequence[int],
+):
+    """Check that the values of every channel lie within its table, and that
+    every table value is used by a channel.
+
+    Args:
+        channels (Iterable): descriptor of each channel, and which of the
+            scale, rotation and translation tables it reads from
+        counts (Sequence[int]): number of values of each table
+    """
+    used = [bytearray(count) for count in counts]
+    past_end = [0] * len(counts)
+    for descriptor, table in channels:
+        length, _ = kind.channel_span(descriptor)
+        start = descriptor[1]
+        if start + length > counts[table]:
+            past_end[table] += 1
+            continue
+        used[table][start : start + length] = b"\x01" * length
+
+    for table, name in enumerate(TABLES):
+        if past_end[table]:
+            report.error(
+                "table_bounds",
+                f"{past_end[table]} {name} channel(s) run past the end of the "
+                f"{name} table of {counts[table]} values",
+            )
+        unused = counts[table] - used[table].count(1)
+        if unused:
+            report.warn(
+                "count_mismatch",
+                f"{unused} of the {counts[table]} {name} values are used by no channel",
+            )
+
+
+def check_j3d(report: FileReport, kind: type[J3DSkeletonAnimation], data) -> None:
+    """Check the headers, table layout and track table of a BCA or BCK."""
+    header_size = kind.Header.SIZE
+    fields_offset = header_size + J3DDataHeader.SIZE
+    fields_end = fields_offset + kind.SECTION_FIELDS.size
+    if len(data) < fields_end:
+        report.error("truncated", f"{len(data)} bytes is too short for the headers")
+        return
+
+    magic = bytes(data[:8]).decode(errors="replace")
+    if magic != kind.MAGIC:
+        report.error("magic", f"expected {kind.MAGIC}, found {magic!r}")
+        return
+    file_size = binary.U32.unpack_from(data, 0x08)[0]
+    section_count = binary.U32.unpack_from(data, 0x0C)[0]
+    if file_size > len(data):
+        report.error(
+            "file_size", f"header holds {file_size} bytes, the file {len(data)}"
+        )
+    elif file_size < len(data):
+        report.warn(
+            "trailing_data", f"{len(data) - file_size} bytes past the file's size"
+        )
+    if section_count != 1:
+        report.error("section_count", f"expected 1 section, found {section_count}")
+
+    section = bytes(data[header_size : header_size + 4]).decode(errors="replace")
+    if section != kind.SECTION:
+        report.error("magic", f"expected a {kind.SECTION} section, found {section!r}")
+        return
+    section_end = header_size + binary.U32.unpack_from(data, header_size + 4)[0]
+    if section_end > len(data):
+        report.error(
+            "section_size",
+            f"section ends at {section_end:#x}, past the end of the file",
+        )
+        section_end = len(data)
+
+    fields = kind.SECTION_FIELDS.unpack_from(data, fields_offset)
+    track_count, *counts = fields[3:7]
+    stride = kind.CHANNEL_DESCRIPTOR_SIZE
+    tables = [
+        (name, header_size + offset, count * size, size)
+        for name, offset, count, size in zip(
+            ("track", *TABLES),
+            fields[7:11],
+            (track_count * 9 * stride, *counts),
+            (2, 4, 2, 4),
+        )
+    ]
+
+    in_bounds = check_layout(report, tables, fields_end, section_end)
+    for name, offset, _, _ in tables:
+        if offset % 32:
+            report.warn("alignment", f"{name} table at {offset:#x} is not 32-aligned")
+    if not in_bounds[0]:
+        return
+
+    descriptors = binary.unpack_table(data, tables[0][1], track_count * 9 * stride, "H")
+    channels = [
+        (descriptors[position : position + stride], channel % 3)
+        for channel, position in enumerate(range(0, len(descriptors), stride))
+    ]
+    if stride == 3:  # BCK
+        modes = {descriptor[2] for descriptor, _ in channels} - {
+            TangentMode.SYMMETRIC,
+            TangentMode.PIECEWISE,
+        }
+        if modes:
+            report.warn(
+                "tangent_mode",
+                f"unknown tangent mode(s) {sorted(modes)}, read as piecewise",
+            )
+
+    check_channels(report, kind, channels, counts)
+
+
+def check_layout(
+    report: FileReport,
+    tables: list[tuple[str, int, int, int]],
+    start: int,
+    end: int,
+) -> list[bool]:
+    """Check that each table lies between `start` and `end` without overlapping
+    another, and that no count wrapped past the u16 limit. Tables are given as
+    their name, offset, size and value size.
+
+    Returns:
+        list[bool]: whether each table can be read
+    """
+    in_bounds = list[bool]()
+    ordered = sorted(range(len(tables)), key=lambda i: tables[i][1:3])
+    for i, (name, offset, size, item_size) in enumerate(tables):
+        if offset < start or offset + size > end:
+            report.error(
+                "table_bounds",
+                f"{name} table at {offset:#x}, {size} bytes long, lies outside "
+                f"the section data ({start:#x} to {end:#x})",
+            )
+            in_bounds.append(False)
+            continue
+        in_bounds.append(True)
+
+        # space up to the next table, which a wrapped count leaves unaccounted for
+        position = ordered.index(i)
+        following = [tables[j][1] for j in ordered[position + 1 :]]
+        limit = next((o for o in following if o >= offset + size), end)
+        if following and following[0] < offset + size:
+            report.error(
+                "table_overlap",
+                f"{name} table overlaps the {tables[ordered[position + 1]][0]} table",
+            )
+        elif (limit - offset) // item_size - size // item_size >= U16_LIMIT:
+            report.error(
+                "index_overflow",
+                f"{name} table has room for {(limit - offset) // item_size} values "
+                f"but holds {size // item_size}; its count wrapped past 65535",
+            )
+
+    return in_bounds
+
+
+def check_mod(
+    report: FileReport,
+    kind: type[MODSkeletonAnimation],
+    data,
+    offset: int = 0,
+) -> Optional[int]:
+    """Check the table layout and joint table of a DCA or DCK starting at
+    `offset`.
+
+    Returns:
+        Optional[int]: size of the animation, or None if it cannot be worked out
+    """
+    end = len(data)
+    if offset + 8 > end:
+        report.error("truncated", "too short for the joint count and duration")
+        return None
+    joint_count = binary.U32.unpack_from(data, offset)[0]
+    duration = binary.U32.unpack_from(data, offset + 4)[0]
+
+    counts = list[int]()
+    position = offset + 0x08
+    for name in TABLES:
+        if position + 4 > end:
+            report.error("truncated", f"ends before the {name} count")
+            return None
+        count = binary.U32.unpack_from(data, position)[0]
+        position += 4 + count * 4
+        if position > end:
+            report.error(
+                "table_bounds",
+                f"{name} table of {count} values runs past the end of the data",
+            )
+            return None
+        counts.append(count)
+        if count >= U16_LIMIT:
+            report.warn(
+                "index_overflow",
+                f"{count} {name} values do not fit the u16 indices of BCA/BCK",
+            )
+    if duration >= U16_LIMIT:
+        report.warn("index_overflow", f"duration {duration} does not fit BCA/BCK")
+
+    stride = kind.CHANNEL_DESCRIPTOR_SIZE
+    joint_size = 2 + 9 * stride
+    if position + joint_count * joint_size * 4 > end:
+        report.error(
+            "table_bounds",
+            f"joint table of {joint_count} joints runs past the end of the data",
+        )
+        return None
+    joint_data = binary.unpack_table(data, position, joint_count * joint_size, "I")
+
+    indices = joint_data[::joint_size]
+    if len(set(indices)) < len(indices):
+        report.warn(
+            "joint_index",
+            f"{len(indices) - len(set(indices))} duplicate joint index(es)",
+        )
+
+    # joint and parent index, then scale, rotation and translation channels
+    channels = [
+        (joint_data[start : start + stride], channel // 3)
+        for joint in range(0, len(joint_data), joint_size)
+        for channel, start in enumerate(range(joint + 2, joint + joint_size, stride))
+    ]
+    check_channels(report, kind, channels, counts)
+
+    return position + len(joint_data) * 4 - offset
+
+
+def check_anm(report: FileReport, data) -> None:
+    """Check the entry headers of an ANM bundle, and each of its animations."""
+    if len(data) < 4:
+        report.error("truncated", "too short for the animation count")
+        return
+
+    offset = 4
+    for i in range(binary.U32.unpack_from(data, 0)[0]):
+        report.entry = f"#{i}"
+        if offset + ENTRY_HEADER.size > len(data):
+            report.error("truncated", "ends before the entry's header")
+            return
+        content_indicator, size, name_length = ENTRY_HEADER.unpack_from(data, offset)
+        offset += ENTRY_HEADER.size
+        name = bytes(data[offset : offset + name_length]).decode(errors="replace")
+        offset += name_length
+        report.entry = name or report.entry
+
+        if content_indicator == AnmContentIndicator.DCA:
+            kind = DCA
+        elif content_indicator == AnmContentIndicator.DCK:
+            kind = DCK
+        else:
+            report.error("content_id", f"unknown content indicator {content_indicator}")
+            return
+
+        measured = check_mod(report, kind, data, offset)
+        if measured is None:
+            return
+        if size != measured:
+            # written by older versions of this tool, see `ANMReader`
+            report.warn(
+                "entry_size", f"entry holds a size of {size}, its data is {measured}"
+            )
+        offset += measured
+
+    report.entry = None
+    if offset < len(data):
+        report.warn("trailing_data", f"{len(data) - offset} bytes past the last entry")
+
+
+def validate_file(filepath: str | Path) -> FileReport:
+    """Check a single file. Only the headers and descriptor tables are read;
+    the pages of the key data tables are never loaded from disk. Errors are
+    reported rather than raised, so one bad file does not stop the rest."""
+    path = Path(filepath)
+    kind = FORMATS.get(path.suffix.lower())
+    report = FileReport(str(path), path.suffix.lower().lstrip("."))
+    if kind is None:
+        report.error("format", f"unsupported file type {path.suffix!r}")
+        return report
+
+    try:
+        with open(path, "rb") as f:
+            report.size = path.stat().st_size
+            if report.size == 0:
+                report.error("truncated", "the file is empty")
+                return report
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if kind is ANM:
+                    check_anm(report, data)
+                elif issubclass(kind, J3DSkeletonAnimation):
+                    check_j3d(report, kind, data)
+                else:
+                    size = check_mod(report, kind, data)
+                    if size is not None and size < len(data):
+                        report.warn(
+                            "trailing_data",
+                            f"{len(data) - size} bytes past the end of the animation",
+                        )
+    except Exception as error:
+        report.error("exception", f"{type(error).__name__}: {error}")
+
+    return report
+
+
+def validate_files(paths: list[Path], workers: int = 1) -> Iterator[FileReport]:
+    """Check `paths` over `workers` processes. Reports are yielded in the
+    order of `paths`."""
+    if workers <= 1 or len(paths) <= 1:
+        for path in paths:
+            yield validate_file(path)
+        return
+
+    # multiprocessing is slow to import, so it is only imported when used
+    from concurrent.futures import ProcessPoolExecutor
+
+    # files are handed out in chunks, as each one takes well under a millisecond
+    chunksize = max(1, min(64, len(paths) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as executor:
+        yield from executor.map(validate_file, paths, chunksize=chunksize)
+
+
+def find_files(paths: Iterable[str | Path]) -> list[Path]:
+    """Files of every supported format in `paths`, searching folders and their
+    subfolders."""
+    files = list[Path]()
+    for path in map(Path, paths):
+        if path.is_dir():
+            files += sorted(
+                p
+                for p in path.rglob("*")
+                if p.suffix.lower() in FORMATS and p.is_file()
+            )
+        else:
+            files.append(path)
+    return files
+
+
+def add_arguments(parser: ArgumentParser):
+    parser.add_argument(
+        "paths", nargs="+", help="Animation files, or folders to search for them."
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        help="<Optional> Write the JSON report to this file, rather than printing it.",
+    )
+    parser.add_argument(
+        "-a",
+        "--all",
+        action="store_true",
+        help="<Optional> List every file in the report, including those without any problem.",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        default=1,
+        type=int,
+        help="<Optional> Number of processes to check files with.",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="count",
+        default=0,
+        help="<Optional> Log the problems of each file as it is checked.",
+    )
+
+
+def main(args) -> int:
+    stats.configure_logging(args.verbose)
+
+    paths = find_files(args.paths)
+    files = list[dict]()
+    summary = {"files": 0, "failed": 0, "errors": 0, "warnings": 0}
+    for report in validate_files(paths, args.jobs):
+        summary["files"] += 1
+        summary["failed"] += bool(report.errors)
+        summary["errors"] += len(report.errors)
+        summary["warnings"] += len(report.warnings)
+
+        for issue in report.errors + report.warnings:
+            logger.info(f"{report.path}: {issue['code']}: {issue['message']}")
+        if args.all or report.errors or report.warnings:
+            files.append(report.to_dict())
+
+    text = json.dumps({"summary": summary, "files": files}, indent=1)
+    if args.output is None:
+        print(text)
+    else:
+        Path(args.output).write_text(text)
+
+    logger.info(
+        f"{summary['files']} file(s) checked, {summary['failed']} with errors, "
+        f"{summary['warnings']} warning(s)"
+    )
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(
+        description="Check animations for malformed headers and tables, without decoding their keyframes."
+    )
+    add_arguments(parser)
+    sys.exit(main(parser.parse_args()))
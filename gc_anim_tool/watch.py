@@ -0,0 +1,149 @@
+import json
+import logging
+import socketserver
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.05  # seconds between checks of the watched folder
+
+
+def snapshot(paths: Iterable[Path]) -> dict[Path, tuple[int, int]]:
+    """Size and modification time of each of `paths` that exists."""
+    stats = dict[Path, tuple[int, int]]()
+    for path in paths:
+        try:
+            stat = path.stat()
+        except OSError:
+            continue  # removed since it was listed
+        stats[path] = (stat.st_size, stat.st_mtime_ns)
+    return stats
+
+
+class FolderWatcher:
+    """Finds the files of a folder matching any of `patterns` that were added
+    or changed since the last poll. The folder is polled, rather than watched
+    through inotify or similar, so that it behaves the same on every platform
+    without any extra dependency."""
+
+    def __init__(self, folder: str | Path, patterns: Iterable[str]):
+        self.folder = Path(folder)
+        self.patterns = tuple(patterns)
+        self._seen = snapshot(self.files())
+
+    def files(self) -> list[Path]:
+        return sorted(
+            path for pattern in self.patterns for path in self.folder.glob(pattern)
+        )
+
+    def poll(self) -> list[Path]:
+        current = snapshot(self.files())
+        changed = [path for path, key in current.items() if self._seen.get(path) != key]
+        self._seen = current
+        return changed
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Reads one JSON request per line, either {"path": ...} or {"paths": [...]},
+    and answers each with one JSON line holding a result per path."""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                paths = request.get("paths") or [request["path"]]
+                response = {
+                    "results": [self.server.watch.convert(Path(p)) for p in paths]  # type: ignore
+                }
+            except (ValueError, KeyError, TypeError, AttributeError) as error:
+                response = {"error": f"Bad request: {error}"}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class _RequestServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class Watch:
+    """Long-running conversion loop. Files of `folder` are converted with
+    `convert` as soon as they are saved. All of them are converted again
+    whenever one of `dependencies` changes, such as the models they are
+    converted against. Everything loaded along the way, like parsed
+    skeletons, stays in memory between conversions.
+
+    With a `port`, conversions can also be requested explicitly over a local
+    TCP socket, see `_RequestHandler`. Conversions never run concurrently.
+    """
+
+    def __init__(
+        self,
+        convert: Callable[[Path], list[Path]],
+        folder: str | Path,
+        patterns: Iterable[str],
+        dependencies: Iterable[str | Path] = (),
+        port: Optional[int] = None,
+    ):
+        self._convert = convert
+        self._lock = threading.Lock()
+        self.watcher = FolderWatcher(folder, patterns)
+        self.dependencies = [Path(path) for path in dependencies]
+        self._dependency_stats = snapshot(self.dependencies)
+
+        self.server = None
+        if port is not None:
+            self.server = _RequestServer(("127.0.0.1", port), _RequestHandler)
+            self.server.watch = self  # type: ignore
+
+    def convert(self, path: Path) -> dict:
+        """Convert one file, returning what was written or the error."""
+        with self._lock:
+            start = time.perf_counter()
+            try:
+                outputs = self._convert(path)
+            except Exception as error:
+                message = f"{type(error).__name__}: {error}"
+                logger.error(f"{path.name}: FAILED: {message}")
+                return {"path": str(path), "error": message}
+
+            milliseconds = (time.perf_counter() - start) * 1000
+            logger.info(f"{path.name}: converted in {milliseconds:.0f} ms")
+            return {
+                "path": str(path),
+                "outputs": [str(output) for output in outputs],
+                "milliseconds": milliseconds,
+            }
+
+    def poll(self) -> list[dict]:
+        """Convert whatever changed since the last poll."""
+        changed = self.watcher.poll()
+
+        dependency_stats = snapshot(self.dependencies)
+        if dependency_stats != self._dependency_stats:
+            self._dependency_stats = dependency_stats
+            logger.info("Models changed, converting everything again")
+            changed = self.watcher.files()
+
+        return [self.convert(path) for path in changed]
+
+    def run(self, interval: float = POLL_INTERVAL):
+        """Poll until interrupted with Ctrl+C."""
+        if self.server is not None:
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+            host, port = self.server.server_address[:2]
+            logger.info(f"Accepting requests on {host}:{port}")
+
+        logger.info(f"Watching {self.watcher.folder} for changes")
+        try:
+            while True:
+                self.poll()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if self.server is not None:
+                self.server.shutdown()
+                self.server.server_close()
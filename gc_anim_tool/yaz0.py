@@ -0,0 +1,411 @@
+from . import binary
+import logging
+from . import stats
+import struct
+import sys
+from argparse import ArgumentParser
+from array import array
+from pathlib import Path
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+# magic, decompressed size, then alignment (Yaz0) or table offsets (Yay0)
+HEADER = struct.Struct(">4sIII")
+
+MIN_LENGTH = 3
+MAX_LENGTH = 0x111  # 0x12 plus a full extra length byte
+MAX_DISTANCE = 0x1000
+LONG_LENGTH = 0x12  # shortest length stored with an extra length byte
+
+# per compression level: earlier positions compared at each position, length
+# of a match good enough to stop looking for a longer one, and whether a match
+# is put off by a byte when the next position has a longer one. Positions
+# inside a match are only added to the hash chains from level 2
+LEVELS = (
+    (0, 0, False),  # no matches, every byte is stored as it is
+    (4, 16, False),
+    (8, 32, False),
+    (16, 32, False),
+    (16, 64, True),
+    (32, 128, True),
+    (64, MAX_LENGTH, True),
+    (128, MAX_LENGTH, True),
+    (512, MAX_LENGTH, True),
+    (4096, MAX_LENGTH, True),
+)
+DEFAULT_LEVEL = 6
+MAX_LEVEL = len(LEVELS) - 1
+
+
+def is_compressed(data) -> bool:
+    return bytes(data[:4]) in (b"Yaz0", b"Yay0")
+
+
+def _copy_match(out: bytearray, dst: int, distance: int, length: int):
+    """Copy `length` bytes from `distance` back in `out` to `dst`. The source
+    may overlap the destination, repeating the bytes in between."""
+    start = dst - distance
+    if start < 0:
+        raise ValueError(f"Back-reference at {dst:#x} starts before the data")
+    if distance >= length:
+        out[dst : dst + length] = out[start : start + length]
+    else:
+        pattern = out[start:dst]
+        out[dst : dst + length] = (pattern * (length // distance + 1))[:length]
+
+
+def yaz0_decompress(data) -> bytearray:
+    """Decompress Yaz0 data from any bytes-like object, such as an mmap, which
+    is read through a `memoryview` without being copied."""
+    view = memoryview(data)
+    magic, size, _, _ = HEADER.unpack_from(view, 0)
+    if magic != b"Yaz0":
+        raise ValueError(f"Expected Yaz0 data, found {bytes(magic)!r}")
+
+    out = bytearray(size)
+    src = HEADER.size
+    dst = 0
+    try:
+        while dst < size:
+            code = view[src]
+            src += 1
+            if code == 0xFF and dst + 8 <= size and src + 8 <= len(view):
+                out[dst : dst + 8] = view[src : src + 8]  # 8 literal bytes
+                src += 8
+                dst += 8
+                continue
+
+            for bit in range(8):
+                if dst >= size:
+                    break
+                if code & (0x80 >> bit):
+                    out[dst] = view[src]
+                    src += 1
+                    dst += 1
+                    continue
+
+                high, low = view[src], view[src + 1]
+                src += 2
+                distance = ((high & 0x0F) << 8 | low) + 1
+                length = high >> 4
+                if length == 0:
+                    length = view[src] + LONG_LENGTH
+                    src += 1
+                else:
+                    length += 2
+
+                length = min(length, size - dst)
+                _copy_match(out, dst, distance, length)
+                dst += length
+    except IndexError:
+        raise EOFError(f"Yaz0 data ends before {size} bytes were decompressed")
+
+    return out
+
+
+def yay0_decompress(data) -> bytearray:
+    """Decompress Yay0 data from any bytes-like object, see `yaz0_decompress`."""
+    view = memoryview(data)
+    magic, size, link_offset, chunk_offset = HEADER.unpack_from(view, 0)
+    if magic != b"Yay0":
+        raise ValueError(f"Expected Yay0 data, found {bytes(magic)!r}")
+
+    out = bytearray(size)
+    mask_offset = HEADER.size
+    dst = 0
+    try:
+        while dst < size:
+            mask = binary.U32.unpack_from(view, mask_offset)[0]
+            mask_offset += 4
+            for bit in range(32):
+                if dst >= size:
+                    break
+                if mask & (0x80000000 >> bit):
+                    out[dst] = view[chunk_offset]
+                    chunk_offset += 1
+                    dst += 1
+                    continue
+
+                link = binary.U16.unpack_from(view, link_offset)[0]
+                link_offset += 2
+                distance = (link & 0x0FFF) + 1
+                length = link >> 12
+                if length == 0:
+                    length = view[chunk_offset] + LONG_LENGTH
+                    chunk_offset += 1
+                else:
+                    length += 2
+
+                length = min(length, size - dst)
+                _copy_match(out, dst, distance, length)
+                dst += length
+    except (IndexError, struct.error):
+        raise EOFError(f"Yay0 data ends before {size} bytes were decompressed")
+
+    return out
+
+
+def decompress(data):
+    """Decompress Yaz0 or Yay0 data, or return `data` itself if it is neither."""
+    magic = bytes(data[:4])
+    if magic == b"Yaz0":
+        return yaz0_decompress(data)
+    if magic == b"Yay0":
+        return yay0_decompress(data)
+    return data
+
+
+def _common_length(data: bytes, a: int, b: int, limit: int) -> int:
+    """Number of bytes, up to `limit`, that match at `a` and `b`."""
+    length = 0
+    while (
+        length + 16 <= limit
+        and data[a + length : a + length + 16] == data[b + length : b + length + 16]
+    ):
+        length += 16
+    while length < limit and data[a + length] == data[b + length]:
+        length += 1
+    return length
+
+
+def find_matches(
+    data: bytes, level: int = DEFAULT_LEVEL
+) -> Iterator[tuple[int, int, int]]:
+    """Find the back-references to compress `data` with, in order. Every byte
+    not covered by one is stored as a literal.
+
+    Earlier positions sharing the next 3 bytes are kept in hash chains. `level`
+    sets how many of them are compared at each position, and how long a match
+    must be to stop looking for a longer one, see `LEVELS`.
+
+    Yields:
+        tuple[int, int, int]: position, length and distance of each match
+    """
+    max_chain, nice_length, lazy = LEVELS[max(0, min(level, MAX_LEVEL))]
+    if max_chain == 0:
+        return
+    insert_all = level >= 2
+
+    size = len(data)
+    last = size - MIN_LENGTH  # last position a match can start at
+    head = dict[int, int]()  # most recent position of each 3 byte sequence
+    previous = array("i", [-1]) * max(size, 0)  # next older position in its chain
+
+    def insert(pos: int) -> int:
+        """Add `pos` to its chain, returning the most recent earlier position."""
+        key = data[pos] << 16 | data[pos + 1] << 8 | data[pos + 2]
+        candidate = head.get(key, -1)
+        previous[pos] = candidate
+        head[key] = pos
+        return candidate
+
+    def longest(pos: int, candidate: int) -> tuple[int, int]:
+        limit = min(MAX_LENGTH, size - pos)
+        nice = min(nice_length, limit)
+        window = pos - MAX_DISTANCE
+        best_length = MIN_LENGTH - 1
+        best_distance = 0
+        chain = max_chain
+        # -1 ends a chain, and lies inside the window near the start of `data`
+        while candidate >= 0 and candidate >= window and chain > 0:
+            # a match can only be longer if it also matches the byte past the best
+            if data[candidate + best_length] == data[pos + best_length]:
+                length = _common_length(data, candidate, pos, limit)
+                if length > best_length:
+                    best_length = length
+                    best_distance = pos - candidate
+                    if length >= nice:
+                        break
+            candidate = previous[candidate]
+            chain -= 1
+        return best_length, best_distance
+
+    pos = 0
+    while pos <= last:
+        candidate = insert(pos)
+        if candidate < 0 or candidate < pos - MAX_DISTANCE:
+            pos += 1
+            continue
+        length, distance = longest(pos, candidate)
+        if length < MIN_LENGTH:
+            pos += 1
+            continue
+
+        inserted = pos + 1  # first position not added to the chains yet
+        if lazy and length < nice_length and pos + 1 <= last:
+            candidate = insert(pos + 1)
+            inserted += 1
+            if candidate >= 0:
+                next_length, next_distance = longest(pos + 1, candidate)
+                if next_length > length:
+                    pos += 1  # leave this byte a literal, for a longer match
+                    length, distance = next_length, next_distance
+
+        yield (pos, length, distance)
+        if insert_all:
+            for inner in range(inserted, min(pos + length, last + 1)):
+                key = data[inner] << 16 | data[inner + 1] << 8 | data[inner + 2]
+                previous[inner] = head.get(key, -1)
+                head[key] = inner
+        pos += length
+
+
+def yaz0_compress(data, level: int = DEFAULT_LEVEL, alignment: int = 0) -> bytes:
+    """Compress any bytes-like object to Yaz0.
+
+    Args:
+        data: bytes to compress
+        level (int): 0 to 9, from fastest to smallest, see `find_matches`
+        alignment (int): alignment stored in the header, which some games
+            use for the decompressed data
+
+    Returns:
+        bytes: Yaz0 data
+    """
+    data = bytes(data)
+    out = bytearray(HEADER.pack(b"Yaz0", len(data), alignment, 0))
+
+    code_position = 0
+    bit = 0  # items in the current group, each with a bit in its code byte
+
+    def literals(start: int, end: int):
+        nonlocal code_position, bit
+        while start < end:
+            if bit == 0 and end - start >= 8:
+                out.append(0xFF)  # a whole group of literals
+                out.extend(data[start : start + 8])
+                start += 8
+                continue
+            if bit == 0:
+                code_position = len(out)
+                out.append(0)
+            out[code_position] |= 0x80 >> bit
+            out.append(data[start])
+            start += 1
+            bit = (bit + 1) & 7
+
+    position = 0
+    for start, length, distance in find_matches(data, level):
+        literals(position, start)
+        if bit == 0:
+            code_position = len(out)
+            out.append(0)
+        back = distance - 1
+        if length >= LONG_LENGTH:
+            out += bytes((back >> 8, back & 0xFF, length - LONG_LENGTH))
+        else:
+            out += bytes(((length - 2) << 4 | back >> 8, back & 0xFF))
+        bit = (bit + 1) & 7
+        position = start + length
+    literals(position, len(data))
+
+    return bytes(out)
+
+
+def yay0_compress(data, level: int = DEFAULT_LEVEL) -> bytes:
+    """Compress any bytes-like object to Yay0, see `yaz0_compress`."""
+    data = bytes(data)
+    masks = array("I")
+    links = array("H")
+    chunks = bytearray()
+
+    mask = 0
+    bit = 0  # items covered by `mask`
+
+    def flag(literal: bool):
+        nonlocal mask, bit
+        if literal:
+            mask |= 0x80000000 >> bit
+        bit += 1
+        if bit == 32:
+            masks.append(mask)
+            mask = 0
+            bit = 0
+
+    position = 0
+    for start, length, distance in find_matches(data, level):
+        for literal in range(position, start):
+            flag(True)
+            chunks.append(data[literal])
+        flag(False)
+        back = distance - 1
+        if length >= LONG_LENGTH:
+            links.append(back)
+            chunks.append(length - LONG_LENGTH)
+        else:
+            links.append((length - 2) << 12 | back)
+        position = start + length
+    for literal in range(position, len(data)):
+        flag(True)
+        chunks.append(data[literal])
+    if bit > 0:
+        masks.append(mask)
+
+    link_offset = HEADER.size + len(masks) * 4
+    chunk_offset = link_offset + len(links) * 2
+    return b"".join(
+        (
+            HEADER.pack(b"Yay0", len(data), link_offset, chunk_offset),
+            binary.pack_table(masks, "I"),
+            binary.pack_table(links, "H"),
+            chunks,
+        )
+    )
+
+
+def add_arguments(parser: ArgumentParser):
+    parser.add_argument("input", type=str, help="File to compress or decompress.")
+    parser.add_argument("output", type=str, help="Path to write the result to.")
+    parser.add_argument(
+        "-d",
+        "--decompress",
+        action="store_true",
+        help="<Optional> Decompress Yaz0 or Yay0 data, instead of compressing.",
+    )
+    parser.add_argument(
+        "--yay0",
+        action="store_true",
+        help="<Optional> Compress to Yay0 rather than Yaz0.",
+    )
+    parser.add_argument(
+        "-l",
+        "--level",
+        type=int,
+        default=DEFAULT_LEVEL,
+        choices=range(MAX_LEVEL + 1),
+        metavar="LEVEL",
+        help=f"<Optional> Compression level, from 0 (fastest) to {MAX_LEVEL} (smallest). {DEFAULT_LEVEL} by default.",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="count",
+        default=0,
+        help="<Optional> Log the size before and after.",
+    )
+
+
+def main(args) -> int:
+    stats.configure_logging(args.verbose)
+
+    data = Path(args.input).read_bytes()
+    if args.decompress:
+        if not is_compressed(data):
+            logger.error(f"{args.input} is not Yaz0 or Yay0 compressed")
+            return 1
+        result = decompress(data)
+    elif args.yay0:
+        result = yay0_compress(data, args.level)
+    else:
+        result = yaz0_compress(data, args.level)
+
+    Path(args.output).write_bytes(result)
+    logger.info(f"{args.input}: {len(data)} bytes -> {len(result)} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Compress or decompress Yaz0 and Yay0 data.")
+    add_arguments(parser)
+    sys.exit(main(parser.parse_args()))
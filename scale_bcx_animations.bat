@@ -1,3 +1,4 @@
-python "%~dp0gc_anim_tool/cutscene.py" ^
+set "PYTHONPATH=%~dp0"
+python -m gc_anim_tool.cutscene ^
 --target_bmd "%~dp0input/enemy_all_jnts.bmd" --original_bmd "%~dp0output/enemy_all_jnts.bmd" --scale 0.6
 pause
\ No newline at end of file
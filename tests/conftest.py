@@ -0,0 +1,122 @@
+import math
+import pytest
+import sys
+from pathlib import Path
+from gc_anim_tool import general_animation
+from gc_anim_tool.bca import BCA
+from gc_anim_tool.bck import BCK
+from gc_anim_tool.dca import DCA
+from gc_anim_tool.dck import DCK
+from gc_anim_tool.general_animation import Keyframe, JointTrack
+from gc_anim_tool.j3d_animation import LoopMode
+from gc_anim_tool.mod_animation import Joint
+
+KINDS = ("scale_keys", "rotation_keys", "translation_keys")
+
+# rest value and swing of each kind of channel. Rotations are in degrees, and
+# stay inside the +-180 a BCA can store
+REST = {"scale_keys": 1.0, "rotation_keys": 0.0, "translation_keys": 0.0}
+AMPLITUDE = {"scale_keys": 0.5, "rotation_keys": 150.0, "translation_keys": 80.0}
+
+JOINTS = 4
+FRAMES = 30
+
+
+def make_keys(kind: str, phase: int, baked: bool) -> list[Keyframe]:
+    """A held channel for every third phase, otherwise one sine wave, keyed
+    on every frame when `baked`, or every 5 frames with tangents."""
+
+    def value(frame: float) -> float:
+        angle = 2 * math.pi * frame / FRAMES + phase
+        return REST[kind] + AMPLITUDE[kind] * math.sin(angle)
+
+    def slope(frame: float) -> float:
+        angle = 2 * math.pi * frame / FRAMES + phase
+        return AMPLITUDE[kind] * 2 * math.pi / FRAMES * math.cos(angle)
+
+    if phase % 3 == 0:
+        return [Keyframe(0, value(0))]
+    if baked:
+        return [Keyframe(frame, value(frame)) for frame in range(FRAMES)]
+    frames = [*range(0, FRAMES - 1, 5), FRAMES - 1]
+    return [Keyframe(frame, value(frame), slope(frame)) for frame in frames]
+
+
+def make_tracks(baked: bool) -> list[JointTrack]:
+    tracks = list[JointTrack]()
+    for joint in range(JOINTS):
+        track = JointTrack()
+        for k, kind in enumerate(KINDS):
+            for a, axis in enumerate("XYZ"):
+                getattr(track, kind)[axis] = make_keys(kind, joint + 3 * k + a, baked)
+        tracks.append(track)
+    return tracks
+
+
+def make_joints(tracks: list[JointTrack]) -> list[Joint]:
+    """MOD joints holding `tracks` in a chain, with rotations in radians."""
+    joints = list[Joint]()
+    for i, track in enumerate(tracks):
+        joint = Joint(i, max(i - 1, 0))
+        joint.scale_keys = track.scale_keys
+        joint.translation_keys = track.translation_keys
+        for axis in "XYZ":
+            joint.rotation_keys[axis] = [
+                Keyframe(
+                    key.frame,
+                    math.radians(key.value),
+                    None if key.in_tangent is None else math.radians(key.in_tangent),
+                )
+                for key in track.rotation_keys[axis]
+            ]
+        joints.append(joint)
+    return joints
+
+
+BUILDERS = {
+    "bca": lambda: BCA("test", FRAMES, LoopMode.LOOP, make_tracks(baked=True)),
+    "bck": lambda: BCK("test", FRAMES, LoopMode.LOOP, make_tracks(baked=False)),
+    "dca": lambda: DCA("test", FRAMES, make_joints(make_tracks(baked=True))),
+    "dck": lambda: DCK("test", FRAMES, make_joints(make_tracks(baked=False))),
+}
+
+
+@pytest.fixture
+def make_animation():
+    """Builds a fresh test animation of a format, by extension."""
+    return lambda extension: BUILDERS[extension]()
+
+
+@pytest.fixture
+def bca() -> BCA:
+    return BUILDERS["bca"]()
+
+
+@pytest.fixture
+def bck() -> BCK:
+    return BUILDERS["bck"]()
+
+
+@pytest.fixture
+def dca() -> DCA:
+    return BUILDERS["dca"]()
+
+
+@pytest.fixture
+def dck() -> DCK:
+    return BUILDERS["dck"]()
+
+
+@pytest.fixture
+def no_numpy(monkeypatch):
+    """Run as if NumPy were not installed: every module of the package that
+    imported it, or the `xp` chosen from it, gets the fallback instead."""
+    package = Path(general_animation.__file__).parent
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None)
+        if path is None or package not in Path(path).parents:
+            continue
+        if getattr(module, "np", None) is not None:
+            monkeypatch.setattr(module, "np", None)
+        if hasattr(module, "xp"):
+            monkeypatch.setattr(module, "xp", general_animation._ScalarMath)
@@ -0,0 +1,75 @@
+import mmap
+import pytest
+import struct
+from pathlib import Path
+from gc_anim_tool.anm import ANM, ANMReader
+from gc_anim_tool.dca import DCA
+from gc_anim_tool.dck import DCK
+
+
+@pytest.fixture
+def bundle(tmp_path, dca, dck) -> Path:
+    dck.name, dca.name = "first.dck", "second.dca"
+    path = tmp_path / "test.anm"
+    ANM([dck, dca]).write_to_path(path)
+    return path
+
+
+def written(animation, folder: Path) -> bytes:
+    folder.mkdir()
+    animation.write_to_path(folder)
+    return next(folder.iterdir()).read_bytes()
+
+
+def test_reader(bundle, tmp_path):
+    expected = [
+        written(animation, tmp_path / f"expected{i}")
+        for i, animation in enumerate(ANM.from_filepath(bundle).animations)
+    ]
+
+    with ANMReader(bundle) as reader:
+        assert reader.names() == ["first", "second"]
+        assert len(reader) == 2
+        assert "second" in reader and "third" not in reader
+        # by name or by position, in any order
+        assert written(reader["second"], tmp_path / "second") == expected[1]
+        assert written(reader[0], tmp_path / "first") == expected[0]
+        assert [type(animation) for animation in reader] == [DCK, DCA]
+        with pytest.raises(KeyError):
+            reader.entry("third")
+
+
+def test_reader_ignores_stored_size(bundle):
+    # bundles written by older versions hold a wrong size for each entry
+    data = bytearray(bundle.read_bytes())
+    struct.pack_into(">I", data, 8, 0)
+    bundle.write_bytes(data)
+
+    with ANMReader(bundle) as reader:
+        assert reader.names() == ["first", "second"]
+        assert isinstance(reader["second"], DCA)
+
+
+def test_reader_truncated(bundle):
+    bundle.write_bytes(bundle.read_bytes()[:-16])
+    with pytest.raises(EOFError):
+        ANMReader(bundle)
+
+
+def test_reader_bad_content_id(bundle, monkeypatch):
+    data = bytearray(bundle.read_bytes())
+    struct.pack_into(">I", data, 4, 9)
+    bundle.write_bytes(data)
+
+    maps = list[mmap.mmap]()
+    real_mmap = mmap.mmap
+
+    def mapped(*args, **kwargs) -> mmap.mmap:
+        maps.append(real_mmap(*args, **kwargs))
+        return maps[-1]
+
+    monkeypatch.setattr(mmap, "mmap", mapped)
+    with pytest.raises(ValueError):
+        ANMReader(bundle)
+    # the map of a bundle that cannot be read is not left open
+    assert [m.closed for m in maps] == [True]
@@ -0,0 +1,83 @@
+import math
+import pytest
+from bisect import bisect_right
+from gc_anim_tool import curves
+from gc_anim_tool.curves import bake_tracks, evaluate_channels, fit_tracks
+from gc_anim_tool.general_animation import Channel, hermite
+
+needs_numpy = pytest.mark.skipif(curves.np is None, reason="needs NumPy")
+
+KINDS = ("scale_keys", "rotation_keys", "translation_keys")
+
+
+def reference(channel: Channel, frame: float) -> float:
+    """Value of `channel` at `frame`, one segment at a time with `hermite`,
+    holding the first and last key outside them."""
+    frames, values = channel.frames, channel.values
+    if frame <= frames[0]:
+        return values[0]
+    if frame >= frames[-1]:
+        return values[-1]
+    in_tangents, out_tangents = channel.effective_tangents()
+    i = bisect_right(frames, frame) - 1
+    return hermite(
+        frame,
+        frames[i],
+        values[i],
+        out_tangents[i],
+        frames[i + 1],
+        values[i + 1],
+        in_tangents[i + 1],
+    )
+
+
+CHANNELS = [
+    Channel.from_columns([4], [2.5]),
+    Channel.from_columns([0, 10], [0.0, 5.0]),
+    Channel.from_columns([0, 6, 20], [1.0, -3.0, 4.0], [0.5, 0.2, -1.0]),
+    Channel.from_columns(
+        [2, 5, 9, 16],
+        [0.0, 8.0, 8.0, -2.0],
+        [1.0, 3.0, 0.0, 0.5],
+        [2.0, -1.0, 0.0, 0.0],
+    ),
+]
+
+
+@needs_numpy
+def test_evaluate_matches_hermite():
+    frames = [x / 4 for x in range(-8, 100)]
+    samples = evaluate_channels(CHANNELS, frames)
+    assert samples.shape == (len(CHANNELS), len(frames))
+    for channel, row in zip(CHANNELS, samples):
+        expected = [reference(channel, frame) for frame in frames]
+        assert list(row) == pytest.approx(expected, rel=1e-12, abs=1e-12)
+
+
+@needs_numpy
+def test_bake_matches_hermite(bck):
+    baked, duration = bake_tracks(bck.tracks, bck.duration)
+    assert duration == bck.duration
+
+    for track, baked_track in zip(bck.tracks, baked, strict=True):
+        for kind in KINDS:
+            for axis in "XYZ":
+                channel = getattr(track, kind)[axis]
+                expected = [reference(channel, f) for f in range(duration)]
+                if kind == "rotation_keys":
+                    expected = [(v + 180.0) % 360.0 - 180.0 for v in expected]
+                if len(channel) == 1:
+                    expected = expected[:1]
+
+                baked_channel = getattr(baked_track, kind)[axis]
+                assert list(baked_channel.frames) == list(range(len(expected)))
+                assert list(baked_channel.values) == pytest.approx(
+                    expected, rel=1e-9, abs=1e-9
+                )
+
+
+def test_curves_need_numpy(bca, bck, no_numpy):
+    with pytest.raises(ModuleNotFoundError):
+        bake_tracks(bck.tracks, bck.duration)
+    with pytest.raises(ModuleNotFoundError):
+        fit_tracks(bca.tracks, 0.01)
@@ -0,0 +1,161 @@
+import pytest
+from io import BytesIO
+from pathlib import Path
+from gc_anim_tool.anm import ANM
+from gc_anim_tool.bca import BCA
+from gc_anim_tool.bck import BCK
+from gc_anim_tool.dca import DCA
+from gc_anim_tool.conversions import bca_to_dca, bck_to_dck, dca_to_bca, dck_to_bck
+from gc_anim_tool.dck import DCK
+from gc_anim_tool.general_animation import scale_animation
+
+KINDS = ("scale_keys", "rotation_keys", "translation_keys")
+FORMATS = {"bca": BCA, "bck": BCK, "dca": DCA, "dck": DCK}
+
+
+def write(animation, folder: Path) -> Path:
+    folder.mkdir(parents=True)
+    extension = type(animation).__name__.lower()
+    if isinstance(animation, (DCA, DCK)):
+        animation.write_to_path(folder)
+    else:
+        animation.write(folder)
+    return folder / f"{animation.name}.{extension}"
+
+
+def read(kind, path: Path):
+    if issubclass(kind, (DCA, DCK)):
+        return kind.from_filepath(path)
+    return kind.from_file(path)
+
+
+def channels(animation) -> list[tuple[list, list]]:
+    tracks = animation.joints if hasattr(animation, "joints") else animation.tracks
+    return [
+        (
+            [key.frame for key in getattr(track, kind)[axis]],
+            [key.value for key in getattr(track, kind)[axis]],
+        )
+        for track in tracks
+        for kind in KINDS
+        for axis in "XYZ"
+    ]
+
+
+def assert_same_channels(a, b):
+    """Same keys, with values as close as the formats store them."""
+    for (frames_a, values_a), (frames_b, values_b) in zip(
+        channels(a), channels(b), strict=True
+    ):
+        assert frames_a == frames_b
+        assert values_a == pytest.approx(values_b, rel=1e-5, abs=1e-2)
+
+
+@pytest.mark.parametrize("extension", FORMATS)
+def test_round_trip(make_animation, tmp_path, extension):
+    original = make_animation(extension)
+    path = write(original, tmp_path / "first")
+
+    parsed = read(FORMATS[extension], path)
+    assert parsed.duration == original.duration
+    assert_same_channels(parsed, original)
+    # keys are stored exactly once written, so writing them again is identical
+    assert write(parsed, tmp_path / "second").read_bytes() == path.read_bytes()
+
+
+def test_anm_round_trip(tmp_path, dca, dck):
+    dck.name, dca.name = "first.dck", "second.dca"
+    path = tmp_path / "test.anm"
+    ANM([dck, dca]).write_to_path(path)
+
+    parsed = ANM.from_filepath(path)
+    assert [type(animation) for animation in parsed.animations] == [DCK, DCA]
+    # entries are named without their extension once read
+    assert [animation.name for animation in parsed.animations] == ["first", "second"]
+    assert_same_channels(parsed.animations[0], dck)
+    assert_same_channels(parsed.animations[1], dca)
+
+    again = tmp_path / "again.anm"
+    parsed.write_to_path(again)
+    ANM.from_filepath(again).write_to_path(tmp_path / "third.anm")
+    assert (tmp_path / "third.anm").read_bytes() == again.read_bytes()
+
+
+@pytest.mark.parametrize("extension", FORMATS)
+def test_bytes_round_trip(make_animation, tmp_path, extension):
+    original = make_animation(extension)
+    data = write(original, tmp_path / "file").read_bytes()
+    assert bytes(original.to_bytes()) == data
+
+    stream = BytesIO()
+    assert original.write_stream(stream) == len(data)
+    assert stream.getvalue() == data
+
+    kind = FORMATS[extension]
+    parsed = kind.from_bytes(data, "parsed")
+    assert parsed.name == "parsed"
+    assert_same_channels(parsed, original)
+    assert bytes(parsed.to_bytes()) == data
+
+    # a table found partway through a larger buffer
+    padded = memoryview(bytes(16) + data)
+    assert bytes(kind.from_buffer(padded, offset=16).to_bytes()) == data
+
+
+def test_anm_bytes_round_trip(dca, dck):
+    dck.name, dca.name = "first.dck", "second.dca"
+    data = bytes(ANM([dck, dca]).to_bytes())
+
+    parsed = ANM.from_bytes(data)
+    assert [animation.name for animation in parsed.animations] == ["first", "second"]
+    assert_same_channels(parsed.animations[0], dck)
+    assert_same_channels(parsed.animations[1], dca)
+    assert bytes(ANM.from_buffer(memoryview(data)).to_bytes()) == bytes(
+        parsed.to_bytes()
+    )
+
+
+def convert_all(make_animation, folder: Path) -> list[bytes]:
+    """Files written by each conversion, and by the edits that run on
+    `general_animation.xp`, with or without NumPy."""
+    bca = make_animation("bca")
+    scale_animation(bca.tracks, 2.0)
+    converted = [
+        bca_to_dca(bca),
+        bck_to_dck(make_animation("bck")),
+        dca_to_bca(make_animation("dca")),
+        dck_to_bck(make_animation("dck"), 90),
+    ]
+    return [
+        write(animation, folder / str(i)).read_bytes()
+        for i, animation in enumerate(converted)
+    ]
+
+
+@pytest.mark.parametrize("extension", FORMATS)
+def test_array_fallback_round_trip(make_animation, tmp_path, extension, no_numpy):
+    path = write(make_animation(extension), tmp_path / "first")
+    parsed = read(FORMATS[extension], path)
+    assert write(parsed, tmp_path / "second").read_bytes() == path.read_bytes()
+
+
+def test_array_fallback_matches_numpy(make_animation, tmp_path, request):
+    pytest.importorskip("numpy")
+    with_numpy = convert_all(make_animation, tmp_path / "numpy")
+    request.getfixturevalue("no_numpy")
+    assert convert_all(make_animation, tmp_path / "array") == with_numpy
+
+
+@pytest.mark.parametrize("extension", ["bca", "bck"])
+def test_lazy_tracks(make_animation, tmp_path, extension):
+    path = write(make_animation(extension), tmp_path / "first")
+    eager = FORMATS[extension].from_file(path)
+    lazy = FORMATS[extension].from_file(path, lazy=True)
+    # tracks that were never decoded are written as they were read
+    assert write(lazy, tmp_path / "lazy").read_bytes() == path.read_bytes()
+    assert_same_channels(lazy, eager)
+
+    scale_animation(eager.tracks, 2.0)
+    scale_animation(lazy.tracks, 2.0)
+    edited = write(eager, tmp_path / "eager").read_bytes()
+    assert write(lazy, tmp_path / "edited").read_bytes() == edited
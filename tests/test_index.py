@@ -0,0 +1,88 @@
+import json
+import pytest
+import sqlite3
+from argparse import Namespace
+from gc_anim_tool import index as index_module
+from gc_anim_tool.anm import ANM
+from gc_anim_tool.index import AnimationIndex, main
+
+
+@pytest.fixture
+def folder(tmp_path, bca, bck, dca, dck):
+    folder = tmp_path / "files"
+    folder.mkdir()
+    bca.write(folder)
+    bck.write(folder)
+    dck.name, dca.name = "first.dck", "second.dca"
+    ANM([dck, dca]).write_to_path(folder / "test.anm")
+    return folder
+
+
+def test_update(tmp_path, folder):
+    with AnimationIndex(tmp_path / "index.sqlite") as index:
+        update = index.update([folder])
+        assert (update.indexed, update.unchanged, update.removed) == (3, 0, 0)
+
+        rows = index.where("format = 'bck'").fetchall()
+        assert len(rows) == 1
+        members = index.query(
+            "SELECT member FROM animations WHERE source = ? ORDER BY member",
+            [str((folder / "test.anm").resolve())],
+        ).fetchall()
+        assert len(members) == 2
+
+        # nothing changed, so nothing is read again
+        update = index.update([folder])
+        assert (update.indexed, update.unchanged, update.removed) == (0, 3, 0)
+
+    # the index is kept between runs
+    with AnimationIndex(tmp_path / "index.sqlite") as index:
+        (folder / "test.bca").unlink()
+        update = index.update([folder])
+        assert (update.indexed, update.unchanged, update.removed) == (0, 2, 1)
+        assert index.where("format = 'bca'").fetchall() == []
+        count = index.query("SELECT COUNT(*) FROM sources").fetchone()[0]
+        assert count == 2
+
+
+def test_source_removed_while_indexing(tmp_path, folder, monkeypatch):
+    with AnimationIndex(tmp_path / "index.sqlite") as index:
+        index.update([folder])
+
+        # found by the search, then deleted before it is read
+        sources = index_module.find_sources([folder])
+        monkeypatch.setattr(index_module, "find_sources", lambda paths: sources)
+        (folder / "test.bck").unlink()
+
+        update = index.update([folder])
+        assert (update.indexed, update.unchanged, update.removed) == (0, 2, 1)
+        assert update.failed == 0
+        assert index.where("format = 'bck'").fetchall() == []
+
+
+def test_query_is_read_only(tmp_path, folder):
+    with AnimationIndex(tmp_path / "index.sqlite") as index:
+        index.update([folder])
+        for sql in ("DELETE FROM animations", "DROP TABLE sources"):
+            with pytest.raises(sqlite3.OperationalError):
+                index.query(sql)
+        assert index.query("SELECT COUNT(*) FROM animations").fetchone()[0] == 4
+
+
+def test_main(tmp_path, folder, capsys):
+    args = Namespace(
+        paths=[folder],
+        database=tmp_path / "index.sqlite",
+        where=None,
+        sql="SELECT name FROM animations ORDER BY name",
+        json=True,
+        verbose=0,
+    )
+    assert main(args) == 0
+    rows = json.loads(capsys.readouterr().out)
+    assert [row["name"] for row in rows] == ["first", "second", "test", "test"]
+
+    args.paths, args.sql = [], "DELETE FROM animations"
+    assert main(args) == 1
+    with AnimationIndex(tmp_path / "index.sqlite") as index:
+        assert index.query("SELECT COUNT(*) FROM animations").fetchone()[0] == 4
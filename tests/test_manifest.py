@@ -0,0 +1,120 @@
+import os
+import pytest
+from argparse import ArgumentParser
+from pathlib import Path
+from gc_anim_tool import cutscene
+from gc_anim_tool.conversions import ConversionJob, job_fingerprint, run_incremental
+from gc_anim_tool.general_animation import scale_animation
+from gc_anim_tool.manifest import Manifest
+
+
+@pytest.fixture
+def source(tmp_path, bca):
+    return bca.write(tmp_path)
+
+
+def run(jobs, manifest_path) -> list[str]:
+    """Names of the jobs an incremental run converted."""
+    manifest = Manifest(manifest_path)
+    results = list(run_incremental(jobs, manifest))
+    assert all(result.error is None for result in results)
+    return [result.name for result in results]
+
+
+def test_manifest_save_and_reload(tmp_path, source):
+    manifest = Manifest(tmp_path / "manifest.json")
+    output = tmp_path / "out.dca"
+    output.write_bytes(b"")
+    fingerprint = manifest.fingerprint(manifest.hash_file(source), {"scale": 2.0})
+    manifest.record("key", fingerprint, [output])
+    manifest.save()
+
+    reloaded = Manifest(tmp_path / "manifest.json")
+    assert reloaded.is_current("key", fingerprint)
+    assert not reloaded.is_current("key", manifest.fingerprint("other"))
+    assert not reloaded.is_current("missing", fingerprint)
+    assert reloaded.files == manifest.files
+
+    output.unlink()
+    assert not reloaded.is_current("key", fingerprint)
+
+
+def test_unreadable_manifest(tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_text("{not json")
+    assert Manifest(path).entries == {}
+
+
+def test_fingerprint_follows_source_and_options(tmp_path, source, bca):
+    manifest = Manifest(tmp_path / "manifest.json")
+    job = ConversionJob("test", source, tmp_path / "out")
+    fingerprint = job_fingerprint(job, manifest)
+    assert job_fingerprint(job, manifest) == fingerprint
+
+    scaled = ConversionJob("test", source, tmp_path / "out", scale=2.0)
+    assert job_fingerprint(scaled, manifest) != fingerprint
+
+    scale_animation(bca.tracks, 2.0)
+    bca.write(source.parent)
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert job_fingerprint(job, manifest) != fingerprint
+
+
+def test_incremental_run(tmp_path, source, bca):
+    (tmp_path / "out").mkdir()
+    manifest = tmp_path / "out" / "manifest.json"
+    jobs = [ConversionJob("test", source, tmp_path / "out")]
+    assert run(jobs, manifest) == ["test"]
+    assert run(jobs, manifest) == []
+
+    # changed options
+    jobs = [ConversionJob("test", source, tmp_path / "out", scale=2.0)]
+    assert run(jobs, manifest) == ["test"]
+    assert run(jobs, manifest) == []
+
+    # deleted output
+    (tmp_path / "out" / "test.dca").unlink()
+    assert run(jobs, manifest) == ["test"]
+
+    # changed source
+    scale_animation(bca.tracks, 2.0)
+    bca.write(source.parent)
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert run(jobs, manifest) == ["test"]
+    assert run(jobs, manifest) == []
+
+
+def test_cutscene_failure_keeps_converted(tmp_path, source, monkeypatch):
+    (tmp_path / "out").mkdir()
+    names = {"first.bca", "second.bca", "third.bca"}
+    for name in names:
+        (tmp_path / name).write_bytes(source.read_bytes())
+    source.unlink()
+    monkeypatch.setattr(cutscene, "INPUT", tmp_path)
+    monkeypatch.setattr(cutscene, "OUTPUT", tmp_path / "out")
+
+    converted = list[str]()
+    failed = list[str]()
+
+    def convert_animation(path, **options) -> list[Path]:
+        if len(converted) == 1 and not failed:
+            failed.append(path.name)
+            raise ValueError("cannot be converted")
+        converted.append(path.name)
+        output = tmp_path / "out" / path.name
+        output.write_bytes(path.read_bytes())
+        return [output]
+
+    monkeypatch.setattr(cutscene, "convert_animation", convert_animation)
+    parser = ArgumentParser()
+    cutscene.add_arguments(parser)
+    args = parser.parse_args(["--incremental"])
+
+    with pytest.raises(ValueError):
+        cutscene.main(args)
+
+    # what was converted before the failure is not converted again
+    assert cutscene.main(args) == 0
+    assert sorted(converted[1:]) == sorted(names - {converted[0]})
@@ -0,0 +1,104 @@
+import pytest
+from gc_anim_tool import binary
+from gc_anim_tool.bck import BCK
+from gc_anim_tool.dca import DCA
+from gc_anim_tool.j3d_animation import LoopMode
+from gc_anim_tool.patch import AnimationPatch, patch_file
+
+
+@pytest.fixture
+def bck_path(tmp_path, bck):
+    return bck.write(tmp_path)
+
+
+@pytest.fixture
+def dca_path(tmp_path, dca):
+    dca.write_to_path(tmp_path)
+    return tmp_path / "test.dca"
+
+
+def translations(animation) -> list[list[float]]:
+    tracks = getattr(animation, "tracks", None) or animation.joints
+    return [
+        [key.value for key in track.translation_keys[axis]]
+        for track in tracks
+        for axis in "XYZ"
+    ]
+
+
+def test_patch(bck_path, bck):
+    patch_file(bck_path, 2.0, LoopMode.ONCE, 20)
+
+    patched = BCK.from_file(bck_path)
+    assert patched.loop_mode == LoopMode.ONCE
+    assert patched.duration == 20
+    for values, original in zip(translations(patched), translations(bck)):
+        assert values == pytest.approx([v * 2.0 for v in original], abs=1e-3)
+
+
+def test_patch_mod(dca_path, dca):
+    patch_file(dca_path, 0.5, duration=80000)
+
+    patched = DCA.from_filepath(dca_path)
+    assert patched.duration == 80000
+    for values, original in zip(translations(patched), translations(dca)):
+        assert values == pytest.approx([v * 0.5 for v in original], abs=1e-3)
+
+
+def test_shared_translations_refused(bck_path):
+    # point a held translation channel at the frame of another channel's first
+    # key, as a packer sharing equal table values might
+    with AnimationPatch(bck_path) as patch:
+        stride = BCK.CHANNEL_DESCRIPTOR_SIZE
+        channels = [
+            patch.descriptors[position : position + stride]
+            for position in patch.translation_channels
+        ]
+        held = next(
+            position
+            for position, descriptor in zip(patch.translation_channels, channels)
+            if descriptor[0] == 1
+        )
+        keyed = next(descriptor for descriptor in channels if descriptor[0] > 1)
+        tracks, _ = patch.other_tables[0]
+        binary.U16.pack_into(patch._map, tracks + (held + 1) * 2, keyed[1])
+
+    before = bck_path.read_bytes()
+    with pytest.raises(ValueError, match="shared"):
+        patch_file(bck_path, 2.0, duration=5)
+    assert bck_path.read_bytes() == before
+
+
+def test_overlapping_tables_refused(bck_path):
+    # the translation table moved onto the rotation table
+    with AnimationPatch(bck_path) as patch:
+        _, fields_offset = patch.fields["loop_mode"]
+        translations_field = fields_offset + BCK.SECTION_FIELDS.size - 4
+        rotations = binary.U32.unpack_from(patch._map, translations_field - 4)[0]
+        binary.U32.pack_into(patch._map, translations_field, rotations)
+
+    before = bck_path.read_bytes()
+    with pytest.raises(ValueError, match="overlaps"):
+        patch_file(bck_path, 2.0)
+    assert bck_path.read_bytes() == before
+
+
+@pytest.mark.parametrize(
+    "edits",
+    [
+        {"scale": 2.0, "duration": 70000},  # duration does not fit in a u16
+        {"scale": 2.0, "loop_mode": 256},
+    ],
+)
+def test_patch_is_atomic(bck_path, edits):
+    before = bck_path.read_bytes()
+    with pytest.raises(ValueError):
+        patch_file(bck_path, **edits)
+    assert bck_path.read_bytes() == before
+
+
+def test_patch_mod_is_atomic(dca_path):
+    before = dca_path.read_bytes()
+    with pytest.raises(ValueError, match="loop_mode"):
+        patch_file(dca_path, 2.0, loop_mode=LoopMode.ONCE, duration=5)
+    assert dca_path.read_bytes() == before
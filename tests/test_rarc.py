@@ -0,0 +1,97 @@
+import pytest
+from argparse import Namespace
+from gc_anim_tool import rarc
+from gc_anim_tool.anm import ANM
+from gc_anim_tool.bck import BCK
+from gc_anim_tool.dca import DCA
+
+
+@pytest.fixture
+def files(tmp_path, bck, dca, dck) -> dict[str, bytes]:
+    folder = tmp_path / "files"
+    folder.mkdir()
+    bck.name, dca.name = "wait", "walk"
+    bck.write(folder)
+    dca.write_to_path(folder)
+    ANM([dck]).write_to_path(folder / "bundle.anm")
+    return {
+        "anim/wait.bck": (folder / "wait.bck").read_bytes(),
+        "anim/demo/walk.dca": (folder / "walk.dca").read_bytes(),
+        "bundle.anm": (folder / "bundle.anm").read_bytes(),
+        "readme.txt": b"not an animation",
+    }
+
+
+@pytest.mark.parametrize("filename", ["test.arc", "test.szs"])
+def test_pack_and_read(tmp_path, files, filename):
+    path = rarc.write_archive(tmp_path / filename, files)
+
+    with rarc.RARCArchive(path) as archive:
+        assert sorted(archive.names()) == sorted(files)
+        assert len(archive) == len(files)
+        for name, contents in files.items():
+            assert bytes(archive.read(name)) == contents
+        # files are also found by their name alone
+        assert bytes(archive.read("walk.dca")) == files["anim/demo/walk.dca"]
+
+
+def test_compressed_archive(tmp_path, files):
+    path = rarc.write_archive(tmp_path / "test.szs", files)
+    assert path.read_bytes()[:4] == b"Yaz0"
+
+
+def test_load_animations(tmp_path, files):
+    path = rarc.write_archive(tmp_path / "test.arc", files)
+
+    with rarc.RARCArchive(path) as archive:
+        assert sorted(archive.names(tuple(rarc.READERS))) == sorted(
+            name for name in files if not name.endswith(".txt")
+        )
+        bck = archive.load("wait.bck")
+        assert isinstance(bck, BCK)
+        assert bck.write(tmp_path).read_bytes() == files["anim/wait.bck"]
+        assert isinstance(archive.load("walk.dca"), DCA)
+        assert isinstance(archive.load("bundle.anm"), ANM)
+        with pytest.raises(TypeError):
+            archive.load("readme.txt")
+
+
+def test_truncated(tmp_path, files):
+    path = tmp_path / "test.arc"
+    path.write_bytes(rarc.pack_archive(files, "test")[:0x30])
+    with pytest.raises(EOFError):
+        rarc.RARCArchive(path)
+
+
+def test_extract(tmp_path, files):
+    path = rarc.write_archive(tmp_path / "test.arc", files)
+    output = tmp_path / "out"
+    args = Namespace(
+        archive=path, pack=None, animations=False, extract=output, verbose=False
+    )
+    assert rarc.main(args) == 0
+    assert rarc.read_folder(output) == files
+
+
+def test_extract_stays_in_output(tmp_path):
+    data = rarc.pack_archive({"safe.txt": b"kept", "escaping.txt": b"bad"}, "test")
+    # a file name leading out of the output folder
+    path = tmp_path / "test.arc"
+    path.write_bytes(data.replace(b"escaping.txt", b"../../ba.txt"))
+
+    output = tmp_path / "a" / "out"
+    args = Namespace(
+        archive=path, pack=None, animations=False, extract=output, verbose=False
+    )
+    assert rarc.main(args) == 1
+    assert (output / "safe.txt").read_bytes() == b"kept"
+    assert not (tmp_path / "ba.txt").exists()
+
+
+@pytest.mark.parametrize("filename", ["test.arc", "test.szs"])
+def test_views_outlive_close(tmp_path, files, filename):
+    path = rarc.write_archive(tmp_path / filename, files)
+    with rarc.RARCArchive(path) as archive:
+        view = archive.read("wait.bck")
+    assert bytes(view) == files["anim/wait.bck"]
+    view.release()
@@ -0,0 +1,146 @@
+import math
+import pytest
+import random
+from bisect import bisect_right
+from gc_anim_tool import simplify
+from gc_anim_tool.cutscene import AnimationEntry
+from gc_anim_tool.general_animation import Channel, hermite
+from gc_anim_tool.simplify import reduce_hermite, reduce_linear
+
+TOLERANCE = 0.05
+
+
+def baked(count: int) -> Channel:
+    """A value on every frame, of a wave with some noise on it."""
+    rng = random.Random(0)
+    values = [10 * math.sin(f / 40) + rng.uniform(-0.02, 0.02) for f in range(count)]
+    return Channel.from_columns(range(count), values)
+
+
+def keyed(count: int) -> Channel:
+    frames = [3 * i for i in range(count)]
+    values = [10 * math.sin(f / 11) for f in frames]
+    slopes = [10 / 11 * math.cos(f / 11) for f in frames]
+    return Channel.from_columns(frames, values, slopes)
+
+
+def evaluate(channel: Channel, frame: float) -> float:
+    """Value of the curve through the keys of `channel` at `frame`, one
+    segment at a time with `hermite`."""
+    frames, values = channel.frames, channel.values
+    in_tangents, out_tangents = channel.effective_tangents()
+    i = max(0, min(bisect_right(frames, frame) - 1, len(frames) - 2))
+    return hermite(
+        frame,
+        frames[i],
+        values[i],
+        out_tangents[i],
+        frames[i + 1],
+        values[i + 1],
+        in_tangents[i + 1],
+    )
+
+
+class CountingChannel:
+    """Stand-in for a baked channel that counts reads of its columns."""
+
+    def __init__(self, channel: Channel):
+        self.reads = 0
+        self.frames = self._counting(channel.frames)
+        self.values = self._counting(channel.values)
+
+    def _counting(self, column):
+        owner = self
+
+        class Column(list):
+            def __getitem__(self, index):
+                owner.reads += 1
+                return super().__getitem__(index)
+
+        return Column(column)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+def test_reduce_linear_error():
+    channel = baked(300)
+    reduced, report = reduce_linear(channel, TOLERANCE)
+    assert report.keys_before == 300
+    assert report.keys_after == len(reduced) < 100
+    assert (reduced.frames[0], reduced.frames[-1]) == (0, 299)
+
+    # the curve through the kept keys is the polyline the error is measured on
+    errors = [
+        abs(evaluate(reduced, f) - v) for f, v in zip(channel.frames, channel.values)
+    ]
+    assert max(errors) <= TOLERANCE + 1e-9
+    assert report.max_error <= TOLERANCE
+    assert report.max_error == pytest.approx(max(errors), abs=1e-9)
+
+
+def test_reduce_hermite_error():
+    channel = keyed(200)
+    reduced, report = reduce_hermite(channel, TOLERANCE)
+    assert report.keys_after == len(reduced) < 50
+
+    # kept keys are unchanged
+    originals = {f: v for f, v in zip(channel.frames, channel.values)}
+    assert all(originals[f] == v for f, v in zip(reduced.frames, reduced.values))
+
+    # the error is bounded at each original key and halfway between them
+    frames = list(channel.frames)
+    checked = frames + [(a + b) / 2 for a, b in zip(frames, frames[1:])]
+    errors = [abs(evaluate(reduced, f) - evaluate(channel, f)) for f in checked]
+    assert max(errors) <= TOLERANCE + 1e-9
+    assert report.max_error <= TOLERANCE
+
+
+def test_reduce_linear_is_linear():
+    def reads(count: int) -> int:
+        channel = CountingChannel(baked(count))
+        reduce_linear(channel, TOLERANCE)  # type: ignore
+        return channel.reads
+
+    assert reads(2000) <= 2.2 * reads(1000)
+
+
+def test_reduce_hermite_is_linear(monkeypatch):
+    calls = 0
+
+    def counting_hermite(*args):
+        nonlocal calls
+        calls += 1
+        return hermite(*args)
+
+    monkeypatch.setattr(simplify, "hermite", counting_hermite)
+
+    def evaluations(count: int) -> int:
+        nonlocal calls
+        calls = 0
+        reduce_hermite(keyed(count), TOLERANCE)
+        return calls
+
+    assert evaluations(400) <= 2.2 * evaluations(200)
+
+
+@pytest.mark.parametrize("extension", ["bca", "bck"])
+def test_clean_threshold_is_relative(make_animation, extension):
+    def clean(scale: float):
+        animation = make_animation(extension)
+        root = animation.tracks[0].translation_keys
+        for key in (key for axis in "XYZ" for key in root[axis]):
+            key.value *= scale
+            if key.in_tangent is not None:
+                key.in_tangent *= scale
+        peak = max(abs(value) for axis in "XYZ" for value in root[axis].values)
+
+        entry = AnimationEntry(animation)
+        report = entry.clean_keyframes(0.02)
+        assert 0 < report.removed
+        assert report.max_error <= 0.02 * peak + 1e-9
+        return report.keys_after, report.max_error / scale
+
+    # the same keys are kept for small and large motions
+    keys, error = clean(1.0)
+    assert clean(100.0) == (keys, pytest.approx(error))
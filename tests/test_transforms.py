@@ -0,0 +1,109 @@
+import math
+import pytest
+from gc_anim_tool.transforms import KINDS, Pipeline
+
+
+@pytest.fixture(params=["numpy", "array"])
+def backend(request):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        request.getfixturevalue("no_numpy")
+    return request.param
+
+
+def keys(tracks) -> list[tuple]:
+    """Every key of every channel, with missing tangents as NaN."""
+    return [
+        tuple(math.nan if column is None else column for column in columns)
+        for track in tracks
+        for kind in KINDS
+        for axis in "XYZ"
+        for columns in (
+            (key.frame, key.value, key.in_tangent, key.out_tangent)
+            for key in getattr(track, kind)[axis]
+        )
+    ]
+
+
+def reference(tracks, edit) -> list[tuple]:
+    """`keys` after running `edit(kind, axis, is_root, key)` on each key, one
+    key at a time, as the transforms did before the pipeline."""
+    edited = []
+    for track in tracks:
+        for kind in KINDS:
+            for axis in "XYZ":
+                for key in getattr(track, kind)[axis]:
+                    columns = [key.frame, key.value, key.in_tangent, key.out_tangent]
+                    columns = edit(kind, axis, track is tracks[0], columns)
+                    edited.append(tuple(math.nan if c is None else c for c in columns))
+    return edited
+
+
+def tangents(columns: list, function) -> list:
+    return columns[:2] + [None if t is None else function(t) for t in columns[2:]]
+
+
+def assert_same_keys(actual: list[tuple], expected: list[tuple]):
+    assert len(actual) == len(expected)
+    for a, b in zip(actual, expected):
+        assert a == pytest.approx(b, rel=1e-12, abs=1e-12, nan_ok=True)
+
+
+def test_dck_to_bck_steps(dck, backend):
+    clamp, scale = 90, 2.0
+
+    def edit(kind, axis, is_root, columns):
+        if kind == "rotation_keys":
+            value = math.degrees(columns[1])
+            value = (value % (clamp * 2)) % (clamp * 2)
+            if value > clamp:
+                value -= clamp * 2
+            columns[1] = value
+        if kind == "translation_keys":
+            columns[1] *= scale
+        return tangents(columns, lambda t: t / 30.0)
+
+    expected = reference(dck.joints, edit)
+    pipeline = Pipeline().degrees().clamp_rotations(clamp).tangents_per_frame()
+    pipeline.scale_translations(scale).run(dck.joints)
+    assert_same_keys(keys(dck.joints), expected)
+
+
+def test_bck_to_dck_steps(bck, backend):
+    def edit(kind, axis, is_root, columns):
+        if kind == "rotation_keys":
+            columns[1] = math.radians(columns[1])
+        return tangents(columns, lambda t: t * 30.0)
+
+    expected = reference(bck.tracks, edit)
+    Pipeline().radians().tangents_per_second().run(bck.tracks)
+    assert_same_keys(keys(bck.tracks), expected)
+
+
+def test_wrapped_degrees(dca, backend):
+    for joint in dca.joints:
+        for key in joint.rotation_keys["X"]:
+            key.value += 4 * math.pi  # wrapped back into -180 to 180
+
+    def edit(kind, axis, is_root, columns):
+        if kind == "rotation_keys":
+            value = columns[1]
+            columns[1] = math.degrees(math.atan2(math.sin(value), math.cos(value)))
+        return columns
+
+    expected = reference(dca.joints, edit)
+    Pipeline().wrapped_degrees().run(dca.joints)
+    assert_same_keys(keys(dca.joints), expected)
+
+
+def test_retime_and_root_offset(bck, backend):
+    def edit(kind, axis, is_root, columns):
+        columns[0] = columns[0] * 2.0 + 5.0
+        if is_root and kind == "translation_keys" and axis == "X":
+            columns[1] -= 10.0
+        return tangents(columns, lambda t: t / 2.0)
+
+    expected = reference(bck.tracks, edit)
+    Pipeline().retime(2.0, 5.0).offset_root("X", 10.0).run(bck.tracks)
+    assert_same_keys(keys(bck.tracks), expected)
@@ -0,0 +1,93 @@
+import json
+import pytest
+import struct
+from argparse import Namespace
+from gc_anim_tool.anm import ANM
+from gc_anim_tool.j3d_animation import J3DDataHeader, J3DSkeletonAnimation
+from gc_anim_tool.validate import main, validate_file
+
+# offset of the loop mode, counts and table offsets of BCA/BCK files
+FIELDS = J3DSkeletonAnimation.Header.SIZE + J3DDataHeader.SIZE
+
+
+@pytest.fixture
+def files(tmp_path, bca, bck, dca, dck) -> dict[str, bytes]:
+    for animation in (bca, bck):
+        animation.write(tmp_path)
+    for animation in (dca, dck):
+        animation.write_to_path(tmp_path)
+    dck.name, dca.name = "first.dck", "second.dca"
+    ANM([dck, dca]).write_to_path(tmp_path / "test.anm")
+    return {path.name: path.read_bytes() for path in tmp_path.iterdir()}
+
+
+def corrupt(tmp_path, files: dict[str, bytes], name: str, edit) -> list[str]:
+    """Codes of the errors found in `name` once `edit` has changed its data."""
+    data = bytearray(files[name])
+    edit(data)
+    path = tmp_path / "bad" / name
+    path.parent.mkdir(exist_ok=True)
+    path.write_bytes(data)
+    return [issue["code"] for issue in validate_file(path).errors]
+
+
+def test_valid_files(tmp_path, files):
+    for name in files:
+        report = validate_file(tmp_path / name)
+        assert report.errors == [], name
+
+
+def test_channel_out_of_bounds(tmp_path, files):
+    def edit(data):
+        # data index of the first track's first channel
+        tracks = (
+            J3DSkeletonAnimation.Header.SIZE
+            + struct.unpack_from(">I", data, FIELDS + 12)[0]
+        )
+        struct.pack_into(">H", data, tracks + 2, 0xFFF0)
+
+    assert corrupt(tmp_path, files, "test.bck", edit) == ["table_bounds"]
+
+
+def test_table_out_of_bounds(tmp_path, files):
+    def edit(data):
+        struct.pack_into(">I", data, FIELDS + 24, len(data))  # translations
+
+    assert "table_bounds" in corrupt(tmp_path, files, "test.bca", edit)
+
+
+def test_table_overlap(tmp_path, files):
+    def edit(data):
+        # rotation table moved onto the scale table
+        scales = struct.unpack_from(">I", data, FIELDS + 16)[0]
+        struct.pack_into(">I", data, FIELDS + 20, scales)
+
+    assert "table_overlap" in corrupt(tmp_path, files, "test.bca", edit)
+
+
+def test_truncated_anm(tmp_path, files):
+    def edit(data):
+        del data[-16:]
+
+    codes = corrupt(tmp_path, files, "test.anm", edit)
+    assert codes and set(codes) <= {"truncated", "table_bounds"}
+
+
+def test_report(tmp_path, files):
+    def edit(data):
+        del data[-16:]
+
+    corrupt(tmp_path, files, "test.dck", edit)
+    output = tmp_path / "report.json"
+    args = Namespace(paths=[tmp_path], output=str(output), all=False, jobs=1, verbose=0)
+    assert main(args) == 1
+
+    report = json.loads(output.read_text())
+    assert report["summary"]["files"] == len(files) + 1
+    assert report["summary"]["failed"] == 1
+    assert [file["path"] for file in report["files"]] == [
+        str(tmp_path / "bad" / "test.dck")
+    ]
+
+    (tmp_path / "bad" / "test.dck").unlink()
+    assert main(args) == 0
@@ -0,0 +1,87 @@
+import pytest
+import random
+from gc_anim_tool import yaz0
+from gc_anim_tool.anm import ANM
+
+
+@pytest.fixture
+def data(tmp_path, dca, dck) -> bytes:
+    # animation tables repeat a lot, random-looking floats much less
+    dck.name, dca.name = "first.dck", "second.dca"
+    ANM([dck, dca]).write_to_path(tmp_path / "test.anm")
+    return (tmp_path / "test.anm").read_bytes()
+
+
+@pytest.mark.parametrize("level", [0, 1, yaz0.DEFAULT_LEVEL, yaz0.MAX_LEVEL])
+def test_yaz0_round_trip(data, level):
+    compressed = yaz0.yaz0_compress(data, level)
+    assert compressed[:4] == b"Yaz0"
+    assert yaz0.yaz0_decompress(compressed) == data
+    assert yaz0.decompress(memoryview(compressed)) == data
+
+
+@pytest.mark.parametrize("level", [0, yaz0.DEFAULT_LEVEL])
+def test_yay0_round_trip(data, level):
+    compressed = yaz0.yay0_compress(data, level)
+    assert compressed[:4] == b"Yay0"
+    assert yaz0.yay0_decompress(compressed) == data
+    assert yaz0.decompress(compressed) == data
+
+
+def test_compresses(data):
+    assert len(yaz0.yaz0_compress(data)) < len(data)
+    assert len(yaz0.yay0_compress(data)) < len(data)
+
+
+@pytest.mark.parametrize("data", [b"", b"a", b"ab" * 1000, bytes(range(256)) * 4])
+def test_edge_cases(data):
+    assert yaz0.yaz0_decompress(yaz0.yaz0_compress(data)) == data
+    assert yaz0.yay0_decompress(yaz0.yay0_compress(data)) == data
+
+
+def test_short_matches():
+    # matches near the start of the data, where the window reaches before it
+    assert list(yaz0.find_matches(b"babaababcca", 6)) == [(4, 3, 3)]
+    assert yaz0.yaz0_decompress(yaz0.yaz0_compress(b"babaababcca")) == b"babaababcca"
+
+
+@pytest.mark.parametrize("level", range(yaz0.MAX_LEVEL + 1))
+def test_random_round_trip(level):
+    # few distinct bytes make for many short, overlapping matches
+    rng = random.Random(level)
+    for _ in range(300):
+        data = bytes(rng.choices(b"abcde", k=rng.randrange(201)))
+        assert yaz0.yaz0_decompress(yaz0.yaz0_compress(data, level)) == data
+        assert yaz0.yay0_decompress(yaz0.yay0_compress(data, level)) == data
+
+
+def test_uncompressed_passthrough(data):
+    assert not yaz0.is_compressed(data)
+    assert yaz0.decompress(data) is data
+
+
+@pytest.mark.parametrize("cut", [1, 3, 8, 100])
+def test_yaz0_truncated(data, cut):
+    compressed = yaz0.yaz0_compress(data)
+    with pytest.raises(EOFError):
+        yaz0.yaz0_decompress(compressed[:-cut])
+
+
+@pytest.mark.parametrize("cut", [1, 3])
+def test_yaz0_truncated_literals(cut):
+    # level 0 stores everything as runs of 8 literals
+    compressed = yaz0.yaz0_compress(bytes(range(200)), 0)
+    with pytest.raises(EOFError):
+        yaz0.yaz0_decompress(compressed[:-cut])
+
+
+@pytest.mark.parametrize("cut", [1, 3, 100])
+def test_yay0_truncated(data, cut):
+    compressed = yaz0.yay0_compress(data)
+    with pytest.raises(EOFError):
+        yaz0.yay0_decompress(compressed[:-cut])
+
+
+def test_wrong_magic(data):
+    with pytest.raises(ValueError):
+        yaz0.yaz0_decompress(yaz0.yay0_compress(data))